@@ -0,0 +1,91 @@
+"""
+Synthetic, reproducible datasets for the benchmarks, loaded straight into the figgy.fakes backends.
+"""
+import random
+from typing import Dict, List
+
+from figgy.constants.data import *
+from figgy.fakes.dynamodb import FakeDynamoResource
+from figgy.fakes.faults import FaultInjector
+from figgy.fakes.kms import FakeKmsClient
+from figgy.fakes.ssm import FakeSsmClient
+
+BASE_TIME = 1600000000000
+SERVICES = 50
+USERS = 50
+
+
+def parameter_names(count: int, seed: int = 0) -> List[str]:
+    """
+    Parameter names spread over services and a few levels of nesting, like a real /app tree.
+    """
+    rand = random.Random(seed)
+    names = []
+    for i in range(count):
+        service = f'/app/service-{i % SERVICES}'
+        depth = rand.randrange(3)
+        group = '/'.join(f'group-{rand.randrange(5)}' for _ in range(depth))
+        names.append(f'{service}/{group}/parameter-{i}' if group else f'{service}/parameter-{i}')
+
+    return names
+
+
+def audit_items(names: List[str], rows: int, seed: int = 0) -> List[Dict]:
+    rand = random.Random(seed)
+    items = []
+    for i in range(rows):
+        name = names[rand.randrange(len(names))]
+        items.append({
+            AUDIT_PARAMETER_KEY_NAME: name,
+            AUDIT_TIME_KEY_NAME: BASE_TIME + i * 1000,
+            AUDIT_ACTION_ATTR_NAME: SSM_PUT if rand.random() > .1 else SSM_DELETE,
+            AUDIT_USER_ATTR_NAME: f'user-{rand.randrange(USERS)}@example.com',
+            AUDIT_PARAMETER_ATTR_TYPE: SSM_STRING,
+            AUDIT_PARAMETER_ATTR_VALUE: f'value-{rand.randrange(1 << 30)}',
+            AUDIT_PARAMETER_ATTR_DESCRIPTION: '',
+            AUDIT_PARAMETER_ATTR_VERSION: rand.randrange(1, 20),
+        })
+
+    return items
+
+
+def usage_items(names: List[str], rows: int, seed: int = 0) -> List[Dict]:
+    rand = random.Random(seed)
+    return [{
+        CONFIG_USAGE_PARAMETER_KEY: names[rand.randrange(len(names))],
+        CONFIG_USAGE_USER_KEY: f'user-{rand.randrange(USERS)}@example.com',
+        CONFIG_USAGE_LAST_UPDATED_KEY: BASE_TIME + i * 1000,
+        CONFIG_USAGE_EMPTY_IDX_KEY: CONFIG_USAGE_EMPTY_IDX_VALUE,
+    } for i in range(rows)]
+
+
+def cache_items(names: List[str]) -> List[Dict]:
+    return [{
+        CACHE_PARAMETER_KEY_NAME: name,
+        CACHE_LAST_UPDATED_KEY_NAME: BASE_TIME + i,
+        CACHE_STATE_ATTR_NAME: 'ACTIVE',
+    } for i, name in enumerate(names)]
+
+
+class Backend:
+    """
+    Fake SSM / DynamoDB / KMS populated with `parameters` parameters, `audit_rows` audit logs and `usage_rows`
+    usage logs. Latency is injected only after loading.
+    """
+
+    def __init__(self, parameters: int, audit_rows: int, usage_rows: int, latency_ms: float = 0,
+                 jitter_ms: float = 0, seed: int = 0):
+        self.faults = FaultInjector(seed=seed)
+        self.kms = FakeKmsClient(self.faults)
+        self.ssm = FakeSsmClient(self.faults, kms=self.kms)
+        self.dynamo = FakeDynamoResource.figgy(self.faults)
+
+        self.names = parameter_names(parameters, seed)
+        self.ssm.load({name: f'value-{i}' for i, name in enumerate(self.names)})
+        self.dynamo.Table(AUDIT_TABLE_NAME).load(audit_items(self.names, audit_rows, seed))
+        self.dynamo.Table(CONFIG_USAGE_TABLE_NAME).load(usage_items(self.names, usage_rows, seed))
+        self.dynamo.Table(CACHE_TABLE_NAME).load(cache_items(self.names))
+
+        self.faults.latency_ms = latency_ms
+        self.faults.jitter_ms = jitter_ms
+        self.faults.reset()
@@ -0,0 +1,149 @@
+"""
+Import-time check for figgy's public modules.
+
+Each module is imported in a fresh interpreter under `python -X importtime`. The script reports the cumulative import
+cost per module as JSON, and fails (exit code 1) if a module pulls in a heavy dependency it must not load eagerly,
+or if an optional --budget-ms is exceeded.
+
+    PYTHONPATH=src python benchmarks/import_time.py
+    PYTHONPATH=src python benchmarks/import_time.py --budget-ms 150 --baseline import_times.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, List, Set, Tuple
+
+HEAVY = {'boto3', 'botocore', 'urllib3', 'numpy', 'cryptography'}
+PYDANTIC = {'pydantic'}
+
+# module -> top level packages that importing it must not load
+RULES: Dict[str, Set[str]] = {
+    'figgy': HEAVY | PYDANTIC,
+    'figgy.constants.data': HEAVY | PYDANTIC,
+    'figgy.constants.models': HEAVY | PYDANTIC,
+    'figgy.utils.utils': HEAVY | PYDANTIC,
+    'figgy.utils.cache': HEAVY | PYDANTIC,
+    'figgy.utils.symbols': HEAVY | PYDANTIC,
+    'figgy.utils.metrics': HEAVY | PYDANTIC,
+    'figgy.utils.exceptions': HEAVY | PYDANTIC,
+    'figgy.utils.concurrent_writer': HEAVY | PYDANTIC,
+    'figgy.utils.rate_limiter': HEAVY | PYDANTIC,
+    'figgy.utils.single_flight': HEAVY | PYDANTIC,
+    'figgy.utils.cache_protocol': HEAVY | PYDANTIC,
+    'figgy.models.audit_log': HEAVY,
+    'figgy.models.usage_log': HEAVY,
+    'figgy.models.fig': HEAVY,
+    'figgy.models.run_env': HEAVY,
+    'figgy.models.replication_config': HEAVY,
+    'figgy.models.replication_graph': HEAVY,
+    'figgy.models.restore_config': HEAVY | PYDANTIC,
+    'figgy.models.restore_plan': HEAVY | PYDANTIC,
+    'figgy.models.parameter_history': HEAVY | PYDANTIC,
+    'figgy.models.parameter_store_history': HEAVY | PYDANTIC,
+    'figgy.models.columnar_history': HEAVY | PYDANTIC,
+    'figgy.models.records': HEAVY,
+    'figgy.models.fan_out': HEAVY,
+    'figgy.models.prefix_diff': HEAVY | PYDANTIC,
+    'figgy.data.models.config_item': HEAVY,
+    'figgy.data.clients': HEAVY | PYDANTIC,
+    'figgy.data.paginator': HEAVY | PYDANTIC,
+    'figgy.data.index.checkpoint_index': HEAVY | PYDANTIC,
+    'figgy.data.index.search_index': HEAVY | PYDANTIC,
+    # Worker processes only need the proxy, which talks to the cache daemon without boto3.
+    'figgy.data.dao.ssm_proxy': HEAVY | PYDANTIC,
+    # DAOs and services need boto3 / botocore, they are measured but not restricted beyond optional extras.
+    'figgy.data.dao.ssm': {'numpy', 'cryptography'},
+    'figgy.data.dao.kms': {'numpy', 'cryptography'},
+    'figgy.data.dao.audit': {'numpy', 'cryptography'},
+    'figgy.data.dao.config': {'numpy', 'cryptography'},
+    'figgy.data.dao.replication': {'numpy', 'cryptography'},
+    'figgy.data.dao.usage_tracker': {'numpy', 'cryptography'},
+    'figgy.data.dao.user_cache': {'numpy', 'cryptography'},
+    'figgy.svcs.cache_daemon': {'numpy', 'cryptography'},
+    'figgy.svcs.fan_out_executor': {'numpy', 'cryptography'},
+    'figgy.svcs.fig_service': {'numpy', 'cryptography'},
+    'figgy.svcs.fig_watcher': {'numpy', 'cryptography'},
+    'figgy.svcs.prefix_sync_service': {'numpy', 'cryptography'},
+    'figgy.svcs.replication_sync_service': {'numpy', 'cryptography'},
+    'figgy.svcs.restore_service': {'numpy', 'cryptography'},
+}
+
+
+def import_profile(module: str) -> Tuple[int, Set[str]]:
+    """
+    Returns: (cumulative import time of `module` in microseconds, top level packages loaded while importing it)
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            stderr=subprocess.PIPE, stdout=subprocess.DEVNULL, env=os.environ, text=True)
+    if result.returncode:
+        raise RuntimeError(f'Importing {module} failed:\n{result.stderr}')
+
+    cumulative, loaded = None, set()
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+
+        _, cumulative_us, name = [part.strip() for part in line[len('import time:'):].split('|')]
+        if not cumulative_us.isdigit():
+            continue  # Header line
+
+        loaded.add(name.split('.')[0])
+        if name == module:
+            cumulative = int(cumulative_us)
+
+    return cumulative or 0, loaded
+
+
+def check(modules: List[str], repeat: int, budget_ms: float = None) -> Tuple[Dict, List[str]]:
+    results, failures = {}, []
+    for module in modules:
+        runs = [import_profile(module) for _ in range(repeat)]
+        micros = min(run[0] for run in runs)
+        loaded = runs[0][1]
+        forbidden = sorted(loaded & RULES.get(module, set()))
+
+        results[module] = {'import_ms': round(micros / 1000, 2), 'heavy_imports': sorted(loaded & (HEAVY | PYDANTIC))}
+        if forbidden:
+            failures.append(f'{module} eagerly imports {", ".join(forbidden)}')
+        if budget_ms is not None and micros / 1000 > budget_ms:
+            failures.append(f'{module} took {micros / 1000:.1f}ms to import, budget is {budget_ms}ms')
+
+    return results, failures
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('modules', nargs='*', help='Modules to check, defaults to every public module')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per module, the fastest is reported')
+    parser.add_argument('--budget-ms', type=float, help='Fail if any module takes longer than this to import')
+    parser.add_argument('--baseline', help='Previous results JSON to compare against')
+    parser.add_argument('-o', '--output', help='Write results to this file instead of stdout')
+    args = parser.parse_args(argv)
+
+    results, failures = check(args.modules or list(RULES), args.repeat, args.budget_ms)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file).get('results', {})
+        for module, measured in results.items():
+            before = baseline.get(module, {}).get('import_ms')
+            if before:
+                measured['change'] = round(measured['import_ms'] / before - 1, 4)
+
+    output = json.dumps({'python': sys.version.split()[0], 'results': results, 'failures': failures}, indent=2)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(output)
+    else:
+        print(output)
+
+    for failure in failures:
+        print(f'FAIL: {failure}', file=sys.stderr)
+
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
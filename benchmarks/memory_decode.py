@@ -0,0 +1,89 @@
+"""
+Memory benchmark for DAO result decoding.
+
+Builds audit / usage items the way boto3 hands them back (a new str for every attribute of every item, numbers as
+Decimal) and measures the resident size of the hydrated results with and without ItemDecoder interning.
+
+    PYTHONPATH=src python benchmarks/memory_decode.py --rows 200000
+"""
+import argparse
+import gc
+import json
+import random
+import tracemalloc
+from decimal import Decimal
+from typing import Callable, Dict, List
+
+from figgy.constants.data import AUDIT_INTERNED_ATTRS, CONFIG_USAGE_INTERNED_ATTRS
+from figgy.models.records import AuditLogRecord, UsageLogRecord
+from figgy.utils.symbols import ItemDecoder
+
+
+def _fresh(value: str) -> str:
+    # Mimics deserialization: equal strings, distinct objects.
+    return ''.join(list(value))
+
+
+def audit_items(rows: int, parameters: int, users: int) -> List[Dict]:
+    rand = random.Random(rows)
+    return [{
+        _fresh('parameter_name'): _fresh(f'/app/service-{i % 50}/config/parameter-{rand.randrange(parameters)}'),
+        _fresh('time'): Decimal(1600000000000 + i),
+        _fresh('action'): _fresh(rand.choice(['PutParameter', 'DeleteParameter'])),
+        _fresh('user'): _fresh(f'user-{rand.randrange(users)}@example.com'),
+        _fresh('type'): _fresh('SecureString'),
+        _fresh('key_id'): _fresh('arn:aws:kms:us-east-1:123456789012:key/1234abcd-12ab-34cd-56ef-1234567890ab'),
+        _fresh('version'): Decimal(rand.randrange(1, 20)),
+    } for i in range(rows)]
+
+
+def usage_items(rows: int, parameters: int, users: int) -> List[Dict]:
+    rand = random.Random(rows)
+    return [{
+        _fresh('parameter_name'): _fresh(f'/app/service-{i % 50}/config/parameter-{rand.randrange(parameters)}'),
+        _fresh('last_updated'): Decimal(1600000000000 + i),
+        _fresh('user'): _fresh(f'user-{rand.randrange(users)}@example.com'),
+        _fresh('empty_indexable_key'): _fresh('empty'),
+    } for i in range(rows)]
+
+
+def measure(build: Callable[[], List]) -> int:
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def run(rows: int, parameters: int, users: int) -> Dict:
+    results = {}
+    cases = [
+        ('audit', audit_items, AuditLogRecord, AUDIT_INTERNED_ATTRS),
+        ('usage', usage_items, UsageLogRecord, CONFIG_USAGE_INTERNED_ATTRS),
+    ]
+
+    for name, items_fn, record, attrs in cases:
+        # Each measurement gets its own copy, as each query would get its own page of items.
+        raw = measure(lambda: [record.from_item(item) for item in items_fn(rows, parameters, users)])
+        decoded = measure(lambda: [record.from_item(item) for item in
+                                   ItemDecoder(attrs).decode_all(items_fn(rows, parameters, users))])
+        results[name] = {
+            'rows': rows,
+            'raw_bytes': raw,
+            'decoded_bytes': decoded,
+            'reduction': round(1 - decoded / raw, 3),
+        }
+
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--parameters', type=int, default=2000)
+    parser.add_argument('--users', type=int, default=50)
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.rows, args.parameters, args.users), indent=2))
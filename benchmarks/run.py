@@ -0,0 +1,297 @@
+"""
+Benchmarks every DAO hot path against the in-memory fake backends (figgy.fakes) and emits the results as JSON.
+
+Datasets are generated from a fixed seed, so runs with the same arguments are comparable between releases. Simulated
+latency is applied per request, after the dataset has been loaded.
+
+    PYTHONPATH=src python benchmarks/run.py --parameters 10000 --audit-rows 100000 --latency-ms 5 -o results.json
+    PYTHONPATH=src python benchmarks/run.py --baseline results.json     # adds per-case change vs. a previous run
+"""
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+from datasets import Backend, BASE_TIME
+
+from figgy.constants.data import AUDIT_TABLE_NAME
+from figgy.data.dao.audit import AuditDao
+from figgy.data.dao.config import ConfigDao
+from figgy.data.dao.ssm import SsmDao
+from figgy.data.dao.usage_tracker import UsageTrackerDao
+from figgy.data.index.search_index import SearchIndex
+from figgy.models.audit_log import AuditLog
+from figgy.models.records import AuditLogRecord
+from figgy.models.restore_config import RestoreConfig
+from figgy.svcs.fig_service import FigService
+
+CASES: Dict[str, Callable] = {}
+
+
+def case(name: str):
+    def register(func):
+        CASES[name] = func
+        return func
+
+    return register
+
+
+def _same(name: str, indexed: List, scanned: List, key: Callable) -> None:
+    # Indexed searches are only worth timing if they find exactly what the scan finds.
+    if sorted(map(key, indexed)) != sorted(map(key, scanned)):
+        raise ValueError(f'{name} found {len(indexed)} logs with the search index but {len(scanned)} without it')
+
+
+def _size(result) -> Optional[int]:
+    try:
+        return len(result)
+    except TypeError:
+        return None
+
+
+# -- SSM --
+
+@case('ssm.get_all_parameters')
+def get_all_parameters(backend: Backend, args):
+    return lambda: SsmDao(backend.ssm).get_all_parameters(['/app'])
+
+
+@case('ssm.get_all_param_names_fast')
+def get_all_param_names_fast(backend: Backend, args):
+    return lambda: SsmDao(backend.ssm).get_all_param_names_fast(['/app'])
+
+
+@case('ssm.get_parameter_values')
+def get_parameter_values(backend: Backend, args):
+    names = random.Random(args.seed).sample(backend.names, min(args.sample, len(backend.names)))
+    return lambda: SsmDao(backend.ssm).get_parameter_values(names)
+
+
+@case('ssm.get_parameter_values.parallel')
+def get_parameter_values_parallel(backend: Backend, args):
+    names = random.Random(args.seed).sample(backend.names, min(args.sample, len(backend.names)))
+    return lambda: SsmDao(backend.ssm).get_parameter_values(names, max_workers=args.threads)
+
+
+@case('fig.get_tree')
+def fig_get_tree(backend: Backend, args):
+    return lambda: FigService(SsmDao(backend.ssm), max_workers=args.threads).get_tree('/app/service-1')
+
+
+@case('fig.get_many')
+def fig_get_many(backend: Backend, args):
+    names = random.Random(args.seed).sample(backend.names, min(args.sample, len(backend.names)))
+    return lambda: FigService(SsmDao(backend.ssm), max_workers=args.threads).get_many(names)
+
+
+# -- DynamoDB --
+
+@case('audit.find_logs_parallel')
+def find_logs_parallel(backend: Backend, args):
+    return lambda: AuditDao(backend.dynamo).find_logs_parallel(args.threads)
+
+
+@case('audit.find_logs_parallel.unvalidated')
+def find_logs_parallel_unvalidated(backend: Backend, args):
+    return lambda: AuditDao(backend.dynamo).find_logs_parallel(args.threads, validate=False)
+
+
+@case('audit.find_logs.indexed')
+def find_logs_indexed(backend: Backend, args):
+    def key(log):
+        return log.parameter_name, log.time, log.action
+
+    search, index = '/service-1/', SearchIndex()
+    scanned = AuditDao(backend.dynamo).find_logs(filter=search, validate=False)
+    dao = AuditDao(backend.dynamo, search_index=index)
+    _same('find_logs (unsynced)', dao.find_logs(filter=search, validate=False), scanned, key)
+    index.sync_audit(AuditDao(backend.dynamo))
+    _same('find_logs', dao.find_logs(filter=search, validate=False), scanned, key)
+    return lambda: dao.find_logs(filter=search, validate=False)
+
+
+@case('audit.get_parameter_history_before_time')
+def get_parameter_history_before_time(backend: Backend, args):
+    ps_time = datetime.datetime.now()
+    return lambda: AuditDao(backend.dynamo).get_parameter_history_before_time(ps_time, '/app').history
+
+
+@case('audit.get_columnar_history_before_time')
+def get_columnar_history_before_time(backend: Backend, args):
+    ps_time = datetime.datetime.now()
+    return lambda: AuditDao(backend.dynamo).get_columnar_history_before_time(ps_time, '/app').history
+
+
+@case('config.get_all_config_names')
+def get_all_config_names(backend: Backend, args):
+    return lambda: ConfigDao(backend.dynamo).get_all_config_names()
+
+
+@case('config.get_config_names_after')
+def get_config_names_after(backend: Backend, args):
+    return lambda: ConfigDao(backend.dynamo).get_config_names_after(0)
+
+
+@case('usage.find_logs_by_time')
+def find_logs_by_time(backend: Backend, args):
+    return lambda: list(UsageTrackerDao(backend.dynamo).find_logs_by_time(after=BASE_TIME - 1, validate=False))
+
+
+@case('usage.find_logs_by_time.indexed')
+def find_logs_by_time_indexed(backend: Backend, args):
+    def key(log):
+        return log.parameter_name, log.user, log.last_updated
+
+    search, index = '/service-1/', SearchIndex()
+    scanned = list(UsageTrackerDao(backend.dynamo).find_logs_by_time(filter=search, validate=False))
+    dao = UsageTrackerDao(backend.dynamo, search_index=index)
+    _same('find_logs_by_time (unsynced)', list(dao.find_logs_by_time(filter=search, validate=False)), scanned, key)
+    index.sync_usage(UsageTrackerDao(backend.dynamo))
+    _same('find_logs_by_time', list(dao.find_logs_by_time(filter=search, validate=False)), scanned, key)
+    return lambda: list(dao.find_logs_by_time(filter=search, validate=False))
+
+
+@case('usage.find_logs_by_user')
+def find_logs_by_user(backend: Backend, args):
+    return lambda: list(UsageTrackerDao(backend.dynamo).find_logs_by_user('user-0@example.com', validate=False))
+
+
+@case('usage.find_by_parameter')
+def find_by_parameter(backend: Backend, args):
+    names = random.Random(args.seed).sample(backend.names, min(args.sample, len(backend.names)))
+    dao = UsageTrackerDao(backend.dynamo)
+    return lambda: [log for name in names for log in dao.find_by_parameter(name, validate=False)]
+
+
+# -- Model hydration, no backend calls --
+
+def _audit_items(backend: Backend) -> List[Dict]:
+    return backend.dynamo.Table(AUDIT_TABLE_NAME).all_items()
+
+
+@case('hydrate.audit_log')
+def hydrate_audit_log(backend: Backend, args):
+    items = _audit_items(backend)
+    return lambda: [AuditLog(**item) for item in items]
+
+
+@case('hydrate.audit_log_record')
+def hydrate_audit_log_record(backend: Backend, args):
+    items = _audit_items(backend)
+    return lambda: [AuditLogRecord.from_item(item) for item in items]
+
+
+@case('hydrate.restore_config')
+def hydrate_restore_config(backend: Backend, args):
+    items = _audit_items(backend)
+    return lambda: RestoreConfig.convert_to_model(items)
+
+
+def measure(name: str, backend: Backend, args) -> Dict:
+    try:
+        func = CASES[name](backend, args)
+    except Exception as e:
+        return {'error': f'{type(e).__name__}: {e}'}
+
+    timings, size, error = [], None, None
+    backend.faults.reset()
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        try:
+            # Some DAO methods print progress, keep it out of the JSON output.
+            with contextlib.redirect_stdout(io.StringIO()):
+                result = func()
+        except Exception as e:
+            error = f'{type(e).__name__}: {e}'
+            break
+
+        timings.append(time.perf_counter() - start)
+        size = _size(result)
+
+    measured = {'requests': sum(backend.faults.calls.values()) // max(len(timings), 1)}
+    if timings:
+        measured.update({
+            'runs': len(timings),
+            'min_s': round(min(timings), 6),
+            'median_s': round(statistics.median(timings), 6),
+            'mean_s': round(statistics.mean(timings), 6),
+            'results': size,
+        })
+    if error:
+        measured['error'] = error
+
+    return measured
+
+
+def compare(results: Dict, baseline_path: str) -> None:
+    with open(baseline_path) as file:
+        baseline = json.load(file).get('results', {})
+
+    for name, measured in results.items():
+        before = baseline.get(name, {}).get('median_s')
+        if before and measured.get('median_s'):
+            measured['baseline_median_s'] = before
+            measured['change'] = round(measured['median_s'] / before - 1, 4)
+
+
+def main(argv: List[str] = None) -> Dict:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--parameters', type=int, default=10000, help='SSM parameters / config cache entries')
+    parser.add_argument('--audit-rows', type=int, default=50000)
+    parser.add_argument('--usage-rows', type=int, default=50000)
+    parser.add_argument('--latency-ms', type=float, default=0, help='Simulated latency added to every request')
+    parser.add_argument('--jitter-ms', type=float, default=0)
+    parser.add_argument('--threads', type=int, default=8, help='Threads for parallel scans / fetches')
+    parser.add_argument('--sample', type=int, default=200, help='Names used by point lookup cases')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--only', nargs='*', help='Case name prefixes to run, e.g. ssm audit.find_logs')
+    parser.add_argument('--label', help='Free form label for this run, e.g. a release version')
+    parser.add_argument('--baseline', help='Previous results JSON to compare against')
+    parser.add_argument('-o', '--output', help='Write results to this file instead of stdout')
+    args = parser.parse_args(argv)
+
+    load_start = time.perf_counter()
+    backend = Backend(args.parameters, args.audit_rows, args.usage_rows, args.latency_ms, args.jitter_ms, args.seed)
+    load_seconds = time.perf_counter() - load_start
+
+    names = [name for name in CASES if not args.only or any(name.startswith(prefix) for prefix in args.only)]
+    results = {}
+    for name in names:
+        print(f'Running {name}', file=sys.stderr)
+        results[name] = measure(name, backend, args)
+
+    if args.baseline:
+        compare(results, args.baseline)
+
+    report = {
+        'meta': {
+            'label': args.label,
+            'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'args': {k: v for k, v in vars(args).items() if k not in ('output', 'baseline')},
+            'load_s': round(load_seconds, 3),
+        },
+        'results': results,
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(output)
+    else:
+        print(output)
+
+    return report
+
+
+if __name__ == '__main__':
+    main()
@@ -20,5 +20,9 @@ setup(
     author_email="jordan@figgy.dev",
     url='https://github.com/mancej/figgy.lib',
     python_requires='>=3.7',
-    install_requires=requirements
+    install_requires=requirements,
+    extras_require={
+        'envelope': ['cryptography'],
+        'columnar': ['numpy'],
+    }
 )
@@ -1,4 +1,91 @@
-from .constants import *
-from .data import *
-from .models import *
-from .utils import *
\ No newline at end of file
+"""
+figgy's public entry point. Nothing is imported up front: each name below, and each subpackage, is loaded on first
+access (PEP 562), so `import figgy` is near free and only what a caller touches pays for boto3 / pydantic.
+
+    from figgy import SsmDao            # imports figgy.data.dao.ssm only
+"""
+import importlib
+from typing import List
+
+_EXPORTS = {
+    # DAOs
+    'AuditDao': 'figgy.data.dao.audit',
+    'ConfigDao': 'figgy.data.dao.config',
+    'KmsDao': 'figgy.data.dao.kms',
+    'ReplicationDao': 'figgy.data.dao.replication',
+    'SsmDao': 'figgy.data.dao.ssm',
+    'SsmDaoProxy': 'figgy.data.dao.ssm_proxy',
+    'UsageTrackerDao': 'figgy.data.dao.usage_tracker',
+    'UserCacheDao': 'figgy.data.dao.user_cache',
+
+    # Indexes
+    'CheckpointIndex': 'figgy.data.index.checkpoint_index',
+    'SearchIndex': 'figgy.data.index.search_index',
+
+    # Clients
+    'ClientFactory': 'figgy.data.clients',
+    'Paginator': 'figgy.data.paginator',
+
+    # Services
+    'CacheDaemon': 'figgy.svcs.cache_daemon',
+    'FanOutExecutor': 'figgy.svcs.fan_out_executor',
+    'FigService': 'figgy.svcs.fig_service',
+    'FigWatcher': 'figgy.svcs.fig_watcher',
+    'PrefixSyncService': 'figgy.svcs.prefix_sync_service',
+    'ReplicationSyncService': 'figgy.svcs.replication_sync_service',
+    'RestoreService': 'figgy.svcs.restore_service',
+
+    # Models
+    'AuditLog': 'figgy.models.audit_log',
+    'ColumnarHistory': 'figgy.models.columnar_history',
+    'ConfigItem': 'figgy.data.models.config_item',
+    'FanOutResult': 'figgy.models.fan_out',
+    'FanOutTarget': 'figgy.models.fan_out',
+    'Fig': 'figgy.models.fig',
+    'ParameterHistory': 'figgy.models.parameter_history',
+    'PrefixDiff': 'figgy.models.prefix_diff',
+    'PrefixSyncResult': 'figgy.models.prefix_diff',
+    'PSHistory': 'figgy.models.parameter_store_history',
+    'ReplicationConfig': 'figgy.models.replication_config',
+    'ReplicationGraph': 'figgy.models.replication_graph',
+    'ReplicationSyncResult': 'figgy.models.replication_sync_result',
+    'RestoreConfig': 'figgy.models.restore_config',
+    'RestorePlan': 'figgy.models.restore_plan',
+    'RestoreResult': 'figgy.models.restore_plan',
+    'RunEnv': 'figgy.models.run_env',
+    'UsageLog': 'figgy.models.usage_log',
+
+    # Utils
+    'CapacityLimiter': 'figgy.utils.rate_limiter',
+    'ConcurrentWriter': 'figgy.utils.concurrent_writer',
+    'DataKeyCache': 'figgy.utils.cache',
+    'Metrics': 'figgy.utils.metrics',
+    'NegativeCache': 'figgy.utils.cache',
+    'PlaintextCache': 'figgy.utils.cache',
+    'RateLimiter': 'figgy.utils.rate_limiter',
+    'SingleFlight': 'figgy.utils.single_flight',
+    'SymbolTable': 'figgy.utils.symbols',
+    'TtlCache': 'figgy.utils.cache',
+    'Utils': 'figgy.utils.utils',
+}
+
+_SUBPACKAGES = {'constants', 'data', 'fakes', 'models', 'svcs', 'utils'}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name: str):
+    module = _EXPORTS.get(name)
+    if module is not None:
+        value = getattr(importlib.import_module(module), name)
+    elif name in _SUBPACKAGES:
+        value = importlib.import_module(f'{__name__}.{name}')
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    globals()[name] = value  # Later lookups skip __getattr__
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(_EXPORTS) | _SUBPACKAGES)
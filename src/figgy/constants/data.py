@@ -23,12 +23,15 @@ AUDIT_PARAMETER_ATTR_VALUE = "value"
 AUDIT_PARAMETER_ATTR_KEY_ID = "key_id"
 AUDIT_PARAMETER_ATTR_USER = "user"
 AUDIT_IDX_USER_ID = "AuditByUserIdx"
+AUDIT_INTERNED_ATTRS = [AUDIT_PARAMETER_KEY_NAME, AUDIT_ACTION_ATTR_NAME, AUDIT_USER_ATTR_NAME,
+                        AUDIT_PARAMETER_ATTR_TYPE, AUDIT_PARAMETER_ATTR_KEY_ID, AUDIT_PARAMETER_ATTR_DESCRIPTION]
 
 # Cache Table
 CACHE_TABLE_NAME = 'figgy-config-cache'
 CACHE_PARAMETER_KEY_NAME = "parameter_name"
 CACHE_LAST_UPDATED_KEY_NAME = "last_updated"
 CACHE_STATE_ATTR_NAME = 'state'
+CACHE_INTERNED_ATTRS = [CACHE_PARAMETER_KEY_NAME, CACHE_STATE_ATTR_NAME]
 
 # Config Usage Tracker
 CONFIG_USAGE_TABLE_NAME = "figgy-config-usage-tracker"
@@ -39,6 +42,9 @@ CONFIG_USAGE_EMPTY_IDX_KEY = "empty_indexable_key"
 CONFIG_USAGE_EMPTY_IDX_VALUE = "empty"
 CONFIG_USAGE_LAST_UPDATED_ONLY_IDX = "LastUpdateOnlyIdx"
 CONFIG_USAGE_USER_LAST_UPDATED_IDX = "UserLastUpdatedIndex"
+CONFIG_USAGE_ACTION_ATTR_NAME = "action"
+CONFIG_USAGE_INTERNED_ATTRS = [CONFIG_USAGE_PARAMETER_KEY, CONFIG_USAGE_USER_KEY, CONFIG_USAGE_EMPTY_IDX_KEY,
+                               CONFIG_USAGE_ACTION_ATTR_NAME]
 
 # User cache table
 USER_CACHE_TABLE_NAME = "figgy-user-cache"
@@ -59,4 +65,15 @@ SSM_INTELLIGENT_TIERING = 'Intelligent-Tiering'
 # KMS Constants
 ENCRYPTION_CONTEXT_ENCRYPTOR_KEY = 'encryptor'
 ENCRYPTION_CONTEXT_ENCRYPTOR_DEFAULT_VALUE = 'figgy'
-ENCRYPTION_CONTEXT_PASSWORD_KEY = 'password'
\ No newline at end of file
+ENCRYPTION_CONTEXT_PASSWORD_KEY = 'password'
+ENVELOPE_HEADER = b'FGE1'  # Prefixes locally encrypted values that carry their own wrapped data key
+ENVELOPE_NONCE_BYTES = 12
+ENVELOPE_DATA_KEY_SPEC = 'AES_256'
+
+# Merge replication references, e.g. ${/app/foo/bar}
+MERGE_KEY_PREFIX = "${"
+MERGE_KEY_SUFFIX = "}"
+
+# Error codes AWS returns when a request is throttled
+THROTTLE_ERROR_CODES = ['ThrottlingException', 'Throttling', 'TooManyUpdates',
+                        'ProvisionedThroughputExceededException', 'RequestLimitExceeded']
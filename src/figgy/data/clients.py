@@ -0,0 +1,181 @@
+import functools
+import logging
+import threading
+from typing import Dict, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+# Worst case concurrent requests a single process makes through figgy's DAOs: get_all_param_names_fast fans out
+# 10 workers per tree level, find_logs_parallel / KmsDao.decrypt_many / ReplicationSyncService readers default to 10,
+# ConcurrentWriter to 5. botocore's default pool is 10, so anything above that churns connections + TLS handshakes.
+DEFAULT_MAX_CONCURRENCY = 50
+DEFAULT_MAX_ATTEMPTS = 10
+DEFAULT_CONNECT_TIMEOUT = 5
+DEFAULT_READ_TIMEOUT = 30
+
+
+@functools.lru_cache(maxsize=1)
+def _boto3():
+    # boto3 is only imported when the first client is built, see benchmarks/import_time.py
+    import boto3
+    import botocore.config
+    return boto3, botocore.config
+
+
+class ClientFactory:
+    """
+    Builds and caches SSM, KMS and DynamoDB clients / resources whose connection pool is sized for the concurrency
+    figgy's DAOs use, with TCP keep-alive and adaptive (client side rate limited) retries.
+
+    Clients are built once per (service, region) and shared by every DAO and thread that asks for them: botocore
+    clients are thread-safe and each one owns its connection pool, so sharing one is what lets connections be reused.
+
+    boto3 resources are not thread-safe, so they are never shared between threads: each thread that asks for one gets
+    its own, built with the same config. A DAO built from a resource may still be used from worker threads (as the
+    Paginator's segment threads do), because DAOs only call Table actions (query, scan, put_item, ...), which are
+    stateless calls on the resource's thread-safe client; they never load or modify resource attributes.
+
+        factory = ClientFactory.shared(region='us-east-1')
+        ssm_dao, audit_dao = SsmDao(factory.ssm()), AuditDao(factory.dynamodb())
+    """
+
+    _shared: Dict[Tuple, 'ClientFactory'] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, region: Optional[str] = None, profile: Optional[str] = None, session=None,
+                 max_concurrency: int = DEFAULT_MAX_CONCURRENCY, max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+                 connect_timeout: float = DEFAULT_CONNECT_TIMEOUT, read_timeout: float = DEFAULT_READ_TIMEOUT):
+        """
+        Args:
+            region: Default region for clients built by this factory. Falls back to the session's region.
+            profile: AWS profile used to build the session. Ignored if `session` is provided.
+            session: Existing boto3.Session to build clients from.
+            max_concurrency: Max concurrent requests expected per client, the connection pool is sized to fit.
+            max_attempts: Total attempts (including the first) botocore makes before raising.
+            connect_timeout: Seconds to wait for a connection to be established.
+            read_timeout: Seconds to wait for a response once connected.
+        """
+        if max_concurrency < 1:
+            raise ValueError(f"max_concurrency must be greater than 0, got: {max_concurrency}")
+
+        self._region = region
+        self._profile = profile
+        self._session = session
+        self._max_concurrency = max_concurrency
+        self._max_attempts = max_attempts
+        self._connect_timeout = connect_timeout
+        self._read_timeout = read_timeout
+        self._clients: Dict[Tuple[str, str], object] = {}
+        self._resources = threading.local()
+        self._generation = 0
+        self._lock = threading.RLock()
+
+    @classmethod
+    def shared(cls, region: Optional[str] = None, profile: Optional[str] = None, **kwargs) -> 'ClientFactory':
+        """
+        Returns: The process wide factory for this region / profile, so DAOs built in different places share clients.
+        """
+        key = (region, profile, tuple(sorted(kwargs.items())))
+        with cls._shared_lock:
+            factory = cls._shared.get(key)
+            if factory is None:
+                factory = cls._shared[key] = cls(region=region, profile=profile, **kwargs)
+
+            return factory
+
+    @property
+    def max_pool_connections(self) -> int:
+        return self._max_concurrency
+
+    @property
+    def session(self):
+        # boto3.Session() is not thread-safe to create, build it once under the lock.
+        with self._lock:
+            if self._session is None:
+                boto3, _ = _boto3()
+                self._session = boto3.Session(profile_name=self._profile, region_name=self._region)
+
+            return self._session
+
+    def config(self):
+        """
+        Returns: botocore.config.Config shared by every client this factory builds.
+        """
+        _, config = _boto3()
+        options = {
+            'max_pool_connections': self._max_concurrency,
+            'retries': {'total_max_attempts': self._max_attempts, 'mode': 'adaptive'},
+            'connect_timeout': self._connect_timeout,
+            'read_timeout': self._read_timeout,
+        }
+
+        # tcp_keepalive was added in botocore 1.23.0
+        if 'tcp_keepalive' in config.Config.OPTION_DEFAULTS:
+            options['tcp_keepalive'] = True
+
+        return config.Config(**options)
+
+    def client(self, service: str, region: Optional[str] = None):
+        """
+        Returns: The shared boto3 client for `service` in `region`.
+        """
+        return self.__get(service, region)
+
+    def resource(self, service: str, region: Optional[str] = None):
+        """
+        Returns: The calling thread's boto3 resource for `service` in `region`. Resources aren't thread-safe, every
+        thread gets its own.
+        """
+        region = region or self._region
+        key = (service, region)
+        # Each thread keeps its own resources, dropped once clear() moves the factory to a new generation.
+        resources = getattr(self._resources, 'built', None)
+        if resources is None or self._resources.generation != self._generation:
+            resources = self._resources.built = {}
+            self._resources.generation = self._generation
+
+        built = resources.get(key)
+        if built is None:
+            session = self.session
+            with self._lock:  # Building from a shared session isn't thread-safe
+                built = resources[key] = session.resource(service, region_name=region, config=self.config())
+            log.debug(f"Built {service} resource for region {region} on thread {threading.current_thread().name}.")
+
+        return built
+
+    def ssm(self, region: Optional[str] = None):
+        return self.client('ssm', region)
+
+    def kms(self, region: Optional[str] = None):
+        return self.client('kms', region)
+
+    def dynamodb(self, region: Optional[str] = None):
+        """
+        Returns: The calling thread's DynamoDB resource, the type every Dynamo backed DAO takes.
+        """
+        return self.resource('dynamodb', region)
+
+    def clear(self) -> None:
+        """
+        Drops every cached client and resource, e.g. after credentials are rotated. Clients already handed out keep
+        working.
+        """
+        with self._lock:
+            self._clients.clear()
+            self._generation += 1
+
+    def __get(self, service: str, region: Optional[str]):
+        region = region or self._region
+        key = (service, region)
+        built = self._clients.get(key)
+        if built is not None:
+            return built
+
+        with self._lock:
+            built = self._clients.get(key)
+            if built is None:
+                built = self._clients[key] = self.session.client(service, region_name=region, config=self.config())
+                log.debug(f"Built {service} client for region {region} with "
+                          f"{self._max_concurrency} pooled connections.")
+
+            return built
@@ -1,56 +1,65 @@
 import datetime
 import logging
-from multiprocessing.pool import ThreadPool
-
+from concurrent.futures import ThreadPoolExecutor
 from decimal import Decimal
-from threading import Thread
 
 from typing import Optional, List, Dict
 
 from boto3.dynamodb.conditions import Key, Attr
 
 from figgy.constants.data import *
+from figgy.data.index.search_index import SearchIndex
+from figgy.data.paginator import Paginator
 from figgy.models.audit_log import AuditLog
+from figgy.models.columnar_history import ColumnarHistory, ColumnarPSHistory
 from figgy.models.parameter_history import ParameterHistory
 from figgy.models.parameter_store_history import PSHistory
+from figgy.models.records import AuditLogRecord
 from figgy.models.restore_config import RestoreConfig
+from figgy.utils.metrics import Metrics
+from figgy.utils.rate_limiter import CapacityLimiter
+from figgy.utils.symbols import SymbolTable, ItemDecoder
 
 log = logging.getLogger(__name__)
 
 
 class AuditDao:
 
-    def __init__(self, dynamo_resource):
+    def __init__(self, dynamo_resource, symbol_table: SymbolTable = None, read_limiter: CapacityLimiter = None,
+                 search_index: SearchIndex = None):
+        """
+        Args:
+            dynamo_resource: boto3 DynamoDB resource
+            symbol_table: Optional SymbolTable shared by all queries. By default each query interns repeated strings
+            through its own table, which is discarded with the results.
+            read_limiter: Optional read capacity budget for this DAO's scans and queries. Share one limiter between
+            DAOs / processes reading the same table to enforce a single budget.
+            search_index: Optional SearchIndex, kept current by the caller. Filtered find_logs searches then query
+            only the names / users matching the filter instead of scanning the whole table.
+        """
         self._dynamo_resource = dynamo_resource
-        self._audit_table = self._dynamo_resource.Table(AUDIT_TABLE_NAME)
+        self._audit_table = Metrics.instrument(self._dynamo_resource.Table(AUDIT_TABLE_NAME), 'dynamodb')
+        self._symbols = symbol_table
+        self._read_limiter = read_limiter
+        self._search_index = search_index
 
-    def get_parameter_restore_details(self, ps_name: str, start_key: str = None) -> List[RestoreConfig]:
+    @Metrics.timed('audit.get_parameter_restore_details')
+    def get_parameter_restore_details(self, ps_name: str) -> List[RestoreConfig]:
         """
         :param ps_name:  str -> parameter store key name
-        :param start_key: str -> used for recursive lookups on table scans.
         :return:
             List of parameter name + value + description + type
         """
-        results = []
         filter_exp = Key(AUDIT_PARAMETER_KEY_NAME).eq(ps_name)
-        if start_key:
-            result = self._audit_table.scan(FilterExpression=filter_exp, ExclusiveStartKey=start_key)
-        else:
-            result = self._audit_table.scan(FilterExpression=filter_exp)
-
-        items: List = result["Items"] if result["Items"] else []
+        items = self.__scan(FilterExpression=filter_exp, transform=self.__decoder().decode_all)
 
         # Remove items from list where action != "PutParameter"
-        items = list(filter(lambda x: x["action"] == "PutParameter", items))
-
-        results = sorted(RestoreConfig.convert_to_model(items), key=lambda x: x.ps_time, reverse=True)
-
-        if 'LastEvaluatedKey' in result:
-            results = results + self.get_parameter_restore_details(ps_name, start_key=result['LastEvaluatedKey'])
+        items = [item for item in items if item["action"] == "PutParameter"]
 
         # Convert to RestoreConfig model then sort list chronologically by timestamp
-        return results
+        return sorted(RestoreConfig.convert_to_model(items), key=lambda x: x.ps_time, reverse=True)
 
+    @Metrics.timed('audit.get_all_parameter_history')
     def get_all_parameter_history(self, ps_time: datetime.datetime, ps_prefix: str) -> List[RestoreConfig]:
         """
         Scans in DynamoDb only do 1MB at at time. For large tables, we need to tell dynamo to KEEP_SCANNING. After each
@@ -59,21 +68,16 @@ class AuditDao:
         Args:
             ps_time: Time up to which parameter history should be returned.
             ps_prefix: e.g. /shared/some/prefix - Prefix to query under
-            start_key: LastEvaluatedKey returned in scan results. Lets you konw if there is more scanning that can be done.
         Returns: List[RestoreConfig] mapped from histories
         """
         time_end = Decimal(ps_time.timestamp() * 1000)
         filter_exp = Key(AUDIT_TIME_KEY_NAME).lt(time_end) & Key(AUDIT_PARAMETER_KEY_NAME).begins_with(ps_prefix)
 
-        result = self._audit_table.scan(FilterExpression=filter_exp)
-        items = result.get('Items', [])
-
-        while 'LastEvaluatedKey' in result:
-            result = self._audit_table.scan(FilterExpression=filter_exp, ExclusiveStartKey=result['LastEvaluatedKey'])
-            items = items + result.get('Items', [])
+        items = self.__scan(FilterExpression=filter_exp, transform=self.__decoder().decode_all).all()
 
         return RestoreConfig.convert_to_model(items)
 
+    @Metrics.timed('audit.get_parameter_history_before_time')
     def get_parameter_history_before_time(self, ps_time: datetime.datetime, ps_prefix: str) -> PSHistory:
         """
         Retrieves total parameter history for all parameters up until the datetime passed in under the provided prefix.
@@ -96,6 +100,27 @@ class AuditDao:
 
         return PSHistory(list(ps_histories.values()))
 
+    @Metrics.timed('audit.get_columnar_history_before_time')
+    def get_columnar_history_before_time(self, ps_time: datetime.datetime, ps_prefix: str) -> ColumnarPSHistory:
+        """
+        Memory efficient alternative to get_parameter_history_before_time for large prefixes. Scanned pages are
+        streamed straight into a ColumnarHistory instead of being mapped to RestoreConfigs.
+        Args:
+            ps_time: Time up to which parameter history should be returned.
+            ps_prefix: e.g. /shared/some/prefix - Prefix to query under
+
+        Returns: ColumnarPSHistory - a PSHistory compatible view over the columnar store.
+        """
+        time_end = Decimal(ps_time.timestamp() * 1000)
+        filter_exp = Key(AUDIT_TIME_KEY_NAME).lt(time_end) & Key(AUDIT_PARAMETER_KEY_NAME).begins_with(ps_prefix)
+        store = ColumnarHistory(self._symbols)
+
+        for items in self.__scan(FilterExpression=filter_exp).pages():
+            store.add_items(items)
+
+        return store.ps_history()
+
+    @Metrics.timed('audit.get_parameter_restore_range')
     def get_parameter_restore_range(self, ps_time: datetime.datetime, ps_prefix: str) \
             -> List[RestoreConfig]:
         """
@@ -109,19 +134,18 @@ class AuditDao:
         filter_exp = Key(AUDIT_TIME_KEY_NAME).lt(time_end) & Key(AUDIT_PARAMETER_KEY_NAME).begins_with(ps_prefix) \
                      & Attr(AUDIT_ACTION_ATTR_NAME).eq(SSM_PUT)
 
-        result = self._audit_table.scan(FilterExpression=filter_exp)
-        items = list(filter(lambda x: x["action"] == "PutParameter", result.get('Items', [])))
-
-        while 'LastEvaluatedKey' in result:
-            result = self._audit_table.scan(FilterExpression=filter_exp, ExclusiveStartKey=result['LastEvaluatedKey'])
-            items = items + list(filter(lambda x: x["action"] == "PutParameter", result.get('Items', [])))
+        items = self.__scan(FilterExpression=filter_exp, transform=self.__decoder().decode_all)
+        items = [item for item in items if item["action"] == "PutParameter"]
 
         return sorted(RestoreConfig.convert_to_model(items), key=lambda x: x.ps_time, reverse=True)
 
-    def get_audit_logs(self, ps_name: str, before: Optional[int] = None, after: Optional[int] = None) -> List[AuditLog]:
+    @Metrics.timed('audit.get_audit_logs')
+    def get_audit_logs(self, ps_name: str, before: Optional[int] = None, after: Optional[int] = None,
+                       validate: bool = True) -> List[AuditLog]:
         """
         Args:
             ps_name: /path/to/parameter to query audit logs for.
+            validate: If False, return unvalidated AuditLogRecords instead of AuditLogs. Much faster for bulk reads.
 
         Returns: List[AuditLog]. Logs that match for the /ps/name in ParameterStore.
         """
@@ -134,16 +158,11 @@ class AuditDao:
         elif after and not before:
             key_expr = key_expr & Key(AUDIT_TIME_KEY_NAME).gt(after)
 
-        result = self._audit_table.query(KeyConditionExpression=key_expr)
-        items = result.get('Items', [])
-
-        audit_logs: List[AuditLog] = []
-        for item in items:
-            log = AuditLog(**item)
-            audit_logs.append(log)
+        items = self.__query(KeyConditionExpression=key_expr, transform=self.__decoder().decode_all).all()
 
-        return audit_logs
+        return self.__to_logs(items, validate)
 
+    @Metrics.timed('audit.get_log')
     def get_log(self, ps_name: str, time: int) -> Optional[AuditLog]:
         """
         Returns the matching audit log for the Parameter name & time -- must match the EXACT time
@@ -159,6 +178,7 @@ class AuditDao:
         else:
             return None
 
+    @Metrics.timed('audit.get_deleted_value')
     def get_deleted_value(self, parameter_name: str, time: int) -> Optional[str]:
         """
         Find the value that was deleted by a delete action for an AuditLog
@@ -172,6 +192,7 @@ class AuditDao:
         else:
             return None
 
+    @Metrics.timed('audit.get_put_log_before')
     def get_put_log_before(self, parameter_name: str, time: int) -> Optional[AuditLog]:
         """
         Returns the latest PUT log for a parameter before specified time.
@@ -186,107 +207,220 @@ class AuditDao:
         else:
             return None
 
+    @Metrics.timed('audit.find_logs')
     def find_logs(self, filter: str = None, parameter_type: str = None,
                   before: int = None, after: int = None, action: str = None, latest: bool = False,
-                  segment: int = 0, total_segments: int = 1) -> List[AuditLog]:
+                  segment: int = 0, total_segments: int = 1, validate: bool = True) -> List[AuditLog]:
+        items = None
+        if total_segments == 1:
+            items = self.__find_indexed(filter, parameter_type, before, after, action, max_workers=1)
 
-        if action:
-            filter_exp = Attr(AUDIT_ACTION_ATTR_NAME).eq(action)
+        if items is None:
+            filter_exp = self.__find_logs_filter(filter, parameter_type, before, after, action)
+            items = self.__scan(FilterExpression=filter_exp, segment=segment, total_segments=total_segments,
+                                transform=self.__decoder().decode_all).all()
+
+        if latest:
+            return self.__get_latest_audit_logs(items, validate)
         else:
-            filter_exp = (Attr(AUDIT_ACTION_ATTR_NAME).eq(SSM_PUT) | Attr(AUDIT_ACTION_ATTR_NAME).eq(SSM_DELETE))
+            return self.__to_logs(items, validate)
 
-        if parameter_type:
-            filter_exp = filter_exp & Attr(AUDIT_PARAMETER_ATTR_TYPE).eq(parameter_type)
+    @Metrics.timed('audit.find_logs_parallel')
+    def find_logs_parallel(self, threads: int, filter: str = None, parameter_type: str = None,
+                           before: int = None, after: int = None, action: str = None, latest: bool = False,
+                           validate: bool = True) -> List[AuditLog]:
+        log.info(f'Executing parallel scan across {threads} threads.')
+        log.info(f'Inputs: Filter: {filter}, param_type: {parameter_type}, before: {before} after: {after}')
 
-        if filter:
-            filter_exp = filter_exp & (Attr(AUDIT_PARAMETER_KEY_NAME).contains(filter) |
-                                       Attr(AUDIT_PARAMETER_ATTR_USER).contains(filter))
+        items = self.__find_indexed(filter, parameter_type, before, after, action, max_workers=threads)
+        if items is None:
+            filter_exp = self.__find_logs_filter(filter, parameter_type, before, after, action)
+            items = self.__scan(FilterExpression=filter_exp, total_segments=threads,
+                                transform=self.__decoder().decode_all).all()
 
-        if before:
-            filter_exp = filter_exp & (Attr(AUDIT_TIME_KEY_NAME).lt(int(before)))
+        if latest:
+            return self.__get_latest_audit_logs(items, validate)
+        else:
+            return self.__to_logs(items, validate)
+
+    def find_logs_paginator(self, filter: str = None, parameter_type: str = None, before: int = None,
+                            after: int = None, action: str = None, total_segments: int = 1, prefetch: int = 0,
+                            checkpoint: str = None, validate: bool = True) -> Paginator:
+        """
+        Streaming, resumable version of find_logs for very large audit tables. Logs are hydrated a page at a time
+        as the returned Paginator is iterated. Save `paginator.checkpoint()` as you go, and pass it back in as
+        `checkpoint`, with the same filters, to resume an interrupted scan instead of restarting it.
+        Args:
+            total_segments: Parallel scan segments, each read on its own thread.
+            prefetch: Pages to read ahead of the consumer, per segment.
+            checkpoint: Checkpoint from a previous paginator with the same inputs.
+
+        Returns: Paginator yielding AuditLogs, or AuditLogRecords if validate = False.
+        """
+        decoder = self.__decoder()
+        filter_exp = self.__find_logs_filter(filter, parameter_type, before, after, action)
+
+        return self.__scan(FilterExpression=filter_exp, total_segments=total_segments, prefetch=prefetch,
+                           checkpoint=checkpoint,
+                           transform=lambda items: self.__to_logs(decoder.decode_all(items), validate))
+
+    def find_history_paginator(self, ps_prefix: str, after: int = None, before: int = None,
+                               total_segments: int = 1, checkpoint: str = None) -> Paginator:
+        """
+        Streams every PutParameter / DeleteParameter under `ps_prefix` within an optional time range, e.g. to
+        incrementally build a local index from only the audit entries written since the last sync. The prefix and
+        time range are scan filters: the whole table is read (and billed) whatever range is asked for.
+        Args:
+            ps_prefix: e.g. /shared/some/prefix - Prefix to read history under
+            after: Only entries after this time, in millis since epoch.
+            before: Only entries before this time, in millis since epoch.
+            total_segments: Parallel scan segments, each read on its own thread.
+            checkpoint: Checkpoint from a previous paginator with the same inputs.
+
+        Returns: Paginator yielding RestoreConfigs
+        """
+        filter_exp = Attr(AUDIT_PARAMETER_KEY_NAME).begins_with(ps_prefix) \
+            & (Attr(AUDIT_ACTION_ATTR_NAME).eq(SSM_PUT) | Attr(AUDIT_ACTION_ATTR_NAME).eq(SSM_DELETE))
 
         if after:
             filter_exp = filter_exp & Attr(AUDIT_TIME_KEY_NAME).gt(int(after))
 
-        response = self._audit_table.scan(
-            FilterExpression=filter_exp,
-            Segment=segment,
-            TotalSegments=total_segments
-        )
+        if before:
+            filter_exp = filter_exp & Attr(AUDIT_TIME_KEY_NAME).lt(int(before))
 
-        items = response.get('Items', [])
+        decoder = self.__decoder()
+        return self.__scan(FilterExpression=filter_exp, total_segments=total_segments, checkpoint=checkpoint,
+                           transform=lambda items: RestoreConfig.convert_to_model(decoder.decode_all(items)))
 
-        while 'LastEvaluatedKey' in response:
-            response = self._audit_table.scan(ExclusiveStartKey=response['LastEvaluatedKey'],
-                                              FilterExpression=filter_exp,
-                                              Segment=segment,
-                                              TotalSegments=total_segments)
+    @Metrics.timed('audit.find_by_user')
+    def find_by_user(self, user: str, latest=False, validate: bool = True):
+        """
+        Find all logs associated with user, if latest = True, only return the latest
+        log for each parameter. If validate = False, unvalidated AuditLogRecords are returned.
+        """
 
-            items = items + response.get('Items', [])
+        key_expr = Key(AUDIT_PARAMETER_ATTR_USER).eq(user) & Key(AUDIT_TIME_KEY_NAME).gt(0)
+
+        items = self.__query(IndexName=AUDIT_IDX_USER_ID, KeyConditionExpression=key_expr,
+                             transform=self.__decoder().decode_all).all()
 
         if latest:
-            return self.__get_latest_audit_logs(items)
+            return self.__get_latest_audit_logs(items, validate)
         else:
-            return [AuditLog(**item) for item in items]
+            return self.__to_logs(items, validate)
 
-    def find_logs_parallel(self, threads: int, filter: str = None, parameter_type: str = None,
-                           before: int = None, after: int = None, action: str = None, latest: bool = False) -> List[AuditLog]:
-        futures, all_logs = [], []
-        log.info(f'Executing parallel scan across {threads} threads.')
-        log.info(f'Inputs: Filter: {filter}, param_type: {parameter_type}, before: {before} after: {after}')
+    def __find_indexed(self, filter: Optional[str], parameter_type: Optional[str], before: Optional[int],
+                       after: Optional[int], action: Optional[str], max_workers: int) -> Optional[List[Dict]]:
+        # Resolves a filtered search to one query per matching name / user. None if a scan is needed instead, e.g.
+        # while the index hasn't been synced and would report no candidates, or for actions it doesn't index.
+        if not filter or self._search_index is None or not self._search_index.is_synced('audit'):
+            return None
 
-        with ThreadPool(processes=threads) as pool:
-            for i in range(0, threads):
-                thread = pool.apply_async(self.find_logs, args=(filter, parameter_type, before,
-                                                                after, action, latest, i, threads))
-                futures.append(thread)
+        if action not in (None, SSM_PUT, SSM_DELETE):
+            return None
 
-            for future in futures:
-                all_logs = all_logs + future.get()
+        candidates = self._search_index.candidates(filter)
+        if candidates is None:
+            return None
 
-            pool.close()  # shouldn't be necessary but I'm getting open files errors and troubleshooting.
+        if self.__empty_range(before, after):
+            return []
 
-        return all_logs
+        names, users = candidates
+        time_cond = self.__time_condition(before, after)
+        filter_exp = self.__find_logs_filter(None, parameter_type, None, None, action)
+        decoder = self.__decoder()
 
-    def find_by_user(self, user: str, latest=False):
-        """
-        Find all logs associated with user, if latest = True, only return the latest
-        log for each parameter.
-        """
+        def by_name(name: str) -> List[Dict]:
+            key_exp = Key(AUDIT_PARAMETER_KEY_NAME).eq(name)
+            key_exp = key_exp & time_cond if time_cond is not None else key_exp
+            return self.__query(KeyConditionExpression=key_exp, FilterExpression=filter_exp,
+                                transform=decoder.decode_all).all()
 
-        key_expr = Key(AUDIT_PARAMETER_ATTR_USER).eq(user) & Key(AUDIT_TIME_KEY_NAME).gt(0)
+        def by_user(user: str) -> List[Dict]:
+            key_exp = Key(AUDIT_PARAMETER_ATTR_USER).eq(user) & (time_cond if time_cond is not None
+                                                                  else Key(AUDIT_TIME_KEY_NAME).gt(0))
+            return self.__query(IndexName=AUDIT_IDX_USER_ID, KeyConditionExpression=key_exp,
+                                FilterExpression=filter_exp, transform=decoder.decode_all).all()
 
-        response = self._audit_table.query(
-            IndexName=AUDIT_IDX_USER_ID,
-            KeyConditionExpression=key_expr,
-        )
+        calls = [(by_name, name) for name in names] + [(by_user, user) for user in users]
+        with ThreadPoolExecutor(max_workers=max(max_workers, 1)) as pool:
+            pages = list(pool.map(lambda call: call[0](call[1]), calls))
 
-        items = response.get('Items', [])
+        # A log can match on both its name and its user.
+        unique: Dict = {}
+        for items in pages:
+            for item in items:
+                unique[(item[AUDIT_PARAMETER_KEY_NAME], item[AUDIT_TIME_KEY_NAME])] = item
 
-        while 'LastEvaluatedKey' in response:
-            response = self._audit_table.query(ExclusiveStartKey=response['LastEvaluatedKey'],
-                                              IndexName=AUDIT_IDX_USER_ID,
-                                              KeyConditionExpression=key_expr)
-            items = items + response.get('Items', [])
+        log.info(f"Resolved filter '{filter}' to {len(calls)} targeted queries instead of a scan.")
+        return list(unique.values())
 
-        if latest:
-            return self.__get_latest_audit_logs(items)
+    def __scan(self, **kwargs) -> Paginator:
+        return Paginator.scan(self._audit_table, rate_limiter=self._read_limiter, **kwargs)
+
+    def __query(self, **kwargs) -> Paginator:
+        return Paginator.query(self._audit_table, rate_limiter=self._read_limiter, **kwargs)
+
+    def __decoder(self) -> ItemDecoder:
+        return ItemDecoder(AUDIT_INTERNED_ATTRS, self._symbols)
+
+    @staticmethod
+    def __find_logs_filter(filter: Optional[str], parameter_type: Optional[str], before: Optional[int],
+                           after: Optional[int], action: Optional[str]):
+        if action:
+            filter_exp = Attr(AUDIT_ACTION_ATTR_NAME).eq(action)
         else:
+            filter_exp = (Attr(AUDIT_ACTION_ATTR_NAME).eq(SSM_PUT) | Attr(AUDIT_ACTION_ATTR_NAME).eq(SSM_DELETE))
+
+        if parameter_type:
+            filter_exp = filter_exp & Attr(AUDIT_PARAMETER_ATTR_TYPE).eq(parameter_type)
+
+        if filter:
+            filter_exp = filter_exp & (Attr(AUDIT_PARAMETER_KEY_NAME).contains(filter) |
+                                       Attr(AUDIT_PARAMETER_ATTR_USER).contains(filter))
+
+        if before:
+            filter_exp = filter_exp & (Attr(AUDIT_TIME_KEY_NAME).lt(int(before)))
+
+        if after:
+            filter_exp = filter_exp & Attr(AUDIT_TIME_KEY_NAME).gt(int(after))
+
+        return filter_exp
+
+    @staticmethod
+    def __empty_range(before: Optional[int], after: Optional[int]) -> bool:
+        # No time fits strictly between the bounds, DynamoDB would reject the inverted BETWEEN __time_condition builds.
+        return bool(before and after) and int(before) - int(after) < 2
+
+    @staticmethod
+    def __time_condition(before: Optional[int], after: Optional[int]):
+        # Same bounds as __find_logs_filter (both exclusive), as a sort key condition. Check __empty_range first.
+        if before and after:
+            return Key(AUDIT_TIME_KEY_NAME).between(int(after) + 1, int(before) - 1)
+        elif before:
+            return Key(AUDIT_TIME_KEY_NAME).lt(int(before))
+        elif after:
+            return Key(AUDIT_TIME_KEY_NAME).gt(int(after))
+
+        return None
+
+    @staticmethod
+    def __to_logs(items: List[Dict], validate: bool) -> List[AuditLog]:
+        if validate:
             return [AuditLog(**item) for item in items]
+        else:
+            return [AuditLogRecord.from_item(item) for item in items]
 
     @staticmethod
-    def __get_latest_audit_logs(items: Dict) -> List[AuditLog]:
-        logs: Dict[str, List[AuditLog]] = {}
+    def __get_latest_audit_logs(items: List[Dict], validate: bool = True) -> List[AuditLog]:
+        latest: Dict[str, Dict] = {}
 
-        # Add to dict so we can sort to find latest of each type of config
+        # Only hydrate the latest item for each config, rather than every item we scanned.
         for item in items:
             name = item.get(AUDIT_PARAMETER_KEY_NAME)
-            new_item = AuditLog(**item)
-            logs[name] = logs.get(name) + [new_item] if logs.get(name) else [new_item]
-
-        # Sort, latest log should be at position 0
-        for key, value in logs.items():
-            logs[key] = sorted(value, reverse=True)
+            current = latest.get(name)
+            if current is None or item[AUDIT_TIME_KEY_NAME] > current[AUDIT_TIME_KEY_NAME]:
+                latest[name] = item
 
-        # return latest items
-        return [logs[key][0] for key, value in logs.items()]
+        return AuditDao.__to_logs(list(latest.values()), validate)
@@ -1,11 +1,15 @@
 import logging
-import time
 from typing import Set, List
 
 from boto3.dynamodb.conditions import Attr
 
 from figgy.constants.data import *
+from figgy.data.paginator import Paginator
 from figgy.data.models.config_item import ConfigItem
+from figgy.models.records import ConfigItemRecord
+from figgy.utils.metrics import Metrics
+from figgy.utils.rate_limiter import CapacityLimiter
+from figgy.utils.symbols import SymbolTable, ItemDecoder
 
 log = logging.getLogger(__name__)
 
@@ -17,21 +21,31 @@ class ConfigDao:
     3) Cache table.
     """
 
-    def __init__(self, dynamo_resource):
+    def __init__(self, dynamo_resource, symbol_table: SymbolTable = None, read_limiter: CapacityLimiter = None):
+        """
+        Args:
+            dynamo_resource: boto3 DynamoDB resource
+            symbol_table: Optional SymbolTable shared by all queries. By default each query interns repeated strings
+            through its own table.
+            read_limiter: Optional read capacity budget for this DAO's scans and queries. Share one limiter between
+            DAOs / processes reading the same table to enforce a single budget.
+        """
         self._dynamo_resource = dynamo_resource
-        self._cache_table = self._dynamo_resource.Table(CACHE_TABLE_NAME)
+        self._cache_table = Metrics.instrument(self._dynamo_resource.Table(CACHE_TABLE_NAME), 'dynamodb')
+        self._symbols = symbol_table
+        self._read_limiter = read_limiter
 
+    @Metrics.timed('config.get_all_config_names')
     def get_all_config_names(self, prefix: str = None,
                              exclude_prefixes=None,
-                             one_level: bool = False,
-                             start_key: str = None) -> Set[str]:
+                             one_level: bool = False) -> Set[str]:
         """
         Retrieve all key names from the Dynamo DB config-cache table in each account. Much more efficient than
         querying SSM directly.
         Args:
-            start_key: Optional: Is used for recursive paginated lookups to get the full data set. This should not
-            be passed in by the user.
+            prefix: Optional: Only return names under this prefix
             exclude_prefixes: configs with these prefixes will be excluded from results
+            one_level: Only return names one level below `prefix`
         Returns:
 
         """
@@ -39,89 +53,74 @@ class ConfigDao:
         if exclude_prefixes is None:
             exclude_prefixes = ['/figgy']
 
-        start_time = time.time()
-        if start_key:
-            log.info(f"Recursively scanning with start key: {start_key}")
-            result = self._cache_table.scan(ExclusiveStartKey=start_key)
-        else:
-            result = self._cache_table.scan()
-
-        configs: Set[str] = set()
-        if "Items" in result and len(result['Items']) > 0:
-            for item in result['Items']:
-                name = item[CACHE_PARAMETER_KEY_NAME]
-                configs.add(name)
+        # Only the key is needed, projecting it keeps pages small.
+        pages = self.__scan(ProjectionExpression=CACHE_PARAMETER_KEY_NAME).pages()
+        configs: Set[str] = {item[CACHE_PARAMETER_KEY_NAME] for items in pages for item in items}
 
         if prefix:
             configs = set(filter(lambda x: x.startswith(prefix), configs))
 
         if exclude_prefixes:
-            for excluded_prefix in exclude_prefixes:
-                configs = set(filter(lambda x: not x.name.startswith(excluded_prefix), configs))
+            excluded = tuple(exclude_prefixes)
+            configs = set(filter(lambda x: not x.startswith(excluded), configs))
 
         if one_level:
             configs = set(filter(lambda x: len(x.split('/')) == len(prefix.split('/')) + 1, configs))
 
-        if 'LastEvaluatedKey' in result:
-            configs = configs | self.get_all_config_names(prefix, exclude_prefix, one_level,
-                                                          start_key=result['LastEvaluatedKey'])
-
-        log.info(
-            f"Returning config names from dynamo cache after: {time.time() - start_time} "
-            f"seconds with {len(configs)} configs.")
+        log.info(f"Returning {len(configs)} config names from dynamo cache.")
         return configs
 
-    def get_config_names_after(self, millis_since_epoch: int, exclude_prefixes=None) -> Set[ConfigItem]:
+    @Metrics.timed('config.get_config_names_after')
+    def get_config_names_after(self, millis_since_epoch: int, exclude_prefixes=None, validate: bool = True,
+                               read_limiter: CapacityLimiter = None) -> Set[ConfigItem]:
         """
         Retrieve all key names from the Dynamo DB config-cache table in each account. Much more efficient than
         querying SSM directly.
+
+        The cache table has no index on last_updated, so this is a full table scan filtered on it: it reads (and is
+        billed for) every entry no matter how few match. Only the three attributes needed are projected, and reads
+        are paced by `read_limiter` if one is set.
         Args:
             millis_since_epoch: milliseconds in epoch to lookup config names from cache after
             exclude_prefixes: configs with these prefixes will be excluded from results
+            validate: If False, return unvalidated ConfigItemRecords instead of ConfigItems.
+            read_limiter: Optional read capacity budget for this scan, defaults to the DAO's read_limiter.
         Returns: Set[str] -> configs that have been added to cache table after millis_since_epoch
         """
 
         if exclude_prefixes is None:
             exclude_prefixes = ['/figgy']
 
-        request = {
-            'attribute_names': {
-                '#n1': CACHE_LAST_UPDATED_KEY_NAME
-            },
-            'attribute_values': {
-                ':v1': {'N': millis_since_epoch}
-            },
-            'expression': Attr(CACHE_LAST_UPDATED_KEY_NAME).gt(millis_since_epoch)
-        }
-
-        start_time = time.time()
-        response = self._cache_table.scan(
-            FilterExpression=request['expression']
-        )
-
-        items = response.get('Items', [])
-
-        while 'LastEvaluatedKey' in response:
-            response = self._cache_table.scan(ExclusiveStartKey=response['LastEvaluatedKey'])
-            items = items + response.get('Items', [])
+        filter_exp = Attr(CACHE_LAST_UPDATED_KEY_NAME).gt(millis_since_epoch)
+        decoder = ItemDecoder(CACHE_INTERNED_ATTRS, self._symbols)
+        # `state` is a reserved word, every projected attribute goes through a placeholder.
+        items = Paginator.scan(self._cache_table, rate_limiter=read_limiter or self._read_limiter,
+                               FilterExpression=filter_exp, transform=decoder.decode_all,
+                               ProjectionExpression='#name, #state, #updated',
+                               ExpressionAttributeNames={'#name': CACHE_PARAMETER_KEY_NAME,
+                                                         '#state': CACHE_STATE_ATTR_NAME,
+                                                         '#updated': CACHE_LAST_UPDATED_KEY_NAME})
 
         configs: Set[ConfigItem] = set()
 
         for item in items:
-            configs.add(ConfigItem(**item))
+            configs.add(ConfigItem(**item) if validate else ConfigItemRecord.from_item(item))
 
         if exclude_prefixes:
             for excluded_prefix in exclude_prefixes:
                 configs = set(filter(lambda x: not x.name.startswith(excluded_prefix), configs))
 
-        log.info(f"Returning {len(configs)} parameter names from dynamo cache after time: [{millis_since_epoch}] in "
-                 f"{time.time() - start_time} seconds.")
+        log.info(f"Returning {len(configs)} parameter names from dynamo cache after time: [{millis_since_epoch}]")
 
         return configs
 
+    @Metrics.timed('config.put_in_config_cache')
     def put_in_config_cache(self, name):
         item = {
             CACHE_PARAMETER_KEY_NAME: name
         }
 
         self._cache_table.put_item(Item=item)
+
+    def __scan(self, **kwargs) -> Paginator:
+        return Paginator.scan(self._cache_table, rate_limiter=self._read_limiter, **kwargs)
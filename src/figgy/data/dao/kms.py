@@ -1,33 +1,77 @@
 import logging
 import base64
-from typing import Dict
+import json
+import os
+import random
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
 
 from figgy.constants.data import ENCRYPTION_CONTEXT_ENCRYPTOR_KEY, ENCRYPTION_CONTEXT_PASSWORD_KEY, \
-    ENCRYPTION_CONTEXT_ENCRYPTOR_DEFAULT_VALUE
+    ENCRYPTION_CONTEXT_ENCRYPTOR_DEFAULT_VALUE, ENVELOPE_HEADER, ENVELOPE_NONCE_BYTES, ENVELOPE_DATA_KEY_SPEC
+from figgy.utils.cache import PlaintextCache, DataKeyCache
+from figgy.utils.metrics import Metrics
+from figgy.utils.utils import Utils, BACKOFF, MAX_RETRIES
 
 log = logging.getLogger(__name__)
 
 
 class KmsDao:
 
-    def __init__(self, boto_kms_client):
-        self._kms = boto_kms_client
+    def __init__(self, boto_kms_client, cache: PlaintextCache = None, data_key_cache: DataKeyCache = None):
+        """
+        Args:
+            boto_kms_client: boto3 KMS client
+            cache: Optional PlaintextCache. If provided, decrypted values are cached & reused until they expire.
+            data_key_cache: Bounds how long / how often envelope data keys are reused. Defaults to DataKeyCache().
+        """
+        self._kms = Metrics.instrument(boto_kms_client, 'kms')
+        self._cache = cache
+        self._data_keys = data_key_cache if data_key_cache is not None else DataKeyCache()
 
+    @Metrics.timed('kms.decrypt')
     def decrypt(self, base64_ciphertext, encryption_password=None):
-        ciphertext = base64.b64decode(base64_ciphertext)
         context = None
 
         if encryption_password:
             context = self.__build_context(encryption_password)
 
-        return self._kms.decrypt(CiphertextBlob=ciphertext, EncryptionContext=context)[u"Plaintext"].decode()
+        return self.__decrypt(base64.b64decode(base64_ciphertext), context)
 
+    @Metrics.timed('kms.decrypt_with_context')
     def decrypt_with_context(self, base64_ciphertext, context: Dict):
-        ciphertext = base64.b64decode(base64_ciphertext)
-        return self._kms.decrypt(
-            CiphertextBlob=ciphertext,
-            EncryptionContext=context)[u"Plaintext"].decode()
+        return self.__decrypt(base64.b64decode(base64_ciphertext), context)
 
+    @Metrics.timed('kms.decrypt_many')
+    def decrypt_many(self, base64_ciphertexts: List[str], encryption_password: str = None,
+                     context: Dict = None, max_workers: int = 10) -> List[str]:
+        """
+        Decrypts many values concurrently. Duplicate ciphertexts are only decrypted once, and throttled requests are
+        retried with jittered exponential back off.
+        Args:
+            base64_ciphertexts: Base64 encoded ciphertexts to decrypt
+            encryption_password: Optional password the values were encrypted with, mutually exclusive with `context`
+            context: Optional explicit encryption context
+            max_workers: Max concurrent KMS decrypt calls
+
+        Returns: List[str] - plaintexts, in the same order as `base64_ciphertexts`
+        """
+        Utils.validate(not (encryption_password and context),
+                       "Only one of encryption_password or context may be provided.")
+
+        if encryption_password:
+            context = self.__build_context(encryption_password)
+
+        unique = list(dict.fromkeys(base64_ciphertexts))
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            plaintexts = dict(zip(unique, pool.map(
+                lambda ciphertext: self.__decrypt(base64.b64decode(ciphertext), context, retry_throttles=True),
+                unique)))
+
+        return [plaintexts[ciphertext] for ciphertext in base64_ciphertexts]
+
+    @Metrics.timed('kms.encrypt')
     def encrypt(self, key_id: str, value: str, encryption_password: str = None) -> bytes:
         response = self._kms.encrypt(
             KeyId=key_id,
@@ -42,6 +86,110 @@ class KmsDao:
 
         return cipher_text
 
+    @Metrics.timed('kms.encrypt_envelope')
+    def encrypt_envelope(self, key_id: str, value: str, encryption_password: str = None) -> bytes:
+        """
+        Encrypts locally with a cached KMS data key (AES-256-GCM). The data key, wrapped by `key_id` under the same
+        encryptor / password encryption context `encrypt` uses, is stored in front of the ciphertext so the value
+        can be decrypted with `decrypt` / `decrypt_with_context` like any other ciphertext. Bulk encryption only calls
+        KMS each time the cached data key hits its use or age limit, and values are not limited to 4KB.
+
+        Returns: bytes - envelope of header + wrapped data key + nonce + ciphertext
+        """
+        aes = self.__aes_gcm()
+        context = self.__envelope_context(encryption_password)
+        cache_key = PlaintextCache.key(key_id.encode(), context)
+
+        data_key = self._data_keys.checkout(cache_key)
+        if data_key is None:
+            response = self._kms.generate_data_key(KeyId=key_id, KeySpec=ENVELOPE_DATA_KEY_SPEC,
+                                                   EncryptionContext=context)
+            data_key = response['Plaintext'], response['CiphertextBlob']
+            self._data_keys.put(cache_key, *data_key)
+
+        plaintext_key, wrapped_key = data_key
+        nonce = os.urandom(ENVELOPE_NONCE_BYTES)
+        cipher_text = aes(plaintext_key).encrypt(nonce, value.encode(), self.__aad(context))
+
+        return ENVELOPE_HEADER + struct.pack('>H', len(wrapped_key)) + wrapped_key + nonce + cipher_text
+
+    def __decrypt(self, ciphertext: bytes, context: Optional[Dict], retry_throttles: bool = False) -> str:
+        cache_key = None
+        if self._cache is not None:
+            cache_key = PlaintextCache.key(ciphertext, context)
+            cached = self._cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        if ciphertext.startswith(ENVELOPE_HEADER):
+            plaintext = self.__decrypt_envelope(ciphertext, context, retry_throttles)
+        else:
+            plaintext = self.__kms_decrypt(ciphertext, context, retry_throttles)
+
+        if cache_key is not None:
+            self._cache.put(cache_key, plaintext)
+
+        return plaintext.decode()
+
+    def __decrypt_envelope(self, envelope: bytes, context: Optional[Dict], retry_throttles: bool) -> bytes:
+        aes = self.__aes_gcm()
+        context = context if context else self.__envelope_context(None)
+
+        offset = len(ENVELOPE_HEADER)
+        (key_length,) = struct.unpack_from('>H', envelope, offset)
+        offset += 2
+        wrapped_key = envelope[offset:offset + key_length]
+        offset += key_length
+        nonce, cipher_text = envelope[offset:offset + ENVELOPE_NONCE_BYTES], envelope[offset + ENVELOPE_NONCE_BYTES:]
+
+        cache_key = PlaintextCache.key(wrapped_key, context)
+        data_key = self._data_keys.get_unwrapped(cache_key)
+        if data_key is None:
+            data_key = self.__kms_decrypt(wrapped_key, context, retry_throttles)
+            self._data_keys.put_unwrapped(cache_key, data_key)
+
+        return aes(data_key).decrypt(nonce, cipher_text, self.__aad(context))
+
+    def __kms_decrypt(self, ciphertext: bytes, context: Optional[Dict], retry_throttles: bool) -> bytes:
+        kwargs = {'CiphertextBlob': ciphertext}
+        if context:
+            kwargs['EncryptionContext'] = context
+
+        retries = 0
+        while True:
+            try:
+                return self._kms.decrypt(**kwargs)[u"Plaintext"]
+            except Exception as e:
+                if not retry_throttles or not Utils.is_throttled(e) or retries >= MAX_RETRIES:
+                    raise
+
+                retries += 1
+                Utils.count_retry(Metrics.current_operation() or 'kms.decrypt', throttled=True)
+                log.info(f"KMS decrypt throttled, retry {retries} of {MAX_RETRIES}.")
+                time.sleep(BACKOFF * (2 ** retries) * random.random())
+
+    @staticmethod
+    def __aes_gcm():
+        # Optional dependency, only needed (and imported) for envelope encryption.
+        try:
+            from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+        except ImportError:
+            raise ImportError("Envelope encryption requires the `cryptography` package. "
+                              "Install it with: pip install figgy-lib[envelope]")
+        return AESGCM
+
+    @staticmethod
+    def __aad(context: Dict) -> bytes:
+        return json.dumps(context, sort_keys=True).encode()
+
+    @staticmethod
+    def __envelope_context(encryption_password: Optional[str]) -> Dict:
+        context = {ENCRYPTION_CONTEXT_ENCRYPTOR_KEY: ENCRYPTION_CONTEXT_ENCRYPTOR_DEFAULT_VALUE}
+        if encryption_password:
+            context[ENCRYPTION_CONTEXT_PASSWORD_KEY] = encryption_password
+
+        return context
+
     @staticmethod
     def __build_context(encryption_password: str):
         return {
@@ -1,27 +1,43 @@
 import time
 import logging
 
-from typing import List, Optional
+from typing import List, Optional, Dict
 
 from boto3.dynamodb.conditions import Attr, Key
 
 from figgy.constants.data import *
+from figgy.data.paginator import Paginator
 from figgy.models.replication_config import ReplicationConfig
+from figgy.utils.cache import NegativeCache
+from figgy.utils.metrics import Metrics, NEGATIVE_HITS
+from figgy.utils.single_flight import SingleFlight
+from figgy.utils.utils import Utils, BACKOFF, MAX_RETRIES
 
 log = logging.getLogger(__name__)
 
 
 class ReplicationDao:
+    batch_write_size = 25  # Max items per BatchWriteItem according to api docs.
+    batch_get_size = 100  # Max keys per BatchGetItem according to api docs.
 
-    def __init__(self, dynamo_resource):
-        self._dynamo_resource = dynamo_resource
-        self._config_repl_table = self._dynamo_resource.Table(REPL_TABLE_NAME)
+    def __init__(self, dynamo_resource, negative_cache: NegativeCache = None):
+        """
+        Args:
+            dynamo_resource: boto3 DynamoDB resource
+            negative_cache: Optional NegativeCache. If provided, destinations without a replication config are
+            reported as such without another query until they expire or are written through this DAO.
+        """
+        self._dynamo_resource = Metrics.instrument(dynamo_resource, 'dynamodb')
+        self._config_repl_table = Metrics.instrument(dynamo_resource.Table(REPL_TABLE_NAME), 'dynamodb')
+        self._flight = SingleFlight()
+        self._missing = negative_cache
 
-    def get_all_configs(self, namespace: str, start_key: str = None) -> List[ReplicationConfig]:
+    @Metrics.timed('replication.get_all_configs')
+    def get_all_configs(self, namespace: str, validate: bool = True) -> List[ReplicationConfig]:
         """
         Retrieves all replication configs from the database for a particular namespace
         Args:
-            start_key: LastEvaluatedKey returned in scan results. Lets you konw if there is more scanning that can be done.
+            validate: If False, configs are built with the trusted ReplicationConfig.from_item fast path.
             namespace: namespace  - e.g. /app/demo-time/
 
         Returns:
@@ -29,38 +45,29 @@ class ReplicationDao:
 
         """
         filter_exp = Attr(REPL_NAMESPACE_ATTR_NAME).eq(namespace)
+        return Paginator.scan(self._config_repl_table, FilterExpression=filter_exp,
+                              transform=lambda items: self.__map_results(items, validate)).all()
 
-        result = self._config_repl_table.scan(FilterExpression=filter_exp)
-        configs = [ReplicationConfig(**item) for item in result.get('Items', [])]
-
-        while 'LastEvaluatedKey' in result:
-            result = self._config_repl_table.scan(FilterExpression=filter_exp, ExclusiveStartKey=start_key)
-            configs = configs + [ReplicationConfig(**item) for item in result.get('Items', [])]
-
-        return configs
-
-    def get_cfgs_by_src(self, source: str) -> List[ReplicationConfig]:
+    @Metrics.timed('replication.get_cfgs_by_src')
+    def get_cfgs_by_src(self, source: str, validate: bool = True) -> List[ReplicationConfig]:
         """
         Args:
             source: Source to perform table scan by
+            validate: If False, configs are built with the trusted ReplicationConfig.from_item fast path.
 
         Returns: A list of matching replication confgs.
         """
-        start_time = time.time()
         filter_exp = Attr(REPL_SOURCE_ATTR_NAME).eq(source)
-        response = self._config_repl_table.scan(FilterExpression=filter_exp)
-        configs: List[ReplicationConfig] = self.__map_results(response)
-
-        while 'LastEvaluatedKey' in response:
-            response = self._config_repl_table.scan(FilterExpression=filter_exp,
-                                                    ExclusiveStartKey=response['LastEvaluatedKey'])
-            configs = configs + self.__map_results(response)
+        configs: List[ReplicationConfig] = Paginator.scan(
+            self._config_repl_table, FilterExpression=filter_exp,
+            transform=lambda items: self.__map_results(items, validate)).all()
 
-        log.info(f"Returning {len(configs)} parameter names from dynamo cache after "
-                 f"{time.time() - start_time} seconds.")
+        log.info(f"Returning {len(configs)} replication configs for source: {source}")
 
         return configs
 
+    @Metrics.timed('replication.get_config_repl')
+    @SingleFlight.collapse('replication.get_config_repl', tag='destination')
     def get_config_repl(self, destination: str) -> Optional[ReplicationConfig]:
         """
         Lookup a replication config by destination
@@ -69,7 +76,11 @@ class ReplicationDao:
 
         Returns: Matching replication config, or None if none match.
         """
+        if self._missing is not None and self._missing.is_missing(destination):
+            Metrics.count('replication.get_config_repl', NEGATIVE_HITS)
+            return None
 
+        generation = self._missing.generation if self._missing is not None else None
         filter_exp = Key(REPL_DEST_KEY_NAME).eq(destination)
         result = self._config_repl_table.query(KeyConditionExpression=filter_exp)
 
@@ -77,35 +88,53 @@ class ReplicationDao:
             item = result["Items"][0]
             return ReplicationConfig(**item)
         else:
+            if self._missing is not None:
+                self._missing.add(destination, generation)
             return None
 
+    @Metrics.timed('replication.put_config_repl')
     def put_config_repl(self, config: ReplicationConfig) -> None:
         """
         Stores a replication configuration
         Args:
             config: ReplicationConfig -> a hydrated replication config object.
         """
-        item = config.dict()
-        item[REPL_RUN_ENV_KEY_NAME] = item['run_env']['env']  # Convert env to str for ddb model format.
-
-        self._config_repl_table.put_item(Item=item)
+        self._config_repl_table.put_item(Item=self.__to_item(config))
+        self.__written([config.destination])
 
-    def __map_results(self, result: dict) -> List[ReplicationConfig]:
+    @Metrics.timed('replication.put_config_repls')
+    def put_config_repls(self, configs: List[ReplicationConfig]) -> List[ReplicationConfig]:
         """
-        Takes a DDB Result object with a single result and maps it into a replication config
+        Stores many replication configurations using batch writes. Configs identical to what is already stored are
+        skipped.
         Args:
-            result: DDB boto3 result obj
+            configs: List[ReplicationConfig] -> hydrated replication configs, e.g. from ReplicationConfig.from_dict
+
+        Returns: List[ReplicationConfig] - the configs that were actually written.
+        """
+        # Later configs for the same destination win, as they would with sequential put_config_repl calls.
+        by_dest: Dict[str, ReplicationConfig] = {cfg.destination: cfg for cfg in configs}
+        existing = self.__batch_get(list(by_dest.keys()))
+
+        changed = [cfg for dest, cfg in by_dest.items() if not self.__is_same(existing.get(dest), cfg)]
+        log.info(f"Writing {len(changed)} of {len(by_dest)} replication configs, the rest are unchanged.")
 
-        Returns: ReplicationConfig if result is found, else and empty list
+        self.__batch_write([{'PutRequest': {'Item': self.__to_item(cfg)}} for cfg in changed])
+        self.__written(list(by_dest))
+        return changed
 
+    @staticmethod
+    def __map_results(items: List[Dict], validate: bool = True) -> List[ReplicationConfig]:
         """
-        repl_cfgs = []
-        if "Items" in result and len(result["Items"]) > 0:
-            for item in result["Items"]:
-                repl_cfgs.append(ReplicationConfig(**item))
+        Maps the items of a single DDB result page into replication configs
+        Args:
+            items: Items of a DDB boto3 result page
 
-        return repl_cfgs
+        Returns: List of ReplicationConfigs, empty if there are no items
+        """
+        return [ReplicationConfig(**item) if validate else ReplicationConfig.from_item(item) for item in items]
 
+    @Metrics.timed('replication.delete_config')
     def delete_config(self, destination: str) -> None:
         """
         Deletes a Replication configuration from the DB
@@ -114,4 +143,90 @@ class ReplicationDao:
         """
         self._config_repl_table.delete_item(
             Key={REPL_DEST_KEY_NAME: destination}
-        )
\ No newline at end of file
+        )
+        self.__written([destination])
+
+    @Metrics.timed('replication.delete_configs')
+    def delete_configs(self, destinations: List[str]) -> List[str]:
+        """
+        Deletes many Replication configurations using batch writes. Destinations that have no stored config are
+        skipped.
+        Args:
+            destinations: List[str] -> /path/to/configuration/destinations
+
+        Returns: List[str] - the destinations that were actually deleted.
+        """
+        existing = self.__batch_get(list(set(destinations)))
+        deleted = list(existing.keys())
+
+        self.__batch_write([{'DeleteRequest': {'Key': {REPL_DEST_KEY_NAME: dest}}} for dest in deleted])
+        self.__written(deleted)
+        return deleted
+
+    def __batch_get(self, destinations: List[str]) -> Dict[str, Dict]:
+        """
+        Fetches stored items for destinations, retrying any unprocessed keys.
+        Returns: Dict[destination, stored item] for destinations that exist.
+        """
+        items: Dict[str, Dict] = {}
+
+        for chunk in Utils.chunk_list(destinations, self.batch_get_size):
+            request = {REPL_TABLE_NAME: {'Keys': [{REPL_DEST_KEY_NAME: dest} for dest in chunk]}}
+            retries = 0
+
+            while request:
+                result = self._dynamo_resource.batch_get_item(RequestItems=request)
+                for item in result.get('Responses', {}).get(REPL_TABLE_NAME, []):
+                    items[item[REPL_DEST_KEY_NAME]] = item
+
+                request = result.get('UnprocessedKeys')
+                if request:
+                    retries = self.__backoff(retries, 'BatchGetItem')
+
+        return items
+
+    def __batch_write(self, requests: List[Dict]) -> None:
+        """
+        Executes Put/Delete requests in batches of 25, retrying any unprocessed items.
+        """
+        for chunk in Utils.chunk_list(requests, self.batch_write_size):
+            request = {REPL_TABLE_NAME: chunk}
+            retries = 0
+
+            while request:
+                result = self._dynamo_resource.batch_write_item(RequestItems=request)
+                request = result.get('UnprocessedItems')
+                if request:
+                    retries = self.__backoff(retries, 'BatchWriteItem')
+
+    def __written(self, destinations: List[str]) -> None:
+        # Lookups already in flight may predate the write, later lookups mustn't join them.
+        for destination in destinations:
+            self._flight.forget(destination)
+            if self._missing is not None:
+                self._missing.discard(destination)
+
+    @staticmethod
+    def __backoff(retries: int, operation: str) -> int:
+        if retries >= MAX_RETRIES:
+            raise Exception(f"{operation} against {REPL_TABLE_NAME} still has unprocessed items after "
+                            f"{retries} retries.")
+
+        retries += 1
+        Utils.count_retry(Metrics.current_operation() or f'replication.{operation}', throttled=True)
+        time.sleep(retries * BACKOFF)
+        return retries
+
+    @staticmethod
+    def __to_item(config: ReplicationConfig) -> Dict:
+        item = config.dict()
+        item[REPL_RUN_ENV_KEY_NAME] = item['run_env']['env']  # Convert env to str for ddb model format.
+        return item
+
+    @staticmethod
+    def __is_same(item: Optional[Dict], config: ReplicationConfig) -> bool:
+        if not item:
+            return False
+
+        stored = ReplicationConfig(**item)
+        return stored == config and stored.namespace == config.namespace and stored.run_env == config.run_env
\ No newline at end of file
@@ -7,6 +7,9 @@ from typing import Tuple
 from botocore.exceptions import ClientError
 
 from figgy.constants.data import SSM_SECURE_STRING, SSM_INTELLIGENT_TIERING, SSM_STRING
+from figgy.utils.cache import NegativeCache
+from figgy.utils.metrics import Metrics, NEGATIVE_HITS
+from figgy.utils.single_flight import SingleFlight
 from figgy.utils.utils import Utils
 
 log = logging.getLogger(__name__)
@@ -18,36 +21,53 @@ class SsmDao:
     """
     max_results = 50  # This is the max according to api docs.
 
-    def __init__(self, boto_ssm_client):
-        self._ssm = boto_ssm_client
+    def __init__(self, boto_ssm_client, negative_cache: NegativeCache = None):
+        """
+        Args:
+            boto_ssm_client: boto3 SSM client
+            negative_cache: Optional NegativeCache. If provided, parameters found missing are reported missing without
+            another SSM call until they expire or are written through this DAO.
+        """
+        self._ssm = Metrics.instrument(boto_ssm_client, 'ssm')
+        self._flight = SingleFlight()
+        self._missing = negative_cache
 
+    @Metrics.timed('ssm.get_parameter_values')
     @Utils.retry
-    def get_parameter_values(self, parameters: List[str], decrypt: bool = False) -> List[Dict]:
+    def get_parameter_values(self, parameters: List[str], decrypt: bool = False, max_workers: int = 1) -> List[Dict]:
         """
         Queries values for a series of parameters, and decrypts SecureStrings if requested.
         Args:
             parameters: List[str]: Parameter names to query values for.
             decrypt: bool: True/False - Attempt to decrypt values during query.
+            max_workers: int: Number of batches of 10 to fetch concurrently.
 
         Returns: List[Dict] - List of Dictionaries container parameter data
         """
         results = []  # type: List[Dict]
-        chunks = Utils.chunk_list(parameters, 10)
-        for chunk in chunks:
-            result = self._ssm.get_parameters(Names=chunk, WithDecryption=decrypt)
+        chunks = list(Utils.chunk_list(parameters, 10))
+
+        if max_workers > 1 and len(chunks) > 1:
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                pages = list(pool.map(lambda chunk: self._ssm.get_parameters(Names=chunk, WithDecryption=decrypt),
+                                      chunks))
+        else:
+            pages = [self._ssm.get_parameters(Names=chunk, WithDecryption=decrypt) for chunk in chunks]
+
+        for result in pages:
             if 'Parameters' in result:
-                results = results + result['Parameters']
+                results.extend(result['Parameters'])
 
         return results
 
+    @Metrics.timed('ssm.get_all_parameters')
     @Utils.retry
     def get_all_parameters(self, prefixes: List[str], option: str = 'Recursive', page: str = None) -> List[dict]:
         """
-        Returns all parameters under prefix. Automatically pages recursively then returns full result set
+        Returns all parameters under prefix. Automatically pages through then returns full result set
         Args:
             prefixes: List of prefixes to query. E.G. [ '/shared', '/data', '/app' ]
-            existing_params: Used in recursive calls to build a total result set
-            page: Used in recursive calls if more pages exist.
+            page: Optional NextToken to start paging from.
             option: Must be 'Recursive' or 'OneLevel' - Indicates # of levels below the prefix to recurse.
         Returns: List[dict] -> Parameter details as returned from AWS API
 
@@ -58,20 +78,41 @@ class SsmDao:
                       'Values': prefixes
                   },
         total_params = []
-        if page:
-            params = self._ssm.describe_parameters(ParameterFilters=filters, NextToken=page,
-                                                   MaxResults=self.max_results)
-        else:
-            params = self._ssm.describe_parameters(ParameterFilters=filters, MaxResults=self.max_results)
+        while True:
+            if page:
+                params = self._ssm.describe_parameters(ParameterFilters=filters, NextToken=page,
+                                                       MaxResults=self.max_results)
+            else:
+                params = self._ssm.describe_parameters(ParameterFilters=filters, MaxResults=self.max_results)
 
-            Utils.validate(params and 'Parameters' in params,
-                           f"Failed to lookup parameters with prefix: {prefixes}")
-        total_params = total_params + params['Parameters']
+            Utils.validate(params and 'Parameters' in params, f"Failed to lookup parameters with prefix: {prefixes}")
+            total_params.extend(params['Parameters'])
 
-        if params and 'NextToken' in params:
-            total_params = total_params + self.get_all_parameters(prefixes, option=option, page=params['NextToken'])
+            page = params.get('NextToken')
+            if not page:
+                return total_params
+
+    @Metrics.timed('ssm.get_parameter_metadata')
+    @Utils.retry
+    def get_parameter_metadata(self, names: List[str], max_workers: int = 1) -> List[Dict]:
+        """
+        Describes many parameters by name, up to 50 names per describe_parameters call. Metadata is for the latest
+        version of each parameter and never includes its value.
+        Args:
+            names: List[str]: Parameter names to describe. Names that don't exist are skipped.
+            max_workers: int: Number of batches of 50 to describe concurrently.
 
-        return total_params
+        Returns: List[Dict] - Parameter metadata as returned by describe_parameters
+        """
+        chunks = list(Utils.chunk_list(list(dict.fromkeys(names)), self.max_results))
+
+        if max_workers > 1 and len(chunks) > 1:
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                pages = list(pool.map(self.__describe_names, chunks))
+        else:
+            pages = [self.__describe_names(chunk) for chunk in chunks]
+
+        return [param for page in pages for param in page]
 
     # @Utils.retry
     # def get_parameter_details(self, name: str) -> Dict:
@@ -101,6 +142,7 @@ class SsmDao:
     #
     #     return {}
 
+    @Metrics.timed('ssm.get_parameter_with_description')
     @Utils.retry
     def get_parameter_with_description(self, name: str) -> Tuple[Optional[str], Optional[str]]:
         """
@@ -116,6 +158,7 @@ class SsmDao:
         param, latest_version = self.get_parameter_details(name)
         return param.get('Value'), param.get('Description')
 
+    @Metrics.timed('ssm.get_description')
     @Utils.retry
     def get_description(self, name: str) -> Union[str, None]:
         """
@@ -127,6 +170,7 @@ class SsmDao:
         value, desc = self.get_parameter_with_description(name)
         return desc
 
+    @Metrics.timed('ssm.get_all_param_names_fast')
     @Utils.retry
     def get_all_param_names_fast(self, prefixes: List[str], submitted_prefixes: set = None, page: str = None) -> set:
         """
@@ -184,6 +228,7 @@ class SsmDao:
 
         return all_names
 
+    @Metrics.timed('ssm.delete_parameter')
     @Utils.retry
     def delete_parameter(self, key) -> None:
         """
@@ -195,11 +240,14 @@ class SsmDao:
 
         """
         response = self._ssm.delete_parameter(Name=key)
+        self.__written(key)
         Utils.validate(
             response and response['ResponseMetadata'] and response['ResponseMetadata']['HTTPStatusCode']
             and response['ResponseMetadata']['HTTPStatusCode'] == 200,
             f"Error deleting key: [{key}] from PS. Please try again.")
 
+    @Metrics.timed('ssm.get_parameter')
+    @SingleFlight.collapse('ssm.get_parameter', tag='key')
     @Utils.retry
     def get_parameter(self, key) -> Optional[str]:
         """
@@ -210,15 +258,21 @@ class SsmDao:
         Returns: str -> Parameter's value
 
         """
+        if self.__known_missing(key, 'ssm.get_parameter'):
+            return None
+
+        generation = self.__generation()
         try:
             parameter = self._ssm.get_parameter(Name=key, WithDecryption=True)
             return parameter['Parameter']['Value']
         except ClientError as e:
             if "ParameterNotFound" == e.response['Error']['Code']:
+                self.__not_found(key, generation)
                 return None
             else:
                 raise
 
+    @Metrics.timed('ssm.get_parameter_encrypted_by_version')
     @Utils.retry
     def get_parameter_encrypted_by_version(self, key: str, ps_version: int) -> Optional[str]:
         try:
@@ -239,6 +293,7 @@ class SsmDao:
             else:
                 raise
 
+    @Metrics.timed('ssm.get_parameter_encrypted')
     @Utils.retry
     def get_parameter_encrypted(self, key):
         """
@@ -249,15 +304,21 @@ class SsmDao:
         Returns: str -> encrypted string value of an encrypted parameter.
 
         """
+        if self.__known_missing(key, 'ssm.get_parameter_encrypted'):
+            return None
+
+        generation = self.__generation()
         try:
             parameter = self._ssm.get_parameter(Name=key, WithDecryption=False)
             return parameter['Parameter']['Value']
         except ClientError as e:
             if "ParameterNotFound" == e.response['Error']['Code']:
+                self.__not_found(key, generation)
                 return None
             else:
                 raise
 
+    @Metrics.timed('ssm.set_parameter')
     @Utils.retry
     def set_parameter(self, key, value, desc, type=None, key_id=None, policies: List[Dict] = None) -> None:
         """
@@ -321,12 +382,20 @@ class SsmDao:
                     Tier=SSM_INTELLIGENT_TIERING
                 )
 
+        self.__written(key)
+
+    @Metrics.timed('ssm.get_parameter_details')
+    @SingleFlight.collapse('ssm.get_parameter_details', tag='name')
     @Utils.retry
     def get_parameter_details(self, name: str, target_version: int = 0) -> Tuple[Dict, bool]:
         """
         Returns a hydrated parameter dictionary. See Dict format from: boto3.ssm.get_parameter_history
         """
         log.info(f"Getting parameter details for {name} and verison {target_version}")
+        if self.__known_missing(name, 'ssm.get_parameter_details'):
+            return {}, False
+
+        generation = self.__generation()
         try:
             next_token, result = True, {}
 
@@ -357,10 +426,48 @@ class SsmDao:
                     current_val = history[-1], True
                     return current_val
             else:
+                self.__not_found(name, generation)
                 return {}, False
 
         except ClientError as e:
             if "ParameterNotFound" == e.response['Error']['Code']:
+                self.__not_found(name, generation)
                 return {}, False
             else:
                 raise
+
+    def __describe_names(self, names: List[str]) -> List[Dict]:
+        filters = [{'Key': 'Name', 'Option': 'Equals', 'Values': names}]
+        results, token = [], None
+
+        while True:
+            if token:
+                page = self._ssm.describe_parameters(ParameterFilters=filters, MaxResults=self.max_results,
+                                                     NextToken=token)
+            else:
+                page = self._ssm.describe_parameters(ParameterFilters=filters, MaxResults=self.max_results)
+
+            results.extend(page.get('Parameters', []))
+            token = page.get('NextToken')
+            if not token:
+                return results
+
+    def __known_missing(self, name: str, operation: str) -> bool:
+        if self._missing is not None and self._missing.is_missing(name):
+            Metrics.count(operation, NEGATIVE_HITS)
+            return True
+
+        return False
+
+    def __generation(self) -> Optional[int]:
+        return self._missing.generation if self._missing is not None else None
+
+    def __not_found(self, name: str, generation: Optional[int]) -> None:
+        if self._missing is not None:
+            self._missing.add(name, generation)
+
+    def __written(self, name: str) -> None:
+        # Reads of `name` already in flight may predate the write, later reads mustn't join them.
+        self._flight.forget(name)
+        if self._missing is not None:
+            self._missing.discard(name)
@@ -0,0 +1,128 @@
+import logging
+import os
+import socket
+import threading
+from typing import Any, Dict, List, Optional
+
+from figgy.utils.cache_protocol import default_socket_path, encode, decode, error_from_dict, check_owner, check_peer
+
+log = logging.getLogger(__name__)
+
+
+class SsmDaoProxy:
+    """
+    Drop-in stand in for SsmDao that forwards every call to a local CacheDaemon over its unix socket, so all the
+    processes on a host share one cache and one set of SSM connections. Results and exceptions (including botocore
+    ClientErrors and their codes) come back as if SsmDao had been called directly, with the same types.
+
+    If the daemon can't be reached and a `fallback` SsmDao is provided, calls go straight to it instead. A socket that
+    isn't owned by, or served by a process of, the current user is never used.
+
+        ssm_dao = SsmDaoProxy.connect_or(SsmDao(ssm_client))    # Uses the daemon when one is running
+        fig_service = FigService(ssm_dao)
+    """
+
+    def __init__(self, socket_path: Optional[str] = None, timeout: float = 30, fallback=None):
+        """
+        Args:
+            socket_path: Daemon's socket, defaults to cache_protocol.default_socket_path()
+            timeout: Seconds to wait for a response
+            fallback: Optional SsmDao to call directly when the daemon is unavailable
+        """
+        self.socket_path = socket_path or default_socket_path()
+        self._timeout = timeout
+        self._fallback = fallback
+        self._local = threading.local()
+        self._connections: List[socket.socket] = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def connect_or(ssm_dao, socket_path: Optional[str] = None):
+        """
+        Returns: A proxy falling back to `ssm_dao` if a daemon socket owned by the current user exists, otherwise
+        `ssm_dao` itself.
+        """
+        socket_path = socket_path or default_socket_path()
+        if not os.path.exists(socket_path):
+            return ssm_dao
+
+        try:
+            check_owner(socket_path)
+        except PermissionError as e:
+            log.warning(f"Not using figgy cache daemon: {e}")
+            return ssm_dao
+
+        return SsmDaoProxy(socket_path, fallback=ssm_dao)
+
+    def __getattr__(self, op: str):
+        if op.startswith('_'):
+            raise AttributeError(op)
+
+        return lambda *args, **kwargs: self.__call(op, list(args), kwargs)
+
+    def close(self) -> None:
+        with self._lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections.clear()
+
+    def __call(self, op: str, args: List, kwargs: Dict) -> Any:
+        request = encode({'op': op, 'args': args, 'kwargs': kwargs})
+        try:
+            response = self.__send(request)
+        except OSError as e:
+            self.__disconnect()
+            if self._fallback is None:
+                raise
+
+            log.warning(f"Figgy cache daemon at {self.socket_path} is unavailable, calling SSM directly: {e}")
+            return getattr(self._fallback, op)(*args, **kwargs)
+
+        if not response['ok']:
+            raise error_from_dict(response['error'])
+
+        return response['result']
+
+    def __send(self, request: bytes) -> Dict:
+        # A connection that went stale since the last call gets one reconnect.
+        for attempt in range(2):
+            connection, reader = self.__connection()
+            try:
+                connection.sendall(request)
+                line = reader.readline()
+                if line:
+                    return decode(line)
+                raise ConnectionError('Cache daemon closed the connection.')
+            except OSError:
+                self.__disconnect()
+                if attempt:
+                    raise
+
+    def __connection(self):
+        if getattr(self._local, 'connection', None) is None:
+            connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            connection.settimeout(self._timeout)
+            try:
+                check_owner(self.socket_path)
+                connection.connect(self.socket_path)
+                check_peer(connection)
+            except OSError:
+                connection.close()
+                raise
+
+            self._local.connection, self._local.reader = connection, connection.makefile('rb')
+            with self._lock:
+                self._connections.append(connection)
+
+        return self._local.connection, self._local.reader
+
+    def __disconnect(self) -> None:
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            self._local.reader.close()
+            connection.close()
+            with self._lock:
+                if connection in self._connections:
+                    self._connections.remove(connection)
+
+        self._local.connection = self._local.reader = None
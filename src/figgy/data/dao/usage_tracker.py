@@ -1,21 +1,41 @@
 import logging
 import time
-from typing import List, Dict, Generator, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Generator, Iterable, Optional
 
 from boto3.dynamodb.conditions import Attr, Key
 
 from figgy.constants.data import *
+from figgy.data.index.search_index import SearchIndex
+from figgy.data.paginator import Paginator
+from figgy.models.records import UsageLogRecord
 from figgy.models.usage_log import UsageLog
+from figgy.utils.metrics import Metrics
+from figgy.utils.symbols import SymbolTable, ItemDecoder
 
 log = logging.getLogger(__name__)
 
 
 class UsageTrackerDao:
 
-    def __init__(self, dynamo_resource):
+    def __init__(self, dynamo_resource, symbol_table: SymbolTable = None, search_index: SearchIndex = None,
+                 max_workers: int = 10):
+        """
+        Args:
+            dynamo_resource: boto3 DynamoDB resource
+            symbol_table: Optional SymbolTable shared by all queries. By default each query interns repeated strings
+            through its own table.
+            search_index: Optional SearchIndex, kept current by the caller. Filtered find_logs_by_time searches then
+            query only the names / users matching the filter instead of every log in the time range.
+            max_workers: Number of concurrent targeted queries for indexed searches.
+        """
         self._dynamo_resource = dynamo_resource
-        self._table = self._dynamo_resource.Table(CONFIG_USAGE_TABLE_NAME)
+        self._table = Metrics.instrument(self._dynamo_resource.Table(CONFIG_USAGE_TABLE_NAME), 'dynamodb')
+        self._symbols = symbol_table
+        self._search_index = search_index
+        self._max_workers = max_workers
 
+    @Metrics.timed('usage.add_usage_log')
     def add_usage_log(self, parameter_name: str, user: str, timestamp: int = int(time.time() * 1000)):
         item = {
             CONFIG_USAGE_PARAMETER_KEY: parameter_name,
@@ -26,28 +46,20 @@ class UsageTrackerDao:
 
         self._table.put_item(Item=item)
 
-    def find_by_parameter(self, parameter: str) -> Iterable[UsageLog]:
+        if self._search_index is not None:
+            self._search_index.add_names([parameter_name])
+            self._search_index.add_users([user])
+
+    @Metrics.timed('usage.find_by_parameter')
+    def find_by_parameter(self, parameter: str, validate: bool = True) -> Iterable[UsageLog]:
         log.info(f'Finding usage logs for parameter: {parameter}')
         query_expr = Key(CONFIG_USAGE_PARAMETER_KEY).eq(parameter)
 
-        response = self._table.query(
-            KeyConditionExpression=query_expr,
-        )
-
-        items = response.get('Items', [])
-        usage_logs = [UsageLog(**item) for item in items]
-        for usage_log in usage_logs:
-            yield usage_log
-
-        while 'LastEvaluatedKey' in response:
-            response = self._table.query(ExclusiveStartKey=response['LastEvaluatedKey'],
-                                         KeyConditionExpression=query_expr)
-
-            items = items + response.get('Items', [])
-            for usage_log in [UsageLog(**item) for item in items]:
-                yield usage_log
+        yield from Paginator.query(self._table, KeyConditionExpression=query_expr,
+                                   transform=self.__transform(validate))
 
-    def find_logs_by_user(self, user: str, filter: str = None) -> Iterable[UsageLog]:
+    @Metrics.timed('usage.find_logs_by_user')
+    def find_logs_by_user(self, user: str, filter: str = None, validate: bool = True) -> Iterable[UsageLog]:
         log.info(f'Finding usage logs for user: {user}')
         query_expr = Key(CONFIG_USAGE_USER_KEY).eq(user) & Key(CONFIG_USAGE_LAST_UPDATED_KEY).gt(0)
         filter_expr = None
@@ -55,96 +67,118 @@ class UsageTrackerDao:
         if filter:
             filter_expr = Attr(CONFIG_USAGE_PARAMETER_KEY).contains(filter)
 
-        if filter_expr:
-            response = self._table.query(
-                IndexName=CONFIG_USAGE_USER_LAST_UPDATED_IDX,
-                KeyConditionExpression=query_expr,
-                FilterExpression=filter_expr
-            )
-        else:
-            response = self._table.query(
-                IndexName=CONFIG_USAGE_USER_LAST_UPDATED_IDX,
-                KeyConditionExpression=query_expr,
-            )
-
-        items = response.get('Items', [])
-        usage_logs = [UsageLog(**item) for item in items]
-        for usage_log in usage_logs:
-            yield usage_log
-
-        while 'LastEvaluatedKey' in response:
-            if filter_expr:
-                response = self._table.query(IndexName=CONFIG_USAGE_USER_LAST_UPDATED_IDX,
-                                             ExclusiveStartKey=response['LastEvaluatedKey'],
-                                             KeyConditionExpression=query_expr,
-                                             FilterExpression=filter_expr)
-            else:
-                response = self._table.query(IndexName=CONFIG_USAGE_USER_LAST_UPDATED_IDX,
-                                             ExclusiveStartKey=response['LastEvaluatedKey'],
-                                             KeyConditionExpression=query_expr)
-
-            items = items + response.get('Items', [])
-            for usage_log in [UsageLog(**item) for item in items]:
-                yield usage_log
+        yield from Paginator.query(self._table, IndexName=CONFIG_USAGE_USER_LAST_UPDATED_IDX,
+                                   KeyConditionExpression=query_expr, FilterExpression=filter_expr,
+                                   transform=self.__transform(validate))
 
+    @Metrics.timed('usage.find_logs_by_time')
     def find_logs_by_time(self, before: int = None, after: int = None, filter: str = None,
-                          latest_log_only=True, exclude_names: List[str] = None) -> Iterable[UsageLog]:
+                          latest_log_only=True, exclude_names: List[str] = None,
+                          validate: bool = True) -> Iterable[UsageLog]:
         """
         Yields UsageLogs incrementally as a Scan operation is completed. Yields occur incrementally
-        to reduce memory overhead.
+        to reduce memory overhead. If validate = False, unvalidated UsageLogRecords are yielded instead.
         """
 
         log.info(f'Inputs: before: {before} after: {after}')
+        if self.__empty_range(before, after):
+            return
+
+        indexed = self.__find_indexed(filter, before, after, validate)
+        if indexed is not None:
+            yield from self.__filter_names_from_logs(indexed, exclude_names)
+            return
+
         query_expr = Key(CONFIG_USAGE_EMPTY_IDX_KEY).eq(CONFIG_USAGE_EMPTY_IDX_VALUE)
         filter_exp = None
 
-        if before:
-            log.info(f"Adding before: {before}")
-            query_expr = query_expr & Key(CONFIG_USAGE_LAST_UPDATED_KEY).lt(before)
-
-        if after:
-            log.info(f"Adding after: {after}")
-            query_expr = query_expr & Key(CONFIG_USAGE_LAST_UPDATED_KEY).gt(after)
+        time_cond = self.__time_condition(before, after)
+        if time_cond is not None:
+            query_expr = query_expr & time_cond
 
         if filter:
             filter_exp = Attr(CONFIG_USAGE_PARAMETER_KEY).contains(filter) | \
                          Attr(CONFIG_USAGE_USER_KEY).contains(filter)
 
-        if filter_exp:
-            response = self._table.query(
-                IndexName=CONFIG_USAGE_LAST_UPDATED_ONLY_IDX,
-                KeyConditionExpression=query_expr,
-                FilterExpression=filter_exp
-            )
-        else:
-            response = self._table.query(
-                IndexName=CONFIG_USAGE_LAST_UPDATED_ONLY_IDX,
-                KeyConditionExpression=query_expr,
-            )
-
-        items = response.get('Items', [])
-        matching_logs = [UsageLog(**item) for item in items]
-        matching_logs = self.__filter_names_from_logs(matching_logs, exclude_names)
-        log.info(f'Yielding {matching_logs}')
-        for matching_log in matching_logs:
-            yield matching_log
-
-        while 'LastEvaluatedKey' in response:
-            if filter_exp:
-                response = self._table.query(IndexName=CONFIG_USAGE_LAST_UPDATED_ONLY_IDX,
-                                             ExclusiveStartKey=response['LastEvaluatedKey'],
-                                             KeyConditionExpression=query_expr,
-                                             FilterExpression=filter_exp)
-            else:
-                response = self._table.query(IndexName=CONFIG_USAGE_LAST_UPDATED_ONLY_IDX,
-                                             ExclusiveStartKey=response['LastEvaluatedKey'],
-                                             KeyConditionExpression=query_expr)
-
-            items = items + response.get('Items', [])
-            matching_logs = [UsageLog(**item) for item in items]
-            matching_logs = self.__filter_names_from_logs(matching_logs, exclude_names)
-            for matching_log in matching_logs:
-                yield matching_log
+        pages = Paginator.query(self._table, IndexName=CONFIG_USAGE_LAST_UPDATED_ONLY_IDX,
+                                KeyConditionExpression=query_expr, FilterExpression=filter_exp,
+                                transform=self.__transform(validate)).pages()
+
+        for matching_logs in pages:
+            yield from self.__filter_names_from_logs(matching_logs, exclude_names)
+
+    def __find_indexed(self, filter: Optional[str], before: Optional[int], after: Optional[int],
+                       validate: bool) -> Optional[List[UsageLog]]:
+        # Resolves a filtered search to one query per matching name / user. None if the time index is needed instead,
+        # e.g. while the index hasn't been synced and would report no candidates.
+        if not filter or self._search_index is None or not self._search_index.is_synced('usage'):
+            return None
+
+        candidates = self._search_index.candidates(filter)
+        if candidates is None:
+            return None
+
+        names, users = candidates
+        transform = self.__transform(False)
+
+        def by_name(name: str) -> List[UsageLogRecord]:
+            # last_updated isn't part of the table's key, bound it with a filter instead.
+            filter_exp = None
+            if before:
+                filter_exp = Attr(CONFIG_USAGE_LAST_UPDATED_KEY).lt(before)
+            if after:
+                after_exp = Attr(CONFIG_USAGE_LAST_UPDATED_KEY).gt(after)
+                filter_exp = filter_exp & after_exp if filter_exp is not None else after_exp
+
+            return Paginator.query(self._table, KeyConditionExpression=Key(CONFIG_USAGE_PARAMETER_KEY).eq(name),
+                                   FilterExpression=filter_exp, transform=transform).all()
+
+        def by_user(user: str) -> List[UsageLogRecord]:
+            time_cond = self.__time_condition(before, after)
+            time_cond = time_cond if time_cond is not None else Key(CONFIG_USAGE_LAST_UPDATED_KEY).gt(0)
+            return Paginator.query(self._table, IndexName=CONFIG_USAGE_USER_LAST_UPDATED_IDX,
+                                   KeyConditionExpression=Key(CONFIG_USAGE_USER_KEY).eq(user) & time_cond,
+                                   transform=transform).all()
+
+        calls = [(by_name, name) for name in names] + [(by_user, user) for user in users]
+        with ThreadPoolExecutor(max_workers=self._max_workers) as pool:
+            pages = list(pool.map(lambda call: call[0](call[1]), calls))
+
+        # A log can match on both its name and its user. Keep the time index's oldest first order.
+        unique = {(record.parameter_name, record.user): record for records in pages for record in records}
+        records = sorted(unique.values(), key=lambda record: record.last_updated)
+
+        log.info(f"Resolved filter '{filter}' to {len(calls)} targeted queries instead of a time index query.")
+        return [record.to_model() for record in records] if validate else records
+
+    def __decoder(self) -> ItemDecoder:
+        return ItemDecoder(CONFIG_USAGE_INTERNED_ATTRS, self._symbols)
+
+    def __transform(self, validate: bool):
+        decoder = self.__decoder()
+        return lambda items: [self.__to_log(item, validate) for item in decoder.decode_all(items)]
+
+    @staticmethod
+    def __empty_range(before: Optional[int], after: Optional[int]) -> bool:
+        # No time fits strictly between the bounds, DynamoDB would reject the inverted BETWEEN __time_condition builds.
+        return bool(before and after) and int(before) - int(after) < 2
+
+    @staticmethod
+    def __time_condition(before: Optional[int], after: Optional[int]):
+        # A query takes a single condition on the sort key, both bounds (exclusive) have to be one BETWEEN. Check
+        # __empty_range first.
+        if before and after:
+            return Key(CONFIG_USAGE_LAST_UPDATED_KEY).between(int(after) + 1, int(before) - 1)
+        elif before:
+            return Key(CONFIG_USAGE_LAST_UPDATED_KEY).lt(before)
+        elif after:
+            return Key(CONFIG_USAGE_LAST_UPDATED_KEY).gt(after)
+
+        return None
+
+    @staticmethod
+    def __to_log(item: Dict, validate: bool) -> UsageLog:
+        return UsageLog(**item) if validate else UsageLogRecord.from_item(item)
 
     def __filter_names_from_logs(self, logs: List[UsageLog], exclude_names: List[str]):
         if exclude_names:
@@ -2,6 +2,8 @@ import time
 from typing import Set
 
 from figgy.constants.data import *
+from figgy.data.paginator import Paginator
+from figgy.utils.metrics import Metrics
 
 
 class UserCacheDao:
@@ -11,8 +13,9 @@ class UserCacheDao:
 
     def __init__(self, dynamo_resource):
         self._dynamo_resource = dynamo_resource
-        self._table = self._dynamo_resource.Table(USER_CACHE_TABLE_NAME)
+        self._table = Metrics.instrument(self._dynamo_resource.Table(USER_CACHE_TABLE_NAME), 'dynamodb')
 
+    @Metrics.timed('user_cache.add_user_to_cache')
     def add_user_to_cache(self, name: str, state=USER_CACHE_STATE_ACTIVE, timestamp: int = 0):
         """
          Stores a user in the cache table.
@@ -31,18 +34,11 @@ class UserCacheDao:
 
         self._table.put_item(Item=item)
 
+    @Metrics.timed('user_cache.get_all_users')
     def get_all_users(self) -> Set[str]:
         """
         Select all user names from the user cache table.
         """
 
-        response = self._table.scan()
-
-        items = response.get('Items', [])
-        all_users = set([item.get('user_name') for item in items])
-
-        while 'LastEvaluatedKey' in response:
-            response = self._table.scan(ExclusiveStartKey=response['LastEvaluatedKey'])
-            all_users = all_users | set([item.get('user_name') for item in items])
-
-        return all_users
+        items = Paginator.scan(self._table, ProjectionExpression=USER_CACHE_PARAM_NAME_KEY)
+        return {item.get(USER_CACHE_PARAM_NAME_KEY) for item in items}
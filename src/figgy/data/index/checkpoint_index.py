@@ -0,0 +1,342 @@
+import datetime
+import logging
+import sqlite3
+import threading
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from figgy.constants.data import SSM_PUT, SSM_DELETE
+from figgy.models.parameter_history import ParameterHistory
+from figgy.models.parameter_store_history import PSHistory
+from figgy.models.restore_config import RestoreConfig
+from figgy.utils.metrics import Metrics
+
+log = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 1
+
+# Audit entries are written by an event driven lambda, stamped with the event's time, and may land minutes later.
+# By default every sync re-reads this far behind the last entry it saw. Re-read entries are de-duplicated on
+# (name, time).
+LATE_WRITE_MILLIS = 15 * 60 * 1000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    name TEXT NOT NULL, time INTEGER NOT NULL, action TEXT NOT NULL, type TEXT, key_id TEXT, description TEXT,
+    value TEXT, version TEXT, user TEXT,
+    PRIMARY KEY (name, time)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS events_by_time ON events (time, name);
+CREATE TABLE IF NOT EXISTS checkpoints (id INTEGER PRIMARY KEY, prefix TEXT NOT NULL, time INTEGER NOT NULL);
+CREATE INDEX IF NOT EXISTS checkpoints_by_prefix ON checkpoints (prefix, time);
+CREATE TABLE IF NOT EXISTS checkpoint_state (
+    checkpoint_id INTEGER NOT NULL, name TEXT NOT NULL, time INTEGER NOT NULL,
+    PRIMARY KEY (checkpoint_id, name)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS watermarks (prefix TEXT PRIMARY KEY, time INTEGER NOT NULL);
+"""
+
+_EVENT_COLUMNS = 'name, time, action, type, key_id, description, value, version, user'
+
+
+class CheckpointIndex:
+    """
+    Persistent local index of audit history that answers "what was <prefix> at time T" without scanning the audit
+    table.
+
+    Every audit entry under a synced prefix is stored once, keyed by (name, time), in a SQLite database. Each time
+    `checkpoint_every` new entries have been added for a prefix, the full state of that prefix (a pointer to the
+    latest PutParameter of every live parameter) is saved as a checkpoint. Reconstructing any prefix under a synced
+    one at any time reads the latest checkpoint before that time plus the few entries after it.
+
+    `sync()` only adds audit entries stamped after the previous sync, minus a `late_write_millis` re-read window for
+    entries the audit lambda records late. The audit table has no index on time though, so each sync is still a
+    full (filtered) scan of it: syncing saves transfer and local work, not read capacity, and should run on a
+    schedule rather than per lookup. An entry that lands more than `late_write_millis` after its time is missed by
+    incremental syncs, widen the window if the audit lambda can lag further. Entries that arrive late, behind an
+    existing checkpoint, invalidate the checkpoints after them, which are then rebuilt.
+
+    The database holds whatever the audit table holds, SecureString values included, so keep it where the audit table
+    could be read from.
+
+        index = CheckpointIndex('~/.figgy/history.db')
+        index.sync(audit_dao, '/app')
+        state = index.state_at('/app/demo-time', datetime.datetime(2021, 3, 1))
+        plan = restore_service.plan('/app/demo-time', ps_time, history=index.ps_history('/app/demo-time'))
+    """
+
+    def __init__(self, path: str = ':memory:', checkpoint_every: int = 1000,
+                 late_write_millis: int = LATE_WRITE_MILLIS):
+        """
+        Args:
+            path: SQLite database file, created if it doesn't exist. Defaults to an in-memory database.
+            checkpoint_every: Number of new audit entries for a prefix between checkpoints. Lower values make
+            reconstruction faster at the cost of a larger index.
+            late_write_millis: How far behind the last entry seen each sync re-reads, to pick up entries the audit
+            lambda recorded late.
+        """
+        if checkpoint_every < 1:
+            raise ValueError(f"checkpoint_every must be greater than 0, got: {checkpoint_every}")
+        if late_write_millis < 0:
+            raise ValueError(f"late_write_millis must not be negative, got: {late_write_millis}")
+
+        self._checkpoint_every = checkpoint_every
+        self._late_write_millis = late_write_millis
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._db:
+            version = self._db.execute('PRAGMA user_version').fetchone()[0]
+            if version not in (0, SCHEMA_VERSION):
+                raise ValueError(f"Unsupported checkpoint index schema version {version} in {path}.")
+
+            self._db.executescript(_SCHEMA)
+            self._db.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def __enter__(self) -> 'CheckpointIndex':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    @Metrics.timed('index.sync')
+    def sync(self, audit_dao, prefix: str, total_segments: int = 1) -> int:
+        """
+        Reads every audit entry under `prefix` stamped after the last sync of `prefix`, less `late_write_millis`,
+        adds the new ones to the index and checkpoints as needed. The first sync of a prefix reads its full history.
+        Either way the audit table is scanned in full, with the time range applied as a filter.
+        Args:
+            audit_dao: AuditDao to read entries with
+            prefix: e.g. /app - Prefix to index. Any prefix under it can then be reconstructed.
+            total_segments: Parallel scan segments, each read on its own thread.
+
+        Returns: Number of new entries added.
+        """
+        prefix = self.__normalize(prefix)
+        watermark = self.watermark(prefix)
+        after = watermark - self._late_write_millis if watermark else None
+        paginator = audit_dao.find_history_paginator(prefix, after=after, total_segments=total_segments)
+
+        added = 0
+        for page in paginator.pages():
+            added += self.add(prefix, page, checkpoint=False)
+
+        self.checkpoint(prefix)
+        log.info(f"Synced {added} new audit entries for {prefix} into the checkpoint index.")
+        return added
+
+    def add(self, prefix: str, configs: Iterable[RestoreConfig], checkpoint: bool = True) -> int:
+        """
+        Adds audit entries for `prefix` to the index, e.g. from the audit table's change stream. Entries already in
+        the index are ignored.
+        Args:
+            prefix: Synced prefix the entries belong to
+            configs: RestoreConfigs for PutParameter / DeleteParameter audit entries
+            checkpoint: Checkpoint `prefix` afterwards if enough new entries have been added.
+
+        Returns: Number of new entries added.
+        """
+        prefix = self.__normalize(prefix)
+        rows = [self.__row(cfg) for cfg in configs if cfg.ps_action in (SSM_PUT, SSM_DELETE)]
+
+        with self._lock, self._db:
+            before = self._db.total_changes
+            self._db.executemany(f'INSERT OR IGNORE INTO events ({_EVENT_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                                 rows)
+            added = self._db.total_changes - before
+
+            if rows:
+                latest = max(row[1] for row in rows)
+                self._db.execute('INSERT INTO watermarks (prefix, time) VALUES (?, ?) ON CONFLICT (prefix) DO UPDATE '
+                                 'SET time = MAX(time, excluded.time)', (prefix, latest))
+
+                # Checkpoints taken after a late entry don't include it, drop them so they are rebuilt.
+                earliest = min(row[1] for row in rows)
+                stale = [row[0] for row in self._db.execute('SELECT id FROM checkpoints WHERE time > ?', (earliest,))] \
+                    if added else []
+                if stale:
+                    log.info(f"Dropping {len(stale)} checkpoint(s) invalidated by late audit entries.")
+                    self._db.executemany('DELETE FROM checkpoint_state WHERE checkpoint_id = ?', [(i,) for i in stale])
+                    self._db.executemany('DELETE FROM checkpoints WHERE id = ?', [(i,) for i in stale])
+
+        if checkpoint and added:
+            self.checkpoint(prefix)
+
+        return added
+
+    @Metrics.timed('index.checkpoint')
+    def checkpoint(self, prefix: str) -> int:
+        """
+        Walks the entries for `prefix` added since its latest checkpoint, saving a checkpoint every
+        `checkpoint_every` entries.
+
+        Returns: Number of checkpoints saved.
+        """
+        prefix = self.__normalize(prefix)
+        with self._lock, self._db:
+            checkpoint_id, checkpoint_time = self.__latest_checkpoint([prefix], None)
+            state = self.__checkpoint_state(checkpoint_id, prefix)
+            pointers = {name: int(cfg.ps_time) for name, cfg in state.items()}
+
+            where, params = self.__name_range(prefix)
+            rows = self._db.execute(f'SELECT name, time, action FROM events WHERE time >= ? AND {where} '
+                                    f'ORDER BY time, name', [checkpoint_time or 0] + params).fetchall()
+
+            saved, since = 0, 0
+            for i, (name, time, action) in enumerate(rows):
+                if action == SSM_PUT:
+                    pointers[name] = time
+                else:
+                    pointers.pop(name, None)
+
+                # Checkpoints only land between two distinct times, so "every entry before the checkpoint" is exact.
+                since += 1
+                if since < self._checkpoint_every or (i + 1 < len(rows) and rows[i + 1][1] == time):
+                    continue
+
+                cursor = self._db.execute('INSERT INTO checkpoints (prefix, time) VALUES (?, ?)', (prefix, time + 1))
+                self._db.executemany('INSERT INTO checkpoint_state (checkpoint_id, name, time) VALUES (?, ?, ?)',
+                                     [(cursor.lastrowid, n, t) for n, t in pointers.items()])
+                saved, since = saved + 1, 0
+
+        return saved
+
+    def watermark(self, prefix: str) -> Optional[int]:
+        """
+        Returns: Time of the latest audit entry indexed for `prefix`, in millis since epoch. None if never synced.
+        """
+        with self._lock:
+            row = self._db.execute('SELECT time FROM watermarks WHERE prefix = ?',
+                                   (self.__normalize(prefix),)).fetchone()
+
+        return row[0] if row else None
+
+    @Metrics.timed('index.state_at')
+    def state_at(self, prefix: str, ps_time: datetime.datetime) -> Dict[str, RestoreConfig]:
+        """
+        Reconstructs every parameter under `prefix` at `ps_time`. `prefix` must be, or be under, a synced prefix.
+
+        Returns: Dict[str, RestoreConfig] - name -> latest PutParameter before `ps_time`, for each parameter whose
+        latest action before `ps_time` was not a delete. Same as PSHistory.state_at.
+        """
+        prefix = self.__normalize(prefix)
+        millis = int(ps_time.timestamp() * 1000)
+
+        with self._lock:
+            synced = self.__synced_prefixes(prefix)
+            if not synced:
+                raise ValueError(f"{prefix} isn't under any prefix in the checkpoint index, sync it first.")
+            if millis > max(self.watermark(p) or 0 for p in synced):
+                log.warning(f"{ps_time} is after the last sync of {prefix}, recent changes may be missing.")
+
+            checkpoint_id, checkpoint_time = self.__latest_checkpoint(synced, millis)
+            state = self.__checkpoint_state(checkpoint_id, prefix)
+
+            where, params = self.__name_range(prefix)
+            deltas = self._db.execute(f'SELECT {_EVENT_COLUMNS} FROM events WHERE time >= ? AND time < ? AND {where} '
+                                      f'ORDER BY time', [checkpoint_time or 0, millis] + params)
+            for row in deltas:
+                if row[2] == SSM_PUT:
+                    state[row[0]] = self.__config(row)
+                else:
+                    state.pop(row[0], None)
+
+        return state
+
+    def parameter_history(self, name: str) -> ParameterHistory:
+        """
+        Returns: Every indexed entry for the parameter `name`, in time order.
+        """
+        history = ParameterHistory()
+        with self._lock:
+            for row in self._db.execute(f'SELECT {_EVENT_COLUMNS} FROM events WHERE name = ? ORDER BY time', (name,)):
+                history.add(self.__config(row))
+
+        return history
+
+    def ps_history(self, prefix: str) -> 'IndexedPSHistory':
+        """
+        Returns: PSHistory view of `prefix` backed by this index, e.g. to pass to RestoreService.plan.
+        """
+        return IndexedPSHistory(self, self.__normalize(prefix))
+
+    def names(self, prefix: str) -> List[str]:
+        where, params = self.__name_range(self.__normalize(prefix))
+        with self._lock:
+            return [row[0] for row in self._db.execute(f'SELECT DISTINCT name FROM events WHERE {where} '
+                                                       f'ORDER BY name', params)]
+
+    def __synced_prefixes(self, prefix: str) -> List[str]:
+        return [p for (p,) in self._db.execute('SELECT prefix FROM watermarks')
+                if p == '' or prefix == p or prefix.startswith(p + '/')]
+
+    def __latest_checkpoint(self, prefixes: List[str], millis: Optional[int]) -> Tuple[Optional[int], Optional[int]]:
+        marks = ', '.join('?' * len(prefixes))
+        query = f'SELECT id, time FROM checkpoints WHERE prefix IN ({marks})'
+        params: List = list(prefixes)
+        if millis is not None:
+            query += ' AND time <= ?'
+            params.append(millis)
+
+        row = self._db.execute(query + ' ORDER BY time DESC LIMIT 1', params).fetchone()
+        return (row[0], row[1]) if row else (None, None)
+
+    def __checkpoint_state(self, checkpoint_id: Optional[int], prefix: str) -> Dict[str, RestoreConfig]:
+        if checkpoint_id is None:
+            return {}
+
+        where, params = self.__name_range(prefix, 'e.name')
+        rows = self._db.execute(f'SELECT {", ".join("e." + c.strip() for c in _EVENT_COLUMNS.split(","))} '
+                                f'FROM checkpoint_state s JOIN events e ON e.name = s.name AND e.time = s.time '
+                                f'WHERE s.checkpoint_id = ? AND {where}', [checkpoint_id] + params)
+        return {row[0]: self.__config(row) for row in rows}
+
+    @staticmethod
+    def __name_range(prefix: str, column: str = 'name') -> Tuple[str, List[str]]:
+        # Range over the prefix's subtree, '0' sorts right after '/', so this stays an index range scan.
+        if not prefix:
+            return '1 = 1', []
+
+        return f'({column} = ? OR ({column} >= ? AND {column} < ?))', [prefix, prefix + '/', prefix + '0']
+
+    @staticmethod
+    def __normalize(prefix: str) -> str:
+        return prefix.rstrip('/')
+
+    @staticmethod
+    def __row(cfg: RestoreConfig) -> Tuple:
+        return (cfg.ps_name, int(cfg.ps_time), cfg.ps_action, cfg.ps_type, cfg.ps_key_id, cfg.ps_description,
+                cfg.ps_value, cfg.ps_version, cfg.ps_user)
+
+    @staticmethod
+    def __config(row: Tuple) -> RestoreConfig:
+        name, time, action, type, key_id, description, value, version, user = row
+        return RestoreConfig(description, name, Decimal(time), type, key_id, value, version, user, action)
+
+
+class IndexedPSHistory(PSHistory):
+    """
+    PSHistory compatible view over a CheckpointIndex. `state_at` reads a checkpoint plus deltas, `history` is only
+    loaded from the index if it's accessed.
+    """
+
+    def __init__(self, index: CheckpointIndex, prefix: str):
+        self.index = index
+        self.prefix = prefix
+        self._history: Optional[Dict[str, ParameterHistory]] = None
+
+    @property
+    def history(self) -> Dict[str, ParameterHistory]:
+        if self._history is None:
+            self._history = {name: self.index.parameter_history(name) for name in self.index.names(self.prefix)}
+
+        return self._history
+
+    def state_at(self, ps_time: datetime.datetime) -> Dict[str, RestoreConfig]:
+        return self.index.state_at(self.prefix, ps_time)
+
+    def __str__(self):
+        return f"IndexedPSHistory(prefix={self.prefix})"
@@ -0,0 +1,213 @@
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from figgy.data.index.checkpoint_index import LATE_WRITE_MILLIS
+from figgy.utils.metrics import Metrics
+
+log = logging.getLogger(__name__)
+
+NAMES = 'names'
+USERS = 'users'
+DEFAULT_GRAM_SIZE = 3
+
+# Above this many matching names + users one query each costs more than a single scan, so DAOs fall back to scanning.
+MAX_TARGETED_QUERIES = 500
+
+
+class _GramIndex:
+    """
+    n-gram postings over a growing set of strings. Not thread-safe, SearchIndex locks around it.
+    """
+
+    def __init__(self, n: int):
+        self._n = n
+        self._ids: Dict[str, int] = {}
+        self._strings: List[str] = []
+        self._postings: Dict[str, Set[int]] = {}
+
+    def __len__(self):
+        return len(self._strings)
+
+    def add(self, value: str) -> bool:
+        if value in self._ids:
+            return False
+
+        value_id = self._ids[value] = len(self._strings)
+        self._strings.append(value)
+        for gram in self.__grams(value):
+            self._postings.setdefault(gram, set()).add(value_id)
+
+        return True
+
+    def search(self, substring: str) -> Set[str]:
+        if len(substring) < self._n:
+            # Too short to have a gram of its own, check the (local) vocabulary directly.
+            return {value for value in self._strings if substring in value}
+
+        postings = sorted((self._postings.get(gram, set()) for gram in self.__grams(substring)), key=len)
+        if not postings[0]:
+            return set()
+
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates &= posting
+            if not candidates:
+                return set()
+
+        # Grams can match out of order, confirm the substring is really there.
+        return {self._strings[i] for i in candidates if substring in self._strings[i]}
+
+    def __grams(self, value: str) -> Set[str]:
+        return {value[i:i + self._n] for i in range(len(value) - self._n + 1)}
+
+
+class SearchIndex:
+    """
+    Local n-gram index over every parameter name and user seen in the audit and usage tracker tables, so substring
+    searches (the `filter` of AuditDao.find_logs / UsageTrackerDao.find_logs_by_time) can be answered with one
+    targeted query per matching name / user instead of a full table scan.
+
+    The index must cover every name and user that could match, otherwise logs for the ones it hasn't seen are missed.
+    DAOs only use it for a table once `is_synced()` is True for it, i.e. after a full `sync_audit()` / `sync_usage()`,
+    and scan as before until then. Keep it current by re-syncing (only newer logs are read) or by feeding it from the
+    tables' change streams with `add_audit_logs()` / `add_usage_logs()`. Audit coverage is PutParameter /
+    DeleteParameter logs only, so AuditDao searches for any other action scan as well.
+
+        index = SearchIndex()
+        index.sync_audit(AuditDao(dynamo_resource))
+        audit_dao = AuditDao(dynamo_resource, search_index=index)
+        audit_dao.find_logs(filter='demo-time')    # Queries only partitions whose name / user contains 'demo-time'
+    """
+
+    def __init__(self, n: int = DEFAULT_GRAM_SIZE, late_write_millis: int = LATE_WRITE_MILLIS):
+        """
+        Args:
+            n: Gram length. Searches shorter than `n` fall back to checking every indexed string locally.
+            late_write_millis: How far behind the newest log seen each sync re-reads, to pick up logs recorded late.
+        """
+        if n < 1:
+            raise ValueError(f"n must be greater than 0, got: {n}")
+        if late_write_millis < 0:
+            raise ValueError(f"late_write_millis must not be negative, got: {late_write_millis}")
+
+        self._late_write_millis = late_write_millis
+
+        self._indexes = {NAMES: _GramIndex(n), USERS: _GramIndex(n)}
+        self._watermarks: Dict[str, int] = {}
+        self._synced: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def add_names(self, names: Iterable[str]) -> int:
+        return self.__add(NAMES, names)
+
+    def add_users(self, users: Iterable[str]) -> int:
+        return self.__add(USERS, users)
+
+    def add_audit_logs(self, logs: Iterable) -> int:
+        """
+        Indexes the parameter names and users of AuditLogs / AuditLogRecords, e.g. from the audit table's stream.
+
+        Returns: Number of new names and users.
+        """
+        return self.__add_logs('audit', logs, 'time')
+
+    def add_usage_logs(self, logs: Iterable) -> int:
+        """
+        Indexes the parameter names and users of UsageLogs / UsageLogRecords, e.g. from the usage table's stream.
+
+        Returns: Number of new names and users.
+        """
+        return self.__add_logs('usage', logs, 'last_updated')
+
+    @Metrics.timed('index.sync_audit')
+    def sync_audit(self, audit_dao, total_segments: int = 1) -> int:
+        """
+        Indexes names and users from every PutParameter / DeleteParameter audit log written since the last sync. The
+        first sync reads the whole table.
+
+        Returns: Number of new names and users.
+        """
+        after = self.__resync_after('audit')
+        paginator = audit_dao.find_logs_paginator(after=after, total_segments=total_segments, validate=False)
+        added = sum(self.add_audit_logs(page) for page in paginator.pages())
+        self._synced.add('audit')
+        return added
+
+    @Metrics.timed('index.sync_usage')
+    def sync_usage(self, usage_dao) -> int:
+        """
+        Indexes names and users from every usage log written since the last sync. Usage logs are queried by time, so
+        only newer logs are read.
+
+        Returns: Number of new names and users.
+        """
+        added = self.add_usage_logs(usage_dao.find_logs_by_time(after=self.__resync_after('usage'), validate=False))
+        self._synced.add('usage')
+        return added
+
+    def is_synced(self, source: str) -> bool:
+        """
+        Returns: True once `source` ('audit' or 'usage') has been fully synced, so the index covers every name and user
+        in it. Logs added with `add_audit_logs()` / `add_usage_logs()` alone don't count.
+        """
+        return source in self._synced
+
+    def watermark(self, source: str) -> Optional[int]:
+        """
+        Returns: Latest log time indexed from `source` ('audit' or 'usage'), in millis since epoch.
+        """
+        return self._watermarks.get(source)
+
+    def search_names(self, substring: str) -> Set[str]:
+        """
+        Returns: Every indexed parameter name containing `substring`.
+        """
+        with self._lock:
+            return self._indexes[NAMES].search(substring)
+
+    def search_users(self, substring: str) -> Set[str]:
+        """
+        Returns: Every indexed user containing `substring`.
+        """
+        with self._lock:
+            return self._indexes[USERS].search(substring)
+
+    def candidates(self, substring: str,
+                   max_queries: int = MAX_TARGETED_QUERIES) -> Optional[Tuple[Set[str], Set[str]]]:
+        """
+        Only names and users from the logs indexed so far are returned, callers must check `is_synced()` first and
+        only search actions that were indexed (PutParameter / DeleteParameter for audit logs).
+
+        Returns: (names, users) containing `substring`, or None if there are more than `max_queries` of them and a
+        scan would be cheaper than querying each.
+        """
+        names, users = self.search_names(substring), self.search_users(substring)
+        if len(names) + len(users) > max_queries:
+            log.info(f"{len(names) + len(users)} names / users match '{substring}', too many for targeted queries.")
+            return None
+
+        return names, users
+
+    def __len__(self):
+        return sum(len(index) for index in self._indexes.values())
+
+    def __add(self, kind: str, values: Iterable[str]) -> int:
+        with self._lock:
+            return sum(self._indexes[kind].add(value) for value in values if value)
+
+    def __add_logs(self, source: str, logs: Iterable, time_attr: str) -> int:
+        logs = list(logs)
+        added = self.add_names(entry.parameter_name for entry in logs) + self.add_users(entry.user for entry in logs)
+
+        times = [getattr(entry, time_attr) for entry in logs if getattr(entry, time_attr) is not None]
+        if times:
+            with self._lock:
+                self._watermarks[source] = max(self._watermarks.get(source) or 0, int(max(times)))
+
+        return added
+
+    def __resync_after(self, source: str) -> Optional[int]:
+        # Logs are stamped with the event's time and may land late, re-read behind the watermark.
+        watermark = self.watermark(source)
+        return watermark - self._late_write_millis if watermark else None
@@ -0,0 +1,307 @@
+import base64
+import json
+import logging
+import queue
+import threading
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from figgy.utils.metrics import Metrics
+from figgy.utils.rate_limiter import CapacityLimiter
+from figgy.utils.utils import Utils, MAX_RETRIES
+
+log = logging.getLogger(__name__)
+
+SCAN = 'scan'
+QUERY = 'query'
+CHECKPOINT_VERSION = 1
+
+_DONE = object()
+_POLL_SECONDS = .1
+
+
+class Paginator:
+    """
+    Pages through a DynamoDB Table scan or query, following LastEvaluatedKey until the result set is exhausted.
+
+    Scans can be split over `total_segments` parallel segments, each read on its own thread, and any paginator can
+    `prefetch` pages ahead of the consumer. Results are streamed page by page, so only the pages in flight are held in
+    memory. The position of every segment can be serialized with `checkpoint()` and passed back in to resume a long
+    scan where it stopped rather than from the start.
+
+    A checkpoint only moves past a page once the consumer has asked for the next one, so resuming re-reads at most the
+    page that was being processed when the scan was interrupted: delivery is at-least-once.
+
+    With a `rate_limiter`, every page (across all segments) is paced against its read capacity budget, page Limits are
+    tuned to the budget, and throttled pages are retried after the limiter backs off.
+
+        paginator = Paginator(table, FilterExpression=Attr('action').eq('PutParameter'), total_segments=8)
+        for item in paginator:
+            ...
+            save(paginator.checkpoint())
+
+        Paginator(table, FilterExpression=..., total_segments=8, checkpoint=load())  # picks up from the last save
+    """
+
+    def __init__(self, table, operation: str = SCAN, total_segments: int = 1, segment: Optional[int] = None,
+                 prefetch: int = 0, checkpoint: Optional[str] = None,
+                 transform: Callable[[List[Dict]], List[Any]] = None, rate_limiter: CapacityLimiter = None,
+                 **request):
+        """
+        Args:
+            table: boto3 DynamoDB Table
+            operation: SCAN or QUERY
+            total_segments: Number of segments to split a scan into. Segments are read in parallel.
+            segment: Only read this segment of `total_segments`, e.g. when the caller parallelizes itself.
+            prefetch: Number of pages to fetch ahead of the consumer, per segment, on a background thread.
+            checkpoint: Serialized checkpoint from a previous Paginator.checkpoint() to resume from.
+            transform: Applied to the items of each page before they are yielded, e.g. ItemDecoder.decode_all.
+            rate_limiter: Optional read capacity budget, may be shared with other paginators.
+            request: Request parameters passed on every call, e.g. FilterExpression / IndexName. None values are
+            dropped so optional expressions can be passed through as-is.
+        """
+        if operation not in (SCAN, QUERY):
+            raise ValueError(f"operation must be one of {SCAN} or {QUERY}, got: {operation}")
+        if total_segments < 1:
+            raise ValueError(f"total_segments must be greater than 0, got: {total_segments}")
+        if operation == QUERY and total_segments > 1:
+            raise ValueError("Parallel segments are only supported for scans.")
+        if segment is not None and not 0 <= segment < total_segments:
+            raise ValueError(f"segment must be between 0 and {total_segments - 1}, got: {segment}")
+        if 'ExclusiveStartKey' in request:
+            raise ValueError("Pass a checkpoint to resume instead of an ExclusiveStartKey.")
+
+        self._table = table
+        self._operation = operation
+        self._total_segments = total_segments
+        self._prefetch = max(prefetch, 0)
+        self._transform = transform
+        self._limiter = rate_limiter
+        self._request = {key: value for key, value in request.items() if value is not None}
+
+        segments = [segment] if segment is not None else list(range(total_segments))
+        self._positions: Dict[int, Optional[Dict]] = {seg: None for seg in segments}
+        self._done = set()
+        self._lock = threading.Lock()
+        self._started = False
+
+        if checkpoint:
+            self.__restore(checkpoint)
+
+    @staticmethod
+    def scan(table, **kwargs) -> 'Paginator':
+        return Paginator(table, SCAN, **kwargs)
+
+    @staticmethod
+    def query(table, **kwargs) -> 'Paginator':
+        return Paginator(table, QUERY, **kwargs)
+
+    @property
+    def done(self) -> bool:
+        """
+        Returns: True once every segment has been read to the end.
+        """
+        with self._lock:
+            return len(self._done) == len(self._positions)
+
+    def __iter__(self) -> Iterator[Any]:
+        return self.items()
+
+    def items(self) -> Iterator[Any]:
+        """
+        Yields every item, transformed if a `transform` was provided.
+        """
+        for page in self.pages():
+            yield from page
+
+    def pages(self) -> Iterator[List[Any]]:
+        """
+        Yields the items of each page, transformed if a `transform` was provided. With parallel segments, pages from
+        different segments are interleaved in the order they are read.
+        """
+        if self._started:
+            raise RuntimeError("A Paginator can only be iterated once, create a new one from its checkpoint.")
+        self._started = True
+
+        pending = [seg for seg in self._positions if seg not in self._done]
+        if len(pending) == 1 and not self._prefetch:
+            responses = self.__read(pending[0])
+        elif pending:
+            responses = self.__read_threaded(pending)
+        else:
+            return
+
+        try:
+            for segment, response in responses:
+                items = response.get('Items', [])
+                yield self._transform(items) if self._transform else items
+
+                # The consumer is done with this page, it's now safe to resume after it.
+                self.__advance(segment, response.get('LastEvaluatedKey'))
+        finally:
+            responses.close()  # Stops prefetching workers if the consumer bails out early
+
+    def all(self) -> List[Any]:
+        """
+        Returns: Every item as a single list.
+        """
+        results = []
+        for page in self.pages():
+            results.extend(page)
+
+        return results
+
+    def checkpoint(self) -> str:
+        """
+        Returns: JSON string that can be passed as `checkpoint` to a new Paginator, with the same table and request, to
+        resume after the last page that was consumed.
+        """
+        with self._lock:
+            segments = {str(seg): {'done': True} if seg in self._done else {'key': self.__encode_key(key)}
+                        for seg, key in self._positions.items()}
+
+        return json.dumps({'version': CHECKPOINT_VERSION, 'operation': self._operation,
+                           'total_segments': self._total_segments, 'segments': segments}, sort_keys=True)
+
+    def __advance(self, segment: int, last_key: Optional[Dict]) -> None:
+        with self._lock:
+            self._positions[segment] = last_key
+            if last_key is None:
+                self._done.add(segment)
+
+    def __fetch(self, segment: int, start_key: Optional[Dict]) -> Dict:
+        request = dict(self._request)
+        if self._operation == SCAN and self._total_segments > 1:
+            request.update(Segment=segment, TotalSegments=self._total_segments)
+        if start_key:
+            request['ExclusiveStartKey'] = start_key
+
+        if self._limiter is None:
+            return getattr(self._table, self._operation)(**request)
+
+        request['ReturnConsumedCapacity'] = 'TOTAL'
+        retries = 0
+        while True:
+            limit = self._limiter.limit()
+            if limit and 'Limit' not in self._request:
+                request['Limit'] = limit
+
+            self._limiter.acquire()
+            try:
+                response = getattr(self._table, self._operation)(**request)
+            except Exception as e:
+                if not Utils.is_throttled(e) or retries >= MAX_RETRIES:
+                    raise
+
+                retries += 1
+                self._limiter.throttled()
+                Utils.count_retry(Metrics.current_operation() or f'paginator.{self._operation}', throttled=True)
+                continue
+
+            self._limiter.record(response)
+            return response
+
+    def __read(self, segment: int, stop: threading.Event = None):
+        start_key = self._positions[segment]
+        while stop is None or not stop.is_set():
+            response = self.__fetch(segment, start_key)
+            yield segment, response
+
+            start_key = response.get('LastEvaluatedKey')
+            if not start_key:
+                return
+
+    def __read_threaded(self, segments: List[int]):
+        # Pages are handed over through a bounded queue: workers block once they're `prefetch` pages ahead.
+        pages = queue.Queue(maxsize=len(segments) * max(self._prefetch, 1))
+        stop = threading.Event()
+        operation = Metrics.current_operation()
+
+        def put(entry) -> bool:
+            while not stop.is_set():
+                try:
+                    pages.put(entry, timeout=_POLL_SECONDS)
+                    return True
+                except queue.Full:
+                    continue
+
+            return False
+
+        def worker(segment: int):
+            with Metrics.operation(operation):
+                try:
+                    for entry in self.__read(segment, stop):
+                        if not put(entry):
+                            return
+                    put((segment, _DONE))
+                except BaseException as e:
+                    put((segment, e))
+
+        threads = [threading.Thread(target=worker, args=(seg,), name=f'figgy-paginator-{seg}', daemon=True)
+                   for seg in segments]
+        for thread in threads:
+            thread.start()
+
+        try:
+            remaining = len(segments)
+            while remaining:
+                segment, entry = pages.get()
+                if entry is _DONE:
+                    remaining -= 1
+                elif isinstance(entry, BaseException):
+                    raise entry
+                else:
+                    yield segment, entry
+        finally:
+            stop.set()
+
+    def __restore(self, checkpoint: str) -> None:
+        state = json.loads(checkpoint)
+        if state.get('version') != CHECKPOINT_VERSION:
+            raise ValueError(f"Unsupported checkpoint version: {state.get('version')}")
+        if state['operation'] != self._operation or state['total_segments'] != self._total_segments:
+            raise ValueError(f"Checkpoint is for a {state['operation']} with {state['total_segments']} segment(s), "
+                             f"not a {self._operation} with {self._total_segments}.")
+
+        for seg, position in state['segments'].items():
+            seg = int(seg)
+            if seg not in self._positions:
+                continue
+
+            if position.get('done'):
+                self._done.add(seg)
+            else:
+                self._positions[seg] = self.__decode_key(position.get('key'))
+
+        log.info(f"Resuming {self._operation} with {len(self._positions) - len(self._done)} of "
+                 f"{len(self._positions)} segment(s) remaining.")
+
+    @staticmethod
+    def __encode_key(key: Optional[Dict]) -> Optional[Dict]:
+        # Key attributes can only be strings, numbers or binary. Numbers are kept as strings so no precision is lost.
+        if key is None:
+            return None
+
+        encoded = {}
+        for name, value in key.items():
+            if isinstance(value, str):
+                encoded[name] = {'S': value}
+            elif isinstance(value, (int, float, Decimal)):
+                encoded[name] = {'N': str(value)}
+            else:
+                raw = value.value if hasattr(value, 'value') else bytes(value)  # boto3 Binary or bytes
+                encoded[name] = {'B': base64.b64encode(raw).decode()}
+
+        return encoded
+
+    @staticmethod
+    def __decode_key(encoded: Optional[Dict]) -> Optional[Dict]:
+        if encoded is None:
+            return None
+
+        key = {}
+        for name, typed in encoded.items():
+            (kind, value), = typed.items()
+            key[name] = value if kind == 'S' else Decimal(value) if kind == 'N' else base64.b64decode(value)
+
+        return key
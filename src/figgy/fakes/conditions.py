@@ -0,0 +1,146 @@
+from decimal import Decimal
+from typing import Any, Dict, Optional, Tuple
+
+from boto3.dynamodb.conditions import AttributeBase, ConditionBase, Size
+
+_MISSING = object()
+
+# DynamoDB type descriptors, for attribute_type()
+_TYPES = {
+    'S': lambda v: isinstance(v, str),
+    'N': lambda v: isinstance(v, Decimal),
+    'B': lambda v: isinstance(v, (bytes, bytearray)),
+    'BOOL': lambda v: isinstance(v, bool),
+    'NULL': lambda v: v is None,
+    'L': lambda v: isinstance(v, list),
+    'M': lambda v: isinstance(v, dict),
+    'SS': lambda v: isinstance(v, set) and all(isinstance(i, str) for i in v),
+    'NS': lambda v: isinstance(v, set) and all(isinstance(i, Decimal) for i in v),
+    'BS': lambda v: isinstance(v, set) and all(isinstance(i, (bytes, bytearray)) for i in v),
+}
+
+
+def resolve(item: Dict, path: str) -> Any:
+    """
+    Looks up a (possibly nested) attribute path, e.g. `a.b[0].c`, returns _MISSING if it does not exist.
+    """
+    value = item
+    for part in path.split('.'):
+        index = None
+        if part.endswith(']') and '[' in part:
+            part, index = part[:-1].split('[', 1)
+
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+
+        value = value[part]
+        if index is not None:
+            if not isinstance(value, list) or int(index) >= len(value):
+                return _MISSING
+            value = value[int(index)]
+
+    return value
+
+
+def evaluate(condition: ConditionBase, item: Dict) -> bool:
+    """
+    Evaluates a boto3.dynamodb.conditions expression (Key / Attr conditions combined with & | ~) against an item,
+    with DynamoDB semantics: comparisons against missing attributes or between different types are False.
+    """
+    operator = condition.expression_operator
+    values = condition.get_expression()['values']
+
+    if operator == 'AND':
+        return evaluate(values[0], item) and evaluate(values[1], item)
+    if operator == 'OR':
+        return evaluate(values[0], item) or evaluate(values[1], item)
+    if operator == 'NOT':
+        return not evaluate(values[0], item)
+    if operator == 'attribute_exists':
+        return _operand(values[0], item) is not _MISSING
+    if operator == 'attribute_not_exists':
+        return _operand(values[0], item) is _MISSING
+
+    operand = _operand(values[0], item)
+    if operand is _MISSING:
+        return False
+
+    try:
+        if operator == '=':
+            return operand == values[1]
+        if operator == '<>':
+            return operand != values[1]
+        if operator == '<':
+            return _comparable(operand, values[1]) and operand < values[1]
+        if operator == '<=':
+            return _comparable(operand, values[1]) and operand <= values[1]
+        if operator == '>':
+            return _comparable(operand, values[1]) and operand > values[1]
+        if operator == '>=':
+            return _comparable(operand, values[1]) and operand >= values[1]
+        if operator == 'BETWEEN':
+            return _comparable(operand, values[1]) and values[1] <= operand <= values[2]
+        if operator == 'IN':
+            return operand in values[1:]
+        if operator == 'begins_with':
+            return isinstance(operand, str) and operand.startswith(values[1])
+        if operator == 'contains':
+            if isinstance(operand, str):
+                return isinstance(values[1], str) and values[1] in operand
+            return isinstance(operand, (set, list)) and values[1] in operand
+        if operator == 'attribute_type':
+            return _TYPES[values[1]](operand)
+    except TypeError:
+        return False
+
+    raise NotImplementedError(f"Condition operator {operator} is not supported by the fake backend.")
+
+
+def key_bounds(condition: ConditionBase, hash_key: str, range_key: Optional[str]) -> Tuple[Any, Optional[Tuple]]:
+    """
+    Splits a KeyConditionExpression into the partition key value and the sort key condition, so a query can seek
+    straight to its range instead of evaluating every item in the partition.
+
+    Returns: (hash value, (operator, *values) or None)
+    """
+    conditions = _flatten_and(condition)
+    hash_value, range_condition = _MISSING, None
+
+    for cond in conditions:
+        values = cond.get_expression()['values']
+        name = values[0].name if isinstance(values[0], AttributeBase) else None
+        if name == hash_key and cond.expression_operator == '=':
+            hash_value = values[1]
+        elif name is not None and name == range_key and range_condition is None:
+            range_condition = (cond.expression_operator,) + tuple(values[1:])
+        else:
+            raise ValueError(f"Invalid KeyConditionExpression, unsupported key condition on: {name}")
+
+    if hash_value is _MISSING:
+        raise ValueError(f"Query condition missed key schema element: {hash_key}")
+
+    return hash_value, range_condition
+
+
+def _flatten_and(condition: ConditionBase):
+    if condition.expression_operator == 'AND':
+        left, right = condition.get_expression()['values']
+        return _flatten_and(left) + _flatten_and(right)
+    return [condition]
+
+
+def _operand(value, item: Dict):
+    if isinstance(value, Size):
+        target = _operand(value.get_expression()['values'][0], item)
+        return len(target) if target is not _MISSING and not isinstance(target, (Decimal, bool)) else _MISSING
+    if isinstance(value, AttributeBase):
+        return resolve(item, value.name)
+    return value
+
+
+def _comparable(left, right) -> bool:
+    # Strings compare to strings, numbers to numbers, binary to binary. Anything else is False in DynamoDB.
+    numbers = (int, Decimal)
+    if isinstance(left, numbers) and not isinstance(left, bool):
+        return isinstance(right, numbers) and not isinstance(right, bool)
+    return type(left) is type(right) and isinstance(left, (str, bytes))
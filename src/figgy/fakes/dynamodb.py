@@ -0,0 +1,588 @@
+import math
+import threading
+import zlib
+from bisect import bisect_left, bisect_right
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from botocore.exceptions import ParamValidationError
+
+from figgy.constants.data import *
+from figgy.fakes.conditions import evaluate, key_bounds
+from figgy.fakes.faults import FaultInjector, client_error, response
+
+MAX_PAGE_BYTES = 1024 * 1024  # Scan / Query stop reading once a page has read 1MB of items.
+MAX_ITEM_BYTES = 400 * 1024
+MAX_BATCH_GET_KEYS = 100
+MAX_BATCH_WRITE_ITEMS = 25
+_HASH_SPACE = 2 ** 32
+
+_SCAN_PARAMS = {'FilterExpression', 'ExclusiveStartKey', 'Limit', 'Segment', 'TotalSegments', 'ConsistentRead',
+                'IndexName', 'ProjectionExpression', 'ExpressionAttributeNames', 'Select', 'ReturnConsumedCapacity'}
+_QUERY_PARAMS = _SCAN_PARAMS - {'Segment', 'TotalSegments'} | {'KeyConditionExpression', 'ScanIndexForward'}
+_GET_PARAMS = {'Key', 'ConsistentRead', 'ProjectionExpression', 'ExpressionAttributeNames', 'ReturnConsumedCapacity'}
+_PUT_PARAMS = {'Item', 'ConditionExpression', 'ReturnValues', 'ReturnConsumedCapacity'}
+_DELETE_PARAMS = {'Key', 'ConditionExpression', 'ReturnValues', 'ReturnConsumedCapacity'}
+
+
+class _Index:
+    """
+    Partition / sort key pair of the table or one of its global secondary indexes.
+    """
+
+    def __init__(self, hash_key: str, range_key: Optional[str]):
+        self.hash_key = hash_key
+        self.range_key = range_key
+
+
+class FakeTable:
+    """
+    In-memory stand in for a boto3 DynamoDB Table resource. Implements scan (with parallel Segments), query (on the
+    table or a global secondary index), get_item, put_item and delete_item with DynamoDB's paging rules: a page stops
+    after `Limit` evaluated items or once 1MB of items has been read, *before* FilterExpression is applied, and the
+    response carries a LastEvaluatedKey to resume from. Items come back the way the resource API returns them, with
+    numbers as Decimal.
+
+    Scans walk items in partition hash order, so Segment N of TotalSegments covers a contiguous slice of the hash
+    space like the real service.
+    """
+
+    def __init__(self, name: str, hash_key: str, range_key: str = None,
+                 indexes: Dict[str, Tuple[str, Optional[str]]] = None, faults: FaultInjector = None,
+                 max_page_bytes: int = MAX_PAGE_BYTES):
+        """
+        Args:
+            name: Table name
+            hash_key: Partition key attribute
+            range_key: Optional sort key attribute
+            indexes: Global secondary indexes, index name -> (hash key, range key or None). Projection is ALL.
+            faults: Latency / throttling to inject, shared with the owning FakeDynamoResource by default.
+            max_page_bytes: Bytes of items a single Scan / Query page may read.
+        """
+        self.name = name
+        self.table_name = name
+        self.hash_key = hash_key
+        self.range_key = range_key
+        self.indexes = {idx: _Index(*keys) for idx, keys in (indexes or {}).items()}
+        self.faults = faults if faults is not None else FaultInjector()
+        self.max_page_bytes = max_page_bytes
+
+        self._items: Dict[Tuple, Dict] = {}
+        self._sizes: Dict[Tuple, int] = {}
+        self._lock = threading.RLock()
+        self._version = 0
+        self._scan_view: Optional[Tuple[int, List, List]] = None
+        self._query_views: Dict[Optional[str], Tuple[int, Dict]] = {}
+
+    # -- Table API --
+
+    def scan(self, **kwargs) -> Dict:
+        self.__check_params('Scan', kwargs, _SCAN_PARAMS)
+        self.faults.before('dynamodb', 'scan')
+
+        if 'IndexName' in kwargs:
+            raise NotImplementedError("Scanning a secondary index is not supported by the fake backend.")
+
+        segment, total = kwargs.get('Segment'), kwargs.get('TotalSegments')
+        if (segment is None) != (total is None):
+            raise self.__validation('Scan', "The TotalSegments and Segment parameters must be used together.")
+        if total is not None and not (0 <= segment < total <= 1000000):
+            raise self.__validation('Scan', f"Invalid Segment: {segment} of TotalSegments: {total}")
+
+        tokens, keys = self.__scan_view()
+        lo, hi = 0, len(keys)
+        if total is not None:
+            lo = bisect_left(tokens, (_HASH_SPACE * segment // total,))
+            hi = bisect_left(tokens, (_HASH_SPACE * (segment + 1) // total,))
+
+        start_key = kwargs.get('ExclusiveStartKey')
+        if start_key:
+            lo = max(lo, bisect_right(tokens, self.__token(self.__key_of(start_key, 'Scan'))))
+
+        return self.__page('Scan', (keys[i] for i in range(lo, hi)), hi - lo, None, kwargs)
+
+    def query(self, **kwargs) -> Dict:
+        self.__check_params('Query', kwargs, _QUERY_PARAMS)
+        self.faults.before('dynamodb', 'query')
+
+        if 'KeyConditionExpression' not in kwargs:
+            raise self.__validation('Query', "Either the KeyConditions or KeyConditionExpression parameter must be "
+                                             "specified in the request.")
+        index_name = kwargs.get('IndexName')
+        if index_name is not None and index_name not in self.indexes:
+            raise self.__validation('Query', f"The table does not have the specified index: {index_name}")
+        if index_name is not None and kwargs.get('ConsistentRead'):
+            raise self.__validation('Query', "Consistent reads are not supported on global secondary indexes")
+
+        index = self.indexes[index_name] if index_name else _Index(self.hash_key, self.range_key)
+        try:
+            hash_value, range_condition = key_bounds(kwargs['KeyConditionExpression'], index.hash_key,
+                                                     index.range_key)
+        except ValueError as e:
+            raise self.__validation('Query', str(e))
+
+        tokens, ranges, keys = self.__query_view(index_name).get(hash_value, ([], [], []))
+        lo, hi = self.__range_bounds(ranges, range_condition)
+        forward = kwargs.get('ScanIndexForward', True)
+
+        start_key = kwargs.get('ExclusiveStartKey')
+        if start_key:
+            start = self.__index_token(index, start_key, self.__key_of(start_key, 'Query'))
+            if forward:
+                lo = max(lo, bisect_right(tokens, start))
+            else:
+                hi = min(hi, bisect_left(tokens, start))
+
+        positions = range(lo, hi) if forward else range(hi - 1, lo - 1, -1)
+        return self.__page('Query', (keys[i] for i in positions), max(hi - lo, 0), index if index_name else None,
+                           kwargs)
+
+    def get_item(self, **kwargs) -> Dict:
+        self.__check_params('GetItem', kwargs, _GET_PARAMS)
+        self.faults.before('dynamodb', 'get_item')
+
+        key = self.__key_of(kwargs['Key'], 'GetItem', exact=True)
+        item = self._items.get(key)
+        result = {}
+        if item is not None:
+            result['Item'] = self.__project(item, kwargs)
+
+        size = self._sizes.get(key, 0)
+        self.__capacity(result, kwargs, self.__read_units(size, kwargs.get('ConsistentRead')))
+        return response(result)
+
+    def put_item(self, **kwargs) -> Dict:
+        self.__check_params('PutItem', kwargs, _PUT_PARAMS)
+        self.faults.before('dynamodb', 'put_item')
+
+        item = _to_stored(kwargs['Item'])
+        key = self.__key_of(item, 'PutItem', exact=False)
+        size = _item_size(item)
+        if size > MAX_ITEM_BYTES:
+            raise self.__validation('PutItem', "Item size has exceeded the maximum allowed size")
+
+        with self._lock:
+            old = self.__check_condition('PutItem', key, kwargs)
+            self.__store(key, item, size)
+
+        result = {'Attributes': _copy(old)} if old is not None and kwargs.get('ReturnValues') == 'ALL_OLD' else {}
+        self.__capacity(result, kwargs, self.__write_units(size))
+        return response(result)
+
+    def delete_item(self, **kwargs) -> Dict:
+        self.__check_params('DeleteItem', kwargs, _DELETE_PARAMS)
+        self.faults.before('dynamodb', 'delete_item')
+
+        key = self.__key_of(kwargs['Key'], 'DeleteItem', exact=True)
+        with self._lock:
+            old = self.__check_condition('DeleteItem', key, kwargs)
+            size = self._sizes.get(key, 0)
+            self.__remove(key)
+
+        result = {'Attributes': _copy(old)} if old is not None and kwargs.get('ReturnValues') == 'ALL_OLD' else {}
+        self.__capacity(result, kwargs, self.__write_units(size))
+        return response(result)
+
+    # -- Seeding / inspection helpers, no faults are injected --
+
+    def load(self, items: Iterable[Dict]) -> int:
+        """
+        Bulk inserts items without injecting faults, for seeding large datasets.
+        Returns: int - number of items written
+        """
+        count = 0
+        with self._lock:
+            for item in items:
+                item = _to_stored(item)
+                self.__store(self.__key_of(item, 'PutItem', exact=False), item, _item_size(item))
+                count += 1
+
+        return count
+
+    def all_items(self) -> List[Dict]:
+        return [_copy(item) for item in list(self._items.values())]
+
+    def __len__(self):
+        return len(self._items)
+
+    # -- Batch support, used by FakeDynamoResource --
+
+    def _batch_get(self, key: Dict) -> Tuple[Optional[Dict], int]:
+        pk = self.__key_of(key, 'BatchGetItem', exact=True)
+        return self._items.get(pk), self._sizes.get(pk, 0)
+
+    def _batch_put(self, item: Dict) -> int:
+        item = _to_stored(item)
+        key = self.__key_of(item, 'BatchWriteItem', exact=False)
+        size = _item_size(item)
+        if size > MAX_ITEM_BYTES:
+            raise self.__validation('BatchWriteItem', "Item size has exceeded the maximum allowed size")
+
+        with self._lock:
+            self.__store(key, item, size)
+        return size
+
+    def _batch_delete(self, key: Dict) -> int:
+        pk = self.__key_of(key, 'BatchWriteItem', exact=True)
+        with self._lock:
+            size = self._sizes.get(pk, 0)
+            self.__remove(pk)
+        return size
+
+    def _primary_key(self, item: Dict) -> Tuple:
+        return self.__key_of(item, 'BatchWriteItem', exact=False)
+
+    # -- Internals --
+
+    def __page(self, operation: str, keys: Iterator[Tuple], candidates: int, index: Optional[_Index],
+               kwargs: Dict) -> Dict:
+        limit = kwargs.get('Limit')
+        if limit is not None and limit < 1:
+            raise self.__validation(operation, "Limit must be greater than or equal to 1")
+
+        filter_exp = kwargs.get('FilterExpression')
+        if isinstance(filter_exp, str) or isinstance(kwargs.get('KeyConditionExpression'), str):
+            raise NotImplementedError("The fake backend evaluates boto3.dynamodb.conditions expressions only.")
+
+        count_only = kwargs.get('Select') == 'COUNT'
+        items, evaluated, read_bytes, last_key, stopped = [], 0, 0, None, False
+
+        for key in keys:
+            item = self._items.get(key)
+            if item is None:  # Deleted since the view was built
+                continue
+
+            evaluated += 1
+            read_bytes += self._sizes[key]
+            if filter_exp is None or evaluate(filter_exp, item):
+                items.append(None if count_only else self.__project(item, kwargs))
+
+            if (limit is not None and evaluated >= limit) or read_bytes >= self.max_page_bytes:
+                last_key, stopped = key, True
+                break
+
+        result = {'Count': len(items), 'ScannedCount': evaluated}
+        if not count_only:
+            result['Items'] = items
+
+        if stopped and (evaluated < candidates or limit is not None):
+            result['LastEvaluatedKey'] = self.__last_evaluated_key(last_key, index)
+
+        self.__capacity(result, kwargs, self.__read_units(read_bytes, kwargs.get('ConsistentRead')))
+        return response(result)
+
+    def __scan_view(self) -> Tuple[List, List]:
+        with self._lock:
+            if self._scan_view is None or self._scan_view[0] != self._version:
+                keys = sorted(self._items.keys(), key=self.__token)
+                self._scan_view = (self._version, [self.__token(key) for key in keys], keys)
+
+            return self._scan_view[1], self._scan_view[2]
+
+    def __query_view(self, index_name: Optional[str]) -> Dict:
+        with self._lock:
+            view = self._query_views.get(index_name)
+            if view is not None and view[0] == self._version:
+                return view[1]
+
+            index = self.indexes[index_name] if index_name else _Index(self.hash_key, self.range_key)
+            partitions: Dict[Any, List] = {}
+            for key, item in self._items.items():
+                if index.hash_key not in item or (index.range_key and index.range_key not in item):
+                    continue  # Sparse index
+
+                partitions.setdefault(item[index.hash_key], []).append((self.__index_token(index, item, key), key))
+
+            partitioned = {}
+            for hash_value, entries in partitions.items():
+                entries.sort(key=lambda entry: entry[0])
+                tokens = [entry[0] for entry in entries]
+                partitioned[hash_value] = (tokens, [token[0] for token in tokens], [entry[1] for entry in entries])
+
+            self._query_views[index_name] = (self._version, partitioned)
+            return partitioned
+
+    @staticmethod
+    def __range_bounds(ranges: List, condition: Optional[Tuple]) -> Tuple[int, int]:
+        lo, hi = 0, len(ranges)
+        if condition is None:
+            return lo, hi
+
+        operator, values = condition[0], condition[1:]
+        try:
+            if operator == '=':
+                return bisect_left(ranges, values[0]), bisect_right(ranges, values[0])
+            if operator == '<':
+                return lo, bisect_left(ranges, values[0])
+            if operator == '<=':
+                return lo, bisect_right(ranges, values[0])
+            if operator == '>':
+                return bisect_right(ranges, values[0]), hi
+            if operator == '>=':
+                return bisect_left(ranges, values[0]), hi
+            if operator == 'BETWEEN':
+                return bisect_left(ranges, values[0]), bisect_right(ranges, values[1])
+            if operator == 'begins_with':
+                prefix = values[0]
+                upper = prefix[:-1] + chr(ord(prefix[-1]) + 1) if prefix else None
+                return bisect_left(ranges, prefix), bisect_left(ranges, upper) if upper else hi
+        except TypeError:
+            return 0, 0  # Sort key type mismatch, nothing can match
+
+        raise ValueError(f"Unsupported sort key condition: {operator}")
+
+    def __token(self, key: Tuple) -> Tuple:
+        # Items are scanned in partition hash order, then by key.
+        return (zlib.crc32(str(key[0]).encode()),) + key
+
+    def __index_token(self, index: _Index, item: Dict, key: Tuple) -> Tuple:
+        range_value = item.get(index.range_key) if index.range_key else None
+        return range_value, self.__token(key)
+
+    def __key_of(self, item: Dict, operation: str, exact: bool = True) -> Tuple:
+        names = (self.hash_key, self.range_key) if self.range_key else (self.hash_key,)
+        if any(name not in item for name in names):
+            raise self.__validation(operation, f"One or more parameter values were invalid: Missing the key "
+                                               f"{', '.join(n for n in names if n not in item)} in the item")
+        if exact and len(item) != len(names) and operation in ('GetItem', 'DeleteItem', 'BatchGetItem'):
+            raise self.__validation(operation, "The provided key element does not match the schema")
+
+        key = tuple(_to_stored(item[name]) for name in names)
+        if any(not isinstance(v, (str, Decimal, bytes)) or isinstance(v, bool) for v in key):
+            raise self.__validation(operation, "One or more parameter values were invalid: Type mismatch for key")
+
+        return key
+
+    def __last_evaluated_key(self, key: Tuple, index: Optional[_Index]) -> Dict:
+        item = self._items[key]
+        last_key = {self.hash_key: key[0]}
+        if self.range_key:
+            last_key[self.range_key] = key[1]
+        if index is not None:
+            last_key[index.hash_key] = item[index.hash_key]
+            if index.range_key:
+                last_key[index.range_key] = item[index.range_key]
+
+        return last_key
+
+    def __check_condition(self, operation: str, key: Tuple, kwargs: Dict) -> Optional[Dict]:
+        old = self._items.get(key)
+        condition = kwargs.get('ConditionExpression')
+        if condition is not None and not evaluate(condition, old if old is not None else {}):
+            raise client_error('ConditionalCheckFailedException', 'The conditional request failed', operation)
+
+        return old
+
+    def __store(self, key: Tuple, item: Dict, size: int) -> None:
+        self._items[key] = item
+        self._sizes[key] = size
+        self._version += 1
+
+    def __remove(self, key: Tuple) -> None:
+        if self._items.pop(key, None) is not None:
+            del self._sizes[key]
+            self._version += 1
+
+    def __project(self, item: Dict, kwargs: Dict) -> Dict:
+        projection = kwargs.get('ProjectionExpression')
+        if not projection:
+            return _copy(item)
+
+        names = kwargs.get('ExpressionAttributeNames', {})
+        attributes = [names.get(part.strip(), part.strip()) for part in projection.split(',')]
+        if any('.' in attr or '[' in attr for attr in attributes):
+            raise NotImplementedError("Nested projections are not supported by the fake backend.")
+
+        return {attr: _copy(item[attr]) for attr in attributes if attr in item}
+
+    def __capacity(self, result: Dict, kwargs: Dict, units: float) -> None:
+        if kwargs.get('ReturnConsumedCapacity') in ('TOTAL', 'INDEXES'):
+            result['ConsumedCapacity'] = {'TableName': self.name, 'CapacityUnits': units}
+
+    @staticmethod
+    def __read_units(size: int, consistent: bool) -> float:
+        return max(math.ceil(size / 4096), 1) * (1.0 if consistent else 0.5)
+
+    @staticmethod
+    def __write_units(size: int) -> float:
+        return float(max(math.ceil(size / 1024), 1))
+
+    @staticmethod
+    def __check_params(operation: str, kwargs: Dict, allowed: set) -> None:
+        unknown = set(kwargs) - allowed
+        if unknown:
+            raise ParamValidationError(report=f"Unknown parameter(s) in input to {operation}: {sorted(unknown)}")
+
+    @staticmethod
+    def __validation(operation: str, message: str):
+        return client_error('ValidationException', message, operation)
+
+
+class FakeDynamoResource:
+    """
+    In-memory stand in for a boto3 DynamoDB service resource: `Table(name)` plus batch_get_item / batch_write_item
+    with the service's request limits and UnprocessedKeys / UnprocessedItems behaviour.
+    """
+
+    def __init__(self, faults: FaultInjector = None):
+        self.faults = faults if faults is not None else FaultInjector()
+        self._tables: Dict[str, FakeTable] = {}
+
+    @staticmethod
+    def figgy(faults: FaultInjector = None) -> "FakeDynamoResource":
+        """
+        Returns: a resource with every table figgy's DAOs use, with their keys and secondary indexes.
+        """
+        resource = FakeDynamoResource(faults)
+        resource.create_table(AUDIT_TABLE_NAME, AUDIT_PARAMETER_KEY_NAME, AUDIT_TIME_KEY_NAME,
+                              {AUDIT_IDX_USER_ID: (AUDIT_USER_ATTR_NAME, AUDIT_TIME_KEY_NAME)})
+        resource.create_table(CACHE_TABLE_NAME, CACHE_PARAMETER_KEY_NAME)
+        resource.create_table(CONFIG_USAGE_TABLE_NAME, CONFIG_USAGE_PARAMETER_KEY, CONFIG_USAGE_USER_KEY, {
+            CONFIG_USAGE_USER_LAST_UPDATED_IDX: (CONFIG_USAGE_USER_KEY, CONFIG_USAGE_LAST_UPDATED_KEY),
+            CONFIG_USAGE_LAST_UPDATED_ONLY_IDX: (CONFIG_USAGE_EMPTY_IDX_KEY, CONFIG_USAGE_LAST_UPDATED_KEY),
+        })
+        resource.create_table(USER_CACHE_TABLE_NAME, USER_CACHE_PARAM_NAME_KEY)
+        resource.create_table(REPL_TABLE_NAME, REPL_DEST_KEY_NAME)
+        return resource
+
+    def create_table(self, name: str, hash_key: str, range_key: str = None,
+                     indexes: Dict[str, Tuple[str, Optional[str]]] = None, **kwargs) -> FakeTable:
+        self._tables[name] = FakeTable(name, hash_key, range_key, indexes, self.faults, **kwargs)
+        return self._tables[name]
+
+    def Table(self, name: str) -> FakeTable:
+        if name not in self._tables:
+            raise client_error('ResourceNotFoundException', f'Requested resource not found: Table: {name} not found',
+                               'DescribeTable')
+
+        return self._tables[name]
+
+    def batch_get_item(self, RequestItems: Dict, ReturnConsumedCapacity: str = None) -> Dict:
+        self.faults.before('dynamodb', 'batch_get_item')
+
+        total = sum(len(request.get('Keys', [])) for request in RequestItems.values())
+        if total > MAX_BATCH_GET_KEYS:
+            raise client_error('ValidationException', 'Too many items requested for the BatchGetItem call',
+                               'BatchGetItem')
+
+        responses, unprocessed, capacity = {}, {}, []
+        for table_name, request in RequestItems.items():
+            table = self.Table(table_name)
+            keys = request.get('Keys', [])
+            if len({table._primary_key(key) for key in keys}) != len(keys):
+                raise client_error('ValidationException', 'Provided list of item keys contains duplicates',
+                                   'BatchGetItem')
+
+            items, read_units = [], 0.0
+            for key in keys:
+                if self.faults.unprocessed():
+                    unprocessed.setdefault(table_name, dict(request, Keys=[]))['Keys'].append(key)
+                    continue
+
+                item, size = table._batch_get(key)
+                read_units += max(math.ceil(size / 4096), 1) * (1.0 if request.get('ConsistentRead') else 0.5)
+                if item is not None:
+                    projection = request.get('ProjectionExpression')
+                    if projection:
+                        names = request.get('ExpressionAttributeNames', {})
+                        attributes = [names.get(p.strip(), p.strip()) for p in projection.split(',')]
+                        items.append({attr: _copy(item[attr]) for attr in attributes if attr in item})
+                    else:
+                        items.append(_copy(item))
+
+            responses[table_name] = items
+            capacity.append({'TableName': table_name, 'CapacityUnits': read_units})
+
+        result = {'Responses': responses, 'UnprocessedKeys': unprocessed}
+        if ReturnConsumedCapacity in ('TOTAL', 'INDEXES'):
+            result['ConsumedCapacity'] = capacity
+
+        return response(result)
+
+    def batch_write_item(self, RequestItems: Dict, ReturnConsumedCapacity: str = None) -> Dict:
+        self.faults.before('dynamodb', 'batch_write_item')
+
+        total = sum(len(requests) for requests in RequestItems.values())
+        if total > MAX_BATCH_WRITE_ITEMS:
+            raise client_error('ValidationException', "1 validation error detected: Value at 'requestItems' failed to "
+                                                      "satisfy constraint: Member must have length less than or "
+                                                      "equal to 25", 'BatchWriteItem')
+
+        unprocessed, capacity = {}, []
+        for table_name, requests in RequestItems.items():
+            table = self.Table(table_name)
+            keys = [table._primary_key(r['PutRequest']['Item'] if 'PutRequest' in r else r['DeleteRequest']['Key'])
+                    for r in requests]
+            if len(set(keys)) != len(keys):
+                raise client_error('ValidationException', 'Provided list of item keys contains duplicates',
+                                   'BatchWriteItem')
+
+            write_units = 0.0
+            for request in requests:
+                if self.faults.unprocessed():
+                    unprocessed.setdefault(table_name, []).append(request)
+                    continue
+
+                if 'PutRequest' in request:
+                    size = table._batch_put(request['PutRequest']['Item'])
+                else:
+                    size = table._batch_delete(request['DeleteRequest']['Key'])
+                write_units += max(math.ceil(size / 1024), 1)
+
+            capacity.append({'TableName': table_name, 'CapacityUnits': write_units})
+
+        result = {'UnprocessedItems': unprocessed}
+        if ReturnConsumedCapacity in ('TOTAL', 'INDEXES'):
+            result['ConsumedCapacity'] = capacity
+
+        return response(result)
+
+
+def _to_stored(value):
+    """
+    Mirrors the boto3 TypeSerializer / TypeDeserializer round trip: ints become Decimals, floats are rejected.
+    """
+    if isinstance(value, bool) or value is None or isinstance(value, (str, Decimal, bytes)):
+        return value
+    if isinstance(value, int):
+        return Decimal(value)
+    if isinstance(value, float):
+        raise TypeError("Float types are not supported. Use Decimal types instead.")
+    if isinstance(value, dict):
+        return {k: _to_stored(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_stored(v) for v in value]
+    if isinstance(value, (set, frozenset)):
+        return {_to_stored(v) for v in value}
+    if isinstance(value, bytearray):
+        return bytes(value)
+
+    raise TypeError(f"Unsupported type {type(value)} for value {value}")
+
+
+def _copy(value):
+    if isinstance(value, dict):
+        return {k: _copy(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_copy(v) for v in value]
+    if isinstance(value, set):
+        return set(value)
+    return value
+
+
+def _item_size(value, name: str = '') -> int:
+    """
+    Approximates DynamoDB's item size accounting: attribute name bytes + value bytes.
+    """
+    size = len(name.encode())
+    if isinstance(value, str):
+        return size + len(value.encode())
+    if isinstance(value, bytes):
+        return size + len(value)
+    if isinstance(value, Decimal):
+        return size + len(value.as_tuple().digits) // 2 + 1
+    if isinstance(value, dict):
+        return size + 3 + sum(_item_size(v, k) + 1 for k, v in value.items())
+    if isinstance(value, (list, set)):
+        return size + 3 + sum(_item_size(v) + 1 for v in value)
+    return size + 1
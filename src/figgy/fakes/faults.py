@@ -0,0 +1,115 @@
+import random
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+from botocore.exceptions import ClientError
+
+# Error codes each service uses when it throttles a request.
+THROTTLE_CODES = {
+    'dynamodb': 'ProvisionedThroughputExceededException',
+    'ssm': 'ThrottlingException',
+    'kms': 'ThrottlingException',
+}
+
+
+def client_error(code: str, message: str, operation: str, status: int = 400) -> ClientError:
+    """
+    Builds the same ClientError botocore raises for a failed API call.
+    """
+    return ClientError({
+        'Error': {'Code': code, 'Message': message},
+        'ResponseMetadata': {'HTTPStatusCode': status},
+    }, operation)
+
+
+def response(body: Dict = None) -> Dict:
+    body = body if body is not None else {}
+    body['ResponseMetadata'] = {'HTTPStatusCode': 200, 'RetryAttempts': 0}
+    return body
+
+
+class FaultInjector:
+    """
+    Simulates network latency and service side throttling for the fake backends. One injector can be shared by
+    several fakes to model a single account's limits.
+
+    Args:
+        latency_ms: Fixed latency added to every request.
+        jitter_ms: Uniformly distributed extra latency, 0..jitter_ms, added to every request.
+        throttle_rate: Probability (0..1) that any request is rejected as throttled.
+        max_requests_per_second: Optional per service + operation request rate. Requests beyond it are throttled,
+            like a provisioned capacity table or an SSM / KMS API quota.
+        unprocessed_rate: Probability (0..1) that each key / item of a DynamoDB batch request comes back unprocessed.
+        seed: Seed for reproducible runs.
+    """
+
+    def __init__(self, latency_ms: float = 0, jitter_ms: float = 0, throttle_rate: float = 0,
+                 max_requests_per_second: Optional[float] = None, unprocessed_rate: float = 0, seed: int = None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.throttle_rate = throttle_rate
+        self.max_requests_per_second = max_requests_per_second
+        self.unprocessed_rate = unprocessed_rate
+        self.calls: Counter = Counter()
+        self.throttles: Counter = Counter()
+        self._random = random.Random(seed)
+        self._buckets: Dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def before(self, service: str, operation: str) -> None:
+        """
+        Called by a fake before it serves `operation`. Sleeps for the simulated latency, then raises a throttling
+        ClientError if the request is throttled.
+        """
+        name = f'{service}.{operation}'
+        with self._lock:
+            self.calls[name] += 1
+            delay = self.latency_ms + (self._random.uniform(0, self.jitter_ms) if self.jitter_ms else 0)
+            throttled = (self.throttle_rate and self._random.random() < self.throttle_rate) or \
+                not self.__take_token(name)
+
+            if throttled:
+                self.throttles[name] += 1
+
+        if delay:
+            time.sleep(delay / 1000)
+
+        if throttled:
+            raise client_error(THROTTLE_CODES.get(service, 'ThrottlingException'), 'Rate exceeded', operation)
+
+    def unprocessed(self) -> bool:
+        """
+        Returns: True if the next batch key / item should be left unprocessed.
+        """
+        if not self.unprocessed_rate:
+            return False
+
+        with self._lock:
+            return self._random.random() < self.unprocessed_rate
+
+    def reset(self) -> None:
+        with self._lock:
+            self.calls.clear()
+            self.throttles.clear()
+            self._buckets.clear()
+
+    def __take_token(self, name: str) -> bool:
+        if not self.max_requests_per_second:
+            return True
+
+        now = time.monotonic()
+        bucket = self._buckets.get(name)
+        if bucket is None:
+            bucket = self._buckets[name] = [self.max_requests_per_second, now]
+
+        tokens = min(self.max_requests_per_second, bucket[0] + (now - bucket[1]) * self.max_requests_per_second)
+        bucket[1] = now
+        if tokens < 1:
+            bucket[0] = tokens
+            return False
+
+        bucket[0] = tokens - 1
+        return True
+
@@ -0,0 +1,95 @@
+import hashlib
+import json
+import os
+import struct
+from typing import Dict, Optional, Union
+
+from figgy.fakes.faults import FaultInjector, client_error, response
+
+MAX_PLAINTEXT_BYTES = 4096
+_HEADER = b'\x01FAKEKMS'
+_ACCOUNT = '000000000000'
+_KEY_SPEC_BYTES = {'AES_256': 32, 'AES_128': 16}
+
+
+class FakeKmsClient:
+    """
+    In-memory stand in for a boto3 KMS client: encrypt, decrypt and generate_data_key. Ciphertexts are bound to the
+    key id and encryption context they were created with, and decrypting with a different context fails with
+    InvalidCiphertextException as it would against KMS. The ciphertext format is private to this fake and provides no
+    confidentiality.
+    """
+
+    def __init__(self, faults: FaultInjector = None, region: str = 'us-east-1'):
+        self.faults = faults if faults is not None else FaultInjector()
+        self._region = region
+
+    def encrypt(self, KeyId: str, Plaintext: Union[bytes, str], EncryptionContext: Dict[str, str] = None,
+                EncryptionAlgorithm: str = 'SYMMETRIC_DEFAULT', GrantTokens=None) -> Dict:
+        self.faults.before('kms', 'encrypt')
+        plaintext = Plaintext.encode() if isinstance(Plaintext, str) else bytes(Plaintext)
+        if not 1 <= len(plaintext) <= MAX_PLAINTEXT_BYTES:
+            raise client_error('ValidationException', f"Plaintext must be between 1 and {MAX_PLAINTEXT_BYTES} bytes",
+                               'Encrypt')
+
+        return response({
+            'CiphertextBlob': self.__wrap(self.__arn(KeyId), plaintext, EncryptionContext),
+            'KeyId': self.__arn(KeyId),
+            'EncryptionAlgorithm': EncryptionAlgorithm,
+        })
+
+    def decrypt(self, CiphertextBlob: bytes, EncryptionContext: Dict[str, str] = None, KeyId: str = None,
+                EncryptionAlgorithm: str = 'SYMMETRIC_DEFAULT', GrantTokens=None) -> Dict:
+        self.faults.before('kms', 'decrypt')
+        key_arn, plaintext = self.__unwrap(CiphertextBlob, EncryptionContext)
+        if KeyId is not None and self.__arn(KeyId) != key_arn:
+            raise client_error('IncorrectKeyException', 'The key ID in the request does not identify a CMK that can '
+                                                        'perform this operation.', 'Decrypt')
+
+        return response({'Plaintext': plaintext, 'KeyId': key_arn, 'EncryptionAlgorithm': EncryptionAlgorithm})
+
+    def generate_data_key(self, KeyId: str, KeySpec: str = None, NumberOfBytes: int = None,
+                          EncryptionContext: Dict[str, str] = None, GrantTokens=None) -> Dict:
+        self.faults.before('kms', 'generate_data_key')
+        if (KeySpec is None) == (NumberOfBytes is None):
+            raise client_error('ValidationException', 'Exactly one of KeySpec or NumberOfBytes must be specified.',
+                               'GenerateDataKey')
+
+        plaintext = os.urandom(_KEY_SPEC_BYTES[KeySpec] if KeySpec else NumberOfBytes)
+        return response({
+            'Plaintext': plaintext,
+            'CiphertextBlob': self.__wrap(self.__arn(KeyId), plaintext, EncryptionContext),
+            'KeyId': self.__arn(KeyId),
+        })
+
+    def __arn(self, key_id: str) -> str:
+        if key_id.startswith('arn:'):
+            return key_id
+
+        prefix = '' if key_id.startswith('alias/') else 'key/'
+        return f'arn:aws:kms:{self._region}:{_ACCOUNT}:{prefix}{key_id}'
+
+    @staticmethod
+    def __context_digest(context: Optional[Dict[str, str]]) -> str:
+        return hashlib.sha256(json.dumps(context or {}, sort_keys=True).encode()).hexdigest()
+
+    def __wrap(self, key_arn: str, plaintext: bytes, context: Optional[Dict[str, str]]) -> bytes:
+        header = json.dumps({'k': key_arn, 'c': self.__context_digest(context)}).encode()
+        return _HEADER + struct.pack('>H', len(header)) + header + plaintext
+
+    def __unwrap(self, blob: bytes, context: Optional[Dict[str, str]]):
+        try:
+            if not blob.startswith(_HEADER):
+                raise ValueError()
+
+            offset = len(_HEADER)
+            header_length, = struct.unpack('>H', blob[offset:offset + 2])
+            header = json.loads(blob[offset + 2:offset + 2 + header_length])
+            plaintext = blob[offset + 2 + header_length:]
+        except (ValueError, struct.error):
+            raise client_error('InvalidCiphertextException', '', 'Decrypt')
+
+        if header['c'] != self.__context_digest(context):
+            raise client_error('InvalidCiphertextException', '', 'Decrypt')
+
+        return header['k'], plaintext
@@ -0,0 +1,341 @@
+import base64
+import datetime
+import threading
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, List, Optional
+
+from botocore.exceptions import ParamValidationError
+
+from figgy.constants.data import SSM_SECURE_STRING, SSM_STRING
+from figgy.fakes.faults import FaultInjector, client_error, response
+
+MAX_GET_PARAMETERS = 10
+MAX_BY_PATH_RESULTS = 10
+MAX_DESCRIBE_RESULTS = 50
+MAX_HISTORY_RESULTS = 50
+MAX_VERSIONS = 100
+DEFAULT_KEY_ID = 'alias/aws/ssm'
+_ACCOUNT = '000000000000'
+
+
+class FakeSsmClient:
+    """
+    In-memory stand in for a boto3 SSM client, covering the parameter store calls figgy makes: put / get / delete
+    parameters, get_parameters (10 names per call), get_parameters_by_path and describe_parameters with NextToken
+    pagination and the service's MaxResults limits, and get_parameter_history with every stored version. get_parameter
+    and get_parameters accept `name:version` selectors, labels are not supported.
+
+    SecureString values requested WithDecryption=False are returned encrypted. If a FakeKmsClient is provided they
+    are real fake-KMS ciphertexts, encrypted under the parameter's KeyId and PARAMETER_ARN encryption context the way
+    Parameter Store does, so they can be round tripped through KmsDao.
+    """
+
+    def __init__(self, faults: FaultInjector = None, kms=None, region: str = 'us-east-1'):
+        self.faults = faults if faults is not None else FaultInjector()
+        self._kms = kms
+        self._region = region
+        self._history: Dict[str, List[Dict]] = {}
+        self._names: List[str] = []
+        self._lock = threading.RLock()
+
+    def put_parameter(self, Name: str, Value: str, Type: str = None, Description: str = None, KeyId: str = None,
+                      Overwrite: bool = False, Tier: str = None, Policies: str = None, DataType: str = 'text',
+                      AllowedPattern: str = None, Tags: List[Dict] = None) -> Dict:
+        self.faults.before('ssm', 'put_parameter')
+        self.__validate_name(Name, 'PutParameter')
+        if Value is None or len(Value.encode()) > 8192:
+            raise client_error('ValidationException', 'Parameter value must be between 1 and 8192 bytes',
+                               'PutParameter')
+
+        with self._lock:
+            versions = self._history.get(Name)
+            if versions and not Overwrite:
+                raise client_error('ParameterAlreadyExists', 'The parameter already exists. To overwrite this '
+                                                             'value, set the overwrite option in the request to true.',
+                                   'PutParameter')
+
+            previous = versions[-1] if versions else {}
+            param_type = Type or previous.get('Type') or SSM_STRING
+            version = {
+                'Name': Name,
+                'Type': param_type,
+                'Value': Value,
+                'Version': previous.get('Version', 0) + 1,
+                'LastModifiedDate': datetime.datetime.now(datetime.timezone.utc),
+                'LastModifiedUser': f'arn:aws:iam::{_ACCOUNT}:user/figgy-fake',
+                'Description': Description if Description is not None else previous.get('Description', ''),
+                'Labels': [],
+                'Tier': Tier or previous.get('Tier', 'Standard'),
+                'Policies': [{'PolicyText': Policies, 'PolicyType': 'Expiration', 'PolicyStatus': 'Pending'}]
+                if Policies else [],
+                'DataType': DataType,
+            }
+            if param_type == SSM_SECURE_STRING:
+                version['KeyId'] = KeyId or previous.get('KeyId') or DEFAULT_KEY_ID
+
+            if versions is None:
+                versions = self._history[Name] = []
+                insort(self._names, Name)
+
+            versions.append(version)
+            if len(versions) > MAX_VERSIONS:
+                del versions[0]
+
+        return response({'Version': version['Version'], 'Tier': version['Tier']})
+
+    def get_parameter(self, Name: str, WithDecryption: bool = False) -> Dict:
+        self.faults.before('ssm', 'get_parameter')
+        version, selector = self.__select(Name)
+        if version is None:
+            raise client_error('ParameterNotFound' if not selector else 'ParameterVersionNotFound', '',
+                               'GetParameter')
+
+        return response({'Parameter': self.__parameter(version, WithDecryption, selector=selector)})
+
+    def get_parameters(self, Names: List[str], WithDecryption: bool = False) -> Dict:
+        self.faults.before('ssm', 'get_parameters')
+        if not 1 <= len(Names) <= MAX_GET_PARAMETERS:
+            raise client_error('ValidationException', f"1 validation error detected: Value at 'names' failed to "
+                                                      f"satisfy constraint: Member must have length less than or "
+                                                      f"equal to {MAX_GET_PARAMETERS}", 'GetParameters')
+
+        parameters, invalid = [], []
+        for name in dict.fromkeys(Names):
+            version, selector = self.__select(name)
+            if version is not None:
+                parameters.append(self.__parameter(version, WithDecryption, selector=selector))
+            else:
+                invalid.append(name)
+
+        return response({'Parameters': parameters, 'InvalidParameters': invalid})
+
+    def get_parameters_by_path(self, Path: str, Recursive: bool = False, WithDecryption: bool = False,
+                               MaxResults: int = MAX_BY_PATH_RESULTS, NextToken: str = None,
+                               ParameterFilters: List[Dict] = None) -> Dict:
+        self.faults.before('ssm', 'get_parameters_by_path')
+        self.__validate_max_results(MaxResults, MAX_BY_PATH_RESULTS, 'GetParametersByPath')
+        option = 'Recursive' if Recursive else 'OneLevel'
+        filters = [{'Key': 'Path', 'Option': option, 'Values': [Path]}] + list(ParameterFilters or [])
+
+        with self._lock:
+            names, token = self.__page(filters, MaxResults, NextToken)
+            latest = [self._history[name][-1] for name in names]
+
+        parameters = [self.__parameter(version, WithDecryption) for version in latest]
+        return response(self.__with_token({'Parameters': parameters}, token))
+
+    def describe_parameters(self, Filters: List[Dict] = None, ParameterFilters: List[Dict] = None,
+                            MaxResults: int = MAX_DESCRIBE_RESULTS, NextToken: str = None) -> Dict:
+        self.faults.before('ssm', 'describe_parameters')
+        self.__validate_max_results(MaxResults, MAX_DESCRIBE_RESULTS, 'DescribeParameters')
+        if Filters and ParameterFilters:
+            raise client_error('InvalidFilterKey', 'Filters and ParameterFilters cannot be used together',
+                               'DescribeParameters')
+
+        # Legacy Filters are exact matches on Name / Type / KeyId.
+        filters = [{'Key': f['Key'], 'Option': 'Equals', 'Values': f['Values']} for f in Filters or []]
+        with self._lock:
+            names, token = self.__page(filters + list(ParameterFilters or []), MaxResults, NextToken)
+            metadata = [dict(self._history[name][-1]) for name in names]
+
+        for parameter in metadata:
+            del parameter['Value']
+
+        return response(self.__with_token({'Parameters': metadata}, token))
+
+    def get_parameter_history(self, Name: str, WithDecryption: bool = False, MaxResults: int = MAX_HISTORY_RESULTS,
+                              NextToken: str = None) -> Dict:
+        self.faults.before('ssm', 'get_parameter_history')
+        self.__validate_max_results(MaxResults, MAX_HISTORY_RESULTS, 'GetParameterHistory')
+        versions = list(self._history.get(Name) or [])
+        if not versions:
+            raise client_error('ParameterNotFound', '', 'GetParameterHistory')
+
+        start = int(self.__decode_token(NextToken)) if NextToken else 0
+        page = versions[start:start + MaxResults]
+        token = self.__encode_token(str(start + MaxResults)) if start + MaxResults < len(versions) else None
+        return response(self.__with_token({'Parameters': [self.__parameter(v, WithDecryption, history=True)
+                                                          for v in page]}, token))
+
+    def delete_parameter(self, Name: str) -> Dict:
+        self.faults.before('ssm', 'delete_parameter')
+        with self._lock:
+            if not self.__remove(Name):
+                raise client_error('ParameterNotFound', '', 'DeleteParameter')
+
+        return response()
+
+    def delete_parameters(self, Names: List[str]) -> Dict:
+        self.faults.before('ssm', 'delete_parameters')
+        if not 1 <= len(Names) <= MAX_GET_PARAMETERS:
+            raise client_error('ValidationException', 'Names must contain between 1 and 10 parameters.',
+                               'DeleteParameters')
+
+        deleted, invalid = [], []
+        with self._lock:
+            for name in dict.fromkeys(Names):
+                (deleted if self.__remove(name) else invalid).append(name)
+
+        return response({'DeletedParameters': deleted, 'InvalidParameters': invalid})
+
+    # -- Seeding / inspection helpers, no faults are injected --
+
+    def load(self, parameters: Dict[str, str], type: str = SSM_STRING, key_id: str = None) -> int:
+        """
+        Bulk creates / overwrites parameters without injecting faults, for seeding large datasets.
+        """
+        faults, self.faults = self.faults, FaultInjector()
+        try:
+            for name, value in parameters.items():
+                self.put_parameter(Name=name, Value=value, Type=type, KeyId=key_id, Overwrite=True)
+        finally:
+            self.faults = faults
+
+        return len(parameters)
+
+    def __len__(self):
+        return len(self._names)
+
+    # -- Internals --
+
+    def __page(self, filters: List[Dict], max_results: int, next_token: Optional[str]):
+        names = self._names
+        lo, hi = self.__candidate_range(filters)
+        if next_token:
+            lo = max(lo, bisect_right(names, self.__decode_token(next_token)))
+
+        page = []
+        for i in range(lo, hi):
+            if self.__matches(names[i], filters):
+                page.append(names[i])
+                if len(page) == max_results:
+                    # Like the service, a full page always carries a token, even if nothing else matches.
+                    return page, self.__encode_token(names[i]) if i + 1 < hi else None
+
+        return page, None
+
+    def __candidate_range(self, filters: List[Dict]):
+        """
+        Names are kept sorted, so a single Path / Name BeginsWith filter narrows the names to examine to one slice.
+        """
+        names = self._names
+        for parameter_filter in filters:
+            key, option, values = parameter_filter['Key'], parameter_filter.get('Option'), parameter_filter['Values']
+            if len(values) != 1 or not (key == 'Path' or (key == 'Name' and option == 'BeginsWith')):
+                continue
+
+            prefix = values[0].rstrip('/') + '/' if key == 'Path' else values[0]
+            if not prefix:
+                continue
+
+            upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+            return bisect_left(names, prefix), bisect_left(names, upper)
+
+        return 0, len(names)
+
+    def __matches(self, name: str, filters: List[Dict]) -> bool:
+        latest = self._history[name][-1]
+        for parameter_filter in filters:
+            key, option, values = parameter_filter['Key'], parameter_filter.get('Option'), parameter_filter['Values']
+            if key == 'Path':
+                if not any(self.__in_path(name, path, option != 'OneLevel') for path in values):
+                    return False
+            elif key == 'Name':
+                if option == 'BeginsWith':
+                    matched = any(name.startswith(v) for v in values)
+                elif option == 'Contains':
+                    matched = any(v in name for v in values)
+                else:
+                    matched = name in values
+                if not matched:
+                    return False
+            elif key in ('Type', 'KeyId', 'Tier', 'DataType'):
+                if latest.get(key) not in values:
+                    return False
+            else:
+                raise client_error('InvalidFilterKey', f'Unsupported filter key: {key}', 'DescribeParameters')
+
+        return True
+
+    @staticmethod
+    def __in_path(name: str, path: str, recursive: bool) -> bool:
+        path = path.rstrip('/') + '/'
+        if not name.startswith(path):
+            return False
+
+        return recursive or '/' not in name[len(path):]
+
+    def __select(self, name: str):
+        """
+        Returns: (stored version or None, selector) for a `name` or `name:version` selector.
+        """
+        base, _, selector = name.rpartition(':')
+        if not base or not selector.isdigit():
+            versions = self._history.get(name)
+            return (versions[-1] if versions else None), None
+
+        matches = [v for v in self._history.get(base) or [] if v['Version'] == int(selector)]
+        return (matches[0] if matches else None), f':{selector}'
+
+    def __parameter(self, version: Dict, decrypt: bool, history: bool = False, selector: str = None) -> Dict:
+        parameter = dict(version)
+        if selector:
+            parameter['Selector'] = selector
+        if parameter['Type'] == SSM_SECURE_STRING and not decrypt:
+            parameter['Value'] = self.__encrypted(version)
+
+        parameter['ARN'] = self.__arn(version['Name'])
+        if not history:
+            for attr in ('Description', 'Labels', 'Tier', 'Policies', 'LastModifiedUser', 'KeyId'):
+                parameter.pop(attr, None)
+
+        return parameter
+
+    def __encrypted(self, version: Dict) -> str:
+        if self._kms is None:
+            return base64.b64encode(f"fake-ssm:{version['Name']}:{version['Version']}".encode()).decode()
+
+        blob = self._kms.encrypt(KeyId=version['KeyId'], Plaintext=version['Value'],
+                                 EncryptionContext={'PARAMETER_ARN': self.__arn(version['Name'])})['CiphertextBlob']
+        return base64.b64encode(blob).decode()
+
+    def __arn(self, name: str) -> str:
+        return f"arn:aws:ssm:{self._region}:{_ACCOUNT}:parameter{name if name.startswith('/') else '/' + name}"
+
+    def __remove(self, name: str) -> bool:
+        if self._history.pop(name, None) is None:
+            return False
+
+        self._names.pop(bisect_right(self._names, name) - 1)
+        return True
+
+    @staticmethod
+    def __validate_name(name: str, operation: str) -> None:
+        if not name or len(name) > 2048 or ('/' in name and not name.startswith('/')):
+            raise client_error('ValidationException', f'Parameter name: {name} is invalid.', operation)
+
+    @staticmethod
+    def __validate_max_results(max_results: int, limit: int, operation: str) -> None:
+        if not isinstance(max_results, int):
+            raise ParamValidationError(report=f"Invalid type for parameter MaxResults in {operation}")
+        if not 1 <= max_results <= limit:
+            raise client_error('ValidationException', f"1 validation error detected: Value '{max_results}' at "
+                                                      f"'maxResults' failed to satisfy constraint: Member must have "
+                                                      f"value less than or equal to {limit}", operation)
+
+    @staticmethod
+    def __with_token(result: Dict, token: Optional[str]) -> Dict:
+        if token:
+            result['NextToken'] = token
+        return result
+
+    @staticmethod
+    def __encode_token(value: str) -> str:
+        return base64.urlsafe_b64encode(value.encode()).decode()
+
+    @staticmethod
+    def __decode_token(token: str) -> str:
+        try:
+            return base64.urlsafe_b64decode(token.encode()).decode()
+        except (ValueError, UnicodeDecodeError):
+            raise client_error('InvalidNextToken', 'The specified token is not valid.', 'DescribeParameters')
@@ -0,0 +1,248 @@
+import datetime
+import functools
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Mapping
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from figgy.constants.data import *
+from figgy.models.parameter_history import ParameterHistory
+from figgy.models.parameter_store_history import PSHistory
+from figgy.models.restore_config import RestoreConfig
+from figgy.utils.symbols import SymbolTable
+
+_NONE = -1
+
+
+@functools.lru_cache(maxsize=1)
+def _numpy():
+    # Optional dependency, only used to vectorize state_at(). Imported on first use, it is slow to import.
+    try:
+        import numpy
+        return numpy
+    except ImportError:
+        return None
+
+
+class ColumnarHistory:
+    """
+    Compact, column oriented store of audit history. Each audit row is spread over parallel arrays: int64 millisecond
+    timestamps, indexes into a table of interned strings for names / users / types / actions / key ids / descriptions,
+    and offsets into a single utf-8 buffer of values. Compared to a RestoreConfig per row this uses a small fraction
+    of the memory, and ParameterHistory / PSHistory compatible views materialize RestoreConfigs only on demand.
+    """
+
+    def __init__(self, symbols: SymbolTable = None):
+        self._times = array('q')
+        self._versions = array('q')
+        self._names = array('i')
+        self._users = array('i')
+        self._types = array('i')
+        self._actions = array('i')
+        self._key_ids = array('i')
+        self._descriptions = array('i')
+        self._value_offsets = array('q', [0])
+        self._values = bytearray()
+
+        self._symbols = symbols if symbols is not None else SymbolTable()
+        self._rows_by_name: Optional[Dict[int, array]] = None
+
+    def add_item(self, item: Dict) -> None:
+        """
+        Appends a single audit table item.
+        """
+        self._times.append(int(item[AUDIT_TIME_KEY_NAME]))
+        version = item.get(AUDIT_PARAMETER_ATTR_VERSION)
+        self._versions.append(int(version) if version not in (None, "") else _NONE)
+        self._names.append(self.__intern(item[AUDIT_PARAMETER_KEY_NAME]))
+        self._users.append(self.__intern(item.get(AUDIT_USER_ATTR_NAME, "")))
+        self._types.append(self.__intern(item.get(AUDIT_PARAMETER_ATTR_TYPE, "")))
+        self._actions.append(self.__intern(item[AUDIT_ACTION_ATTR_NAME]))
+        self._key_ids.append(self.__intern(item.get(AUDIT_PARAMETER_ATTR_KEY_ID)))
+        self._descriptions.append(self.__intern(item.get(AUDIT_PARAMETER_ATTR_DESCRIPTION, "")))
+        self._values.extend((item.get(AUDIT_PARAMETER_ATTR_VALUE) or "").encode())
+        self._value_offsets.append(len(self._values))
+        self._rows_by_name = None
+
+    def add_items(self, items: Iterable[Dict]) -> None:
+        for item in items:
+            self.add_item(item)
+
+    def __len__(self):
+        return len(self._times)
+
+    def names(self) -> List[str]:
+        return [self._symbols.symbol(name_id) for name_id in self.__index()]
+
+    def restore_config(self, row: int) -> RestoreConfig:
+        """
+        Materializes a single row as a RestoreConfig
+        """
+        version = self._versions[row]
+        return RestoreConfig(
+            self._symbols.symbol(self._descriptions[row]),
+            self._symbols.symbol(self._names[row]),
+            self._times[row],
+            self._symbols.symbol(self._types[row]),
+            self.__symbol(self._key_ids[row]),
+            self.value(row),
+            version if version != _NONE else "",
+            self._symbols.symbol(self._users[row]),
+            self._symbols.symbol(self._actions[row]),
+        )
+
+    def value(self, row: int) -> str:
+        return self._values[self._value_offsets[row]:self._value_offsets[row + 1]].decode()
+
+    def time(self, row: int) -> int:
+        return self._times[row]
+
+    def action(self, row: int) -> str:
+        return self._symbols.symbol(self._actions[row])
+
+    def rows_for(self, name: str) -> array:
+        """
+        Returns: array - row indexes for the parameter `name`, sorted by time.
+        """
+        name_id = self._symbols.get_id(name)
+        return self.__index().get(name_id, array('q'))
+
+    def parameter_history(self, name: str) -> "ColumnarParameterHistory":
+        return ColumnarParameterHistory(self, name)
+
+    def ps_history(self) -> "ColumnarPSHistory":
+        return ColumnarPSHistory(self)
+
+    def state_at(self, ps_time: datetime.datetime) -> Dict[str, RestoreConfig]:
+        """
+        Evaluates the state of every parameter in the store at `ps_time`.
+
+        Returns: Dict[str, RestoreConfig] - name -> latest PutParameter before `ps_time`, for each parameter whose
+        latest action before `ps_time` was not a delete. Vectorized with NumPy when it is installed.
+        """
+        millis = int(ps_time.timestamp() * 1000)
+        put_id = self._symbols.get_id(SSM_PUT)
+
+        if _numpy() is not None and len(self):
+            latest_rows = self.__latest_rows_np(millis)
+        else:
+            latest_rows = []
+            for rows in self.__index().values():
+                times = [self._times[row] for row in rows]
+                position = bisect_left(times, millis)
+                if position:
+                    latest_rows.append(rows[position - 1])
+
+        return {self._symbols.symbol(self._names[row]): self.restore_config(row)
+                for row in latest_rows if self._actions[row] == put_id}
+
+    def __latest_rows_np(self, millis: int) -> List[int]:
+        np = _numpy()
+        times = np.frombuffer(self._times, dtype=np.int64)
+        names = np.frombuffer(self._names, dtype=np.int32)
+
+        candidates = np.nonzero(times < millis)[0]
+        if not len(candidates):
+            return []
+
+        # Sort by name then time, the last row of each name run is its latest row before `millis`.
+        ordered = candidates[np.lexsort((times[candidates], names[candidates]))]
+        ordered_names = names[ordered]
+        is_last = np.append(ordered_names[1:] != ordered_names[:-1], True)
+        return ordered[is_last].tolist()
+
+    def __index(self) -> Dict[int, array]:
+        if self._rows_by_name is None:
+            rows_by_name: Dict[int, List[int]] = {}
+            for row, name_id in enumerate(self._names):
+                rows_by_name.setdefault(name_id, []).append(row)
+
+            self._rows_by_name = {name_id: array('q', sorted(rows, key=self._times.__getitem__))
+                                  for name_id, rows in rows_by_name.items()}
+
+        return self._rows_by_name
+
+    def __intern(self, value: Optional[str]) -> int:
+        return self._symbols.id(value) if value is not None else _NONE
+
+    def __symbol(self, symbol_id: int) -> Optional[str]:
+        return self._symbols.symbol(symbol_id) if symbol_id != _NONE else None
+
+
+class ColumnarParameterHistory(ParameterHistory):
+    """
+    ParameterHistory compatible view over a single parameter's rows in a ColumnarHistory.
+    RestoreConfigs are only materialized for the rows that are actually returned.
+    The view is read only, `add()` raises a TypeError.
+    """
+
+    def __init__(self, store: ColumnarHistory, name: str):
+        self._store = store
+        self._rows = store.rows_for(name)
+        self.name = name
+
+    @property
+    def history(self) -> List[RestoreConfig]:
+        return [self._store.restore_config(row) for row in self._rows]
+
+    def cfgs_before(self, ps_time: datetime.datetime):
+        millis = ps_time.timestamp() * 1000
+        return [self._store.restore_config(row) for row in self._rows
+                if self._store.time(row) < millis and self._store.action(row) == SSM_PUT]
+
+    def cfg_at(self, ps_time: datetime.datetime):
+        if not self._rows:
+            return None
+
+        # Matches ParameterHistory.cfg_at: the cfg directly before ps_time, else the latest cfg.
+        millis = ps_time.timestamp() * 1000
+        times = [self._store.time(row) for row in self._rows]
+        position = bisect_right(times, millis)
+        if 1 <= position < len(times) and times[position - 1] < millis:
+            return self._store.restore_config(self._rows[position - 1])
+
+        return self._store.restore_config(self._rows[-1])
+
+    def add(self, config: RestoreConfig):
+        raise TypeError("ColumnarParameterHistory is read only, add items to the ColumnarHistory instead.")
+
+    def __str__(self):
+        return f"ColumnarParameterHistory(name={self.name}, rows={len(self._rows)})"
+
+    def __repr__(self):
+        return self.__str__()
+
+
+class _HistoryMapping(Mapping):
+
+    def __init__(self, store: ColumnarHistory):
+        self._store = store
+        self._names = store.names()
+
+    def __getitem__(self, name: str) -> ColumnarParameterHistory:
+        if not len(self._store.rows_for(name)):
+            raise KeyError(name)
+
+        return self._store.parameter_history(name)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._names)
+
+    def __len__(self):
+        return len(self._names)
+
+
+class ColumnarPSHistory(PSHistory):
+    """
+    PSHistory compatible view over a ColumnarHistory. `history` maps parameter name -> ColumnarParameterHistory.
+    """
+
+    def __init__(self, store: ColumnarHistory):
+        self.store = store
+        self.history = _HistoryMapping(store)
+
+    def state_at(self, ps_time: datetime.datetime) -> Dict[str, RestoreConfig]:
+        return self.store.state_at(ps_time)
+
+    def __str__(self):
+        return f"ColumnarPSHistory(parameters={len(self.history)}, rows={len(self.store)})"
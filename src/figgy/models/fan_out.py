@@ -0,0 +1,67 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+from figgy.models.run_env import RunEnv
+
+
+class FanOutTarget:
+    """
+    A single account / region a fan-out call is run against.
+    """
+
+    def __init__(self, run_env: RunEnv, region: Optional[str] = None):
+        self.run_env = run_env
+        self.region = region
+
+    @property
+    def account(self) -> str:
+        """
+        Returns: The account this target is in, used to limit concurrency per account. Falls back to the env name
+        when the RunEnv has no account_id.
+        """
+        return self.run_env.account_id or self.run_env.env
+
+    def __eq__(self, obj):
+        if isinstance(obj, FanOutTarget):
+            return obj.run_env == self.run_env and obj.region == self.region
+
+        return False
+
+    def __hash__(self):
+        return hash((self.run_env, self.region))
+
+    def __str__(self):
+        return f'{self.run_env}/{self.region}' if self.region else str(self.run_env)
+
+    def __repr__(self):
+        return f'FanOutTarget({self})'
+
+
+class FanOutResult:
+    """
+    Per-target results of a fan-out call. One target failing doesn't fail the others, its error is in `failed`.
+    """
+
+    def __init__(self):
+        self.results: Dict[FanOutTarget, Any] = {}
+        self.failed: Dict[FanOutTarget, Exception] = {}
+
+    @property
+    def complete(self) -> bool:
+        return not self.failed
+
+    def merged(self) -> List[Tuple[FanOutTarget, Any]]:
+        """
+        Returns: Every result tagged with the target it came from. List / set / tuple results are flattened, so
+        a call returning a List[AuditLog] per account becomes a single List[(target, AuditLog)].
+        """
+        merged = []
+        for target, result in self.results.items():
+            if isinstance(result, (list, set, tuple)):
+                merged.extend((target, item) for item in result)
+            elif result is not None:
+                merged.append((target, result))
+
+        return merged
+
+    def __str__(self):
+        return f"Succeeded: {len(self.results)}, Failed: {len(self.failed)}"
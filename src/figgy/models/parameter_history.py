@@ -61,6 +61,7 @@ class ParameterHistory:
         if not self.name:
             self.name = config.ps_name
 
-        # Add and resort
+        # Add and resort, history is usually added in order so only sort when it isn't.
         self.history.append(config)
-        self.history = sorted(self.history, key=lambda x: x.ps_time)
+        if len(self.history) > 1 and self.history[-2].ps_time > config.ps_time:
+            self.history.sort(key=lambda x: x.ps_time)
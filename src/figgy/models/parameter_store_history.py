@@ -1,6 +1,10 @@
+import datetime
+from decimal import Decimal
 from typing import List, Dict
 
+from figgy.constants.data import SSM_PUT
 from figgy.models.parameter_history import ParameterHistory
+from figgy.models.restore_config import RestoreConfig
 
 
 class PSHistory:
@@ -13,5 +17,25 @@ class PSHistory:
         for cfg in configs:
             self.history[cfg.name] = cfg
 
+    def state_at(self, ps_time: datetime.datetime) -> Dict[str, RestoreConfig]:
+        """
+        Evaluates the state of every parameter in this history at `ps_time`.
+
+        Returns: Dict[str, RestoreConfig] - name -> latest PutParameter before `ps_time`, for each parameter whose
+        latest action before `ps_time` was not a delete.
+        """
+        time = Decimal(ps_time.timestamp() * 1000)
+        state = {}
+        for name, parameter in self.history.items():
+            latest = None
+            for cfg in parameter.history:
+                if cfg.ps_time < time:
+                    latest = cfg
+
+            if latest is not None and latest.ps_action == SSM_PUT:
+                state[name] = latest
+
+        return state
+
     def __str__(self):
         return f"{self.__dict__}"
@@ -0,0 +1,47 @@
+from typing import Dict, List
+
+
+class PrefixDiff:
+    """
+    Differences between every parameter under `source_prefix` and every parameter under `dest_prefix`. Parameters are
+    keyed by their name relative to their prefix, e.g. /app/x/db/host and /app/y/db/host are both `db/host`.
+    """
+
+    def __init__(self, source_prefix: str, dest_prefix: str):
+        self.source_prefix = source_prefix.rstrip('/')
+        self.dest_prefix = dest_prefix.rstrip('/')
+        self.added: List[str] = []
+        self.changed: List[str] = []
+        self.deleted: List[str] = []
+        self.unchanged: List[str] = []
+
+        # Relative name -> source describe_parameters metadata, for every added or changed parameter.
+        self.metadata: Dict[str, Dict] = {}
+
+    def source_name(self, relative: str) -> str:
+        return f'{self.source_prefix}/{relative}'
+
+    def dest_name(self, relative: str) -> str:
+        return f'{self.dest_prefix}/{relative}'
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.added or self.changed or self.deleted)
+
+    def __str__(self):
+        return f"Added: {len(self.added)}, Changed: {len(self.changed)}, Deleted: {len(self.deleted)}, " \
+               f"Unchanged: {len(self.unchanged)}"
+
+
+class PrefixSyncResult:
+    """
+    Summarizes the outcome of applying a PrefixDiff. Names are destination parameter names.
+    """
+
+    def __init__(self):
+        self.written: List[str] = []
+        self.deleted: List[str] = []
+        self.failed: Dict[str, Exception] = {}
+
+    def __str__(self):
+        return f"Written: {len(self.written)}, Deleted: {len(self.deleted)}, Failed: {len(self.failed)}"
@@ -0,0 +1,131 @@
+from typing import Dict
+
+from figgy.constants.data import SSM_GET
+from figgy.data.models.config_item import ConfigItem, ConfigState
+from figgy.models.audit_log import AuditLog
+from figgy.models.usage_log import UsageLog
+
+
+def _int(value):
+    # DynamoDB numbers arrive as Decimal, the pydantic models coerce them to int.
+    return int(value) if value is not None else None
+
+
+class _Record:
+    """
+    Lightweight, unvalidated counterpart of one of our pydantic models, for bulk reads from figgy's own tables.
+    Attributes are copied across as-is into `__slots__` and the ordering / hashing semantics of the stand-in model are
+    kept. Use `to_model()` to produce the validated pydantic model on demand.
+    """
+    __slots__ = ()
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return False
+
+        return all(getattr(self, slot) == getattr(other, slot) for slot in self.__slots__)
+
+    def __repr__(self):
+        fields = ', '.join(f'{slot}={getattr(self, slot)!r}' for slot in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+    def __str__(self):
+        return self.__repr__()
+
+    def dict(self) -> Dict:
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+
+class AuditLogRecord(_Record):
+    """
+    Fast-path stand in for AuditLog.
+    """
+    __slots__ = ('parameter_name', 'time', 'action', 'user', 'value', 'type', 'description', 'version', 'key_id')
+
+    Action = AuditLog.Action
+    Type = AuditLog.Type
+
+    def __init__(self, parameter_name: str, time: int, action: str, user: str, value=None, type=None,
+                 description=None, version=None, key_id=None):
+        self.parameter_name = parameter_name
+        self.time = time
+        self.action = action
+        self.user = user
+        self.value = value
+        self.type = type
+        self.description = description
+        self.version = version
+        self.key_id = key_id
+
+    @staticmethod
+    def from_item(item: Dict) -> "AuditLogRecord":
+        get = item.get
+        return AuditLogRecord(get('parameter_name'), _int(get('time')), get('action'), get('user'), get('value'),
+                              get('type'), get('description'), _int(get('version')), get('key_id'))
+
+    def to_model(self) -> AuditLog:
+        return AuditLog(**self.dict())
+
+    pretty_print = AuditLog.pretty_print
+    __gt__ = AuditLog.__gt__
+    __lt__ = AuditLog.__lt__
+    __hash__ = AuditLog.__hash__
+
+
+class UsageLogRecord(_Record):
+    """
+    Fast-path stand in for UsageLog.
+    """
+    __slots__ = ('parameter_name', 'last_updated', 'user', 'action')
+
+    def __init__(self, parameter_name: str, last_updated: int, user: str, action: str = SSM_GET):
+        self.parameter_name = parameter_name
+        self.last_updated = last_updated
+        self.user = user
+        self.action = action
+
+    @staticmethod
+    def from_item(item: Dict) -> "UsageLogRecord":
+        get = item.get
+        return UsageLogRecord(get('parameter_name'), _int(get('last_updated')), get('user'), get('action', SSM_GET))
+
+    def to_model(self) -> UsageLog:
+        return UsageLog(**self.dict())
+
+    def __gt__(self, other):
+        if isinstance(other, (UsageLog, UsageLogRecord)):
+            return self.last_updated > other.last_updated
+        else:
+            return self.last_updated > other
+
+    def __lt__(self, other):
+        # Mirrors UsageLog.__lt__, including its comparison against raw values.
+        if isinstance(other, (UsageLog, UsageLogRecord)):
+            return self.last_updated < other.last_updated
+        else:
+            return self.last_updated > other
+
+    __hash__ = UsageLog.__hash__
+
+
+class ConfigItemRecord(_Record):
+    """
+    Fast-path stand in for ConfigItem.
+    """
+    __slots__ = ('name', 'state', 'last_updated')
+
+    def __init__(self, name: str, state: ConfigState, last_updated: int):
+        self.name = name
+        self.state = state
+        self.last_updated = last_updated
+
+    @staticmethod
+    def from_item(item: Dict) -> "ConfigItemRecord":
+        last_updated = item.get('last_updated', ConfigItem.__fields__['last_updated'].default)
+        return ConfigItemRecord(item.get('parameter_name'), ConfigState[item.get('state')], _int(last_updated))
+
+    def to_model(self) -> ConfigItem:
+        return ConfigItem(parameter_name=self.name, state=self.state.name, last_updated=self.last_updated)
+
+    __lt__ = ConfigItem.__lt__
+    __hash__ = ConfigItem.__hash__
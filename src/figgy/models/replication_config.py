@@ -9,7 +9,7 @@ import getpass
 from typing import Dict, List, Optional, Union
 
 from figgy.models.serializable import Serializable
-from figgy.utils.utils import *
+from figgy.utils.utils import Utils
 
 
 class ReplicationType(Enum):
@@ -62,6 +62,21 @@ class ReplicationConfig(Serializable):
 
         return value
 
+    @staticmethod
+    def from_item(item: Dict) -> "ReplicationConfig":
+        """
+        Trusted fast path for items read back from our own replication table. Skips pydantic validation (and the
+        per-row getpass lookup) and builds the model directly. Use ReplicationConfig(**item) for untrusted input.
+        """
+        return ReplicationConfig.construct(
+            destination=item[REPL_DEST_KEY_NAME],
+            run_env=RunEnv.construct(env=item.get(REPL_RUN_ENV_KEY_NAME) or "unknown", account_id=None),
+            namespace=item.get(REPL_NAMESPACE_ATTR_NAME),
+            source=item[REPL_SOURCE_ATTR_NAME],
+            type=ReplicationType(item[REPL_TYPE_ATTR_NAME]),
+            user=item.get(REPL_USER_ATTR_NAME),
+        )
+
     @staticmethod
     def from_dict(conf: Dict, type: ReplicationType, run_env: RunEnv,
                   namespace: str = None, user: str = None) -> List:
@@ -86,6 +101,42 @@ class ReplicationConfig(Serializable):
                                           run_env=run_env, namespace=namespace, user=user))
         return cfgs
 
+    def get_source_names(self) -> List[str]:
+        """
+        Returns: List[str] - Names of all parameters this config reads from. For MERGE configs these are the
+        ${/parameter/references} embedded in the source list, literal segments are excluded.
+        """
+        if self.type == ReplicationType.MERGE:
+            sources = self.source if isinstance(self.source, list) else [self.source]
+            return [src[len(MERGE_KEY_PREFIX):-len(MERGE_KEY_SUFFIX)] for src in sources
+                    if src.startswith(MERGE_KEY_PREFIX) and src.endswith(MERGE_KEY_SUFFIX)]
+        else:
+            return [self.source]
+
+    def resolve(self, values: Dict[str, str]) -> Optional[str]:
+        """
+        Computes the value that should be replicated to this config's destination.
+        Args:
+            values: Parameter name -> value lookup containing (at least) every name from get_source_names()
+
+        Returns: The resolved value, or None if any required source is missing from `values`
+        """
+        if self.type == ReplicationType.MERGE:
+            sources = self.source if isinstance(self.source, list) else [self.source]
+            resolved = []
+            for src in sources:
+                if src.startswith(MERGE_KEY_PREFIX) and src.endswith(MERGE_KEY_SUFFIX):
+                    value = values.get(src[len(MERGE_KEY_PREFIX):-len(MERGE_KEY_SUFFIX)])
+                    if value is None:
+                        return None
+                    resolved.append(value)
+                else:
+                    resolved.append(src)
+
+            return ''.join(resolved)
+        else:
+            return values.get(self.source)
+
     def __str__(self):
         return f"{self.__dict__}"
 
@@ -0,0 +1,151 @@
+from collections import deque
+from typing import Dict, Iterable, List, Set, Tuple
+
+from figgy.models.replication_config import ReplicationConfig
+from figgy.utils.exceptions import ReplicationCycleError
+
+
+class ReplicationGraph:
+    """
+    Dependency graph over a set of ReplicationConfigs. Edges run from each source parameter to the destination it is
+    replicated into, so a destination that is itself a source elsewhere chains into further destinations.
+    """
+
+    def __init__(self, configs: Iterable[ReplicationConfig]):
+        self.configs: Dict[str, ReplicationConfig] = {}
+        self._edges: Dict[str, Set[str]] = {}
+
+        for config in configs:
+            self.configs[config.destination] = config
+            for source in config.get_source_names():
+                self._edges.setdefault(source, set()).add(config.destination)
+
+    def downstream_of(self, name: str) -> Set[str]:
+        """
+        Returns: Set[str] - every destination that transitively receives its value from `name`.
+        """
+        return self.__reachable([name])
+
+    def configs_downstream_of(self, names: Iterable[str]) -> List[ReplicationConfig]:
+        """
+        Returns the configs for every destination affected by a change to any of `names`, ordered so each config
+        comes after all configs it depends on. Configs that are part of a cycle are omitted.
+        """
+        affected = self.__reachable(names)
+        return [cfg for cfg in self.topological_order(skip_cycles=True) if cfg.destination in affected]
+
+    def topological_order(self, skip_cycles: bool = False) -> List[ReplicationConfig]:
+        """
+        Returns: List[ReplicationConfig] - configs ordered such that a destination is always synced after the
+        destinations it reads from.
+        """
+        return [cfg for level in self.levels(skip_cycles=skip_cycles) for cfg in level]
+
+    def levels(self, skip_cycles: bool = False) -> List[List[ReplicationConfig]]:
+        """
+        Groups configs into levels. Configs within a level are independent of each other and only depend on configs
+        in earlier levels, so each level can be synced concurrently.
+        Args:
+            skip_cycles: If True, configs that are part of (or downstream of) a cycle are left out instead of raising.
+
+        Returns: List[List[ReplicationConfig]]
+        """
+        levels, remaining = self.__kahn()
+        if remaining and not skip_cycles:
+            raise ReplicationCycleError(self.find_cycles())
+
+        return levels
+
+    def find_cycles(self) -> List[List[str]]:
+        """
+        Returns: List[List[str]] - each cycle's destinations. Uses Tarjan's strongly connected components.
+        """
+        index: Dict[str, int] = {}
+        low: Dict[str, int] = {}
+        on_stack: Set[str] = set()
+        stack: List[str] = []
+        cycles: List[List[str]] = []
+        counter = 0
+
+        for root in list(self._edges):
+            if root in index:
+                continue
+
+            # Iterative DFS to avoid recursion limits on deep replication chains
+            work: List[Tuple[str, Iterable[str]]] = [(root, iter(self._edges.get(root, ())))]
+            index[root] = low[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack.add(root)
+
+            while work:
+                node, children = work[-1]
+                advanced = False
+                for child in children:
+                    if child not in index:
+                        index[child] = low[child] = counter
+                        counter += 1
+                        stack.append(child)
+                        on_stack.add(child)
+                        work.append((child, iter(self._edges.get(child, ()))))
+                        advanced = True
+                        break
+                    elif child in on_stack:
+                        low[node] = min(low[node], index[child])
+
+                if advanced:
+                    continue
+
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+
+                if low[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.remove(member)
+                        component.append(member)
+                        if member == node:
+                            break
+
+                    if len(component) > 1 or node in self._edges.get(node, ()):
+                        cycles.append(sorted(component))
+
+        return cycles
+
+    def __reachable(self, names: Iterable[str]) -> Set[str]:
+        seen: Set[str] = set()
+        queue = deque(names)
+        while queue:
+            for dest in self._edges.get(queue.popleft(), ()):
+                if dest not in seen:
+                    seen.add(dest)
+                    queue.append(dest)
+
+        return seen
+
+    def __kahn(self) -> Tuple[List[List[ReplicationConfig]], Set[str]]:
+        # Only dependencies on other managed destinations matter, plain sources are always available.
+        in_degree: Dict[str, int] = {}
+        for dest, config in self.configs.items():
+            in_degree[dest] = len([src for src in set(config.get_source_names()) if src in self.configs])
+
+        levels: List[List[ReplicationConfig]] = []
+        current = [dest for dest, degree in in_degree.items() if degree == 0]
+        remaining = set(self.configs)
+
+        while current:
+            levels.append([self.configs[dest] for dest in sorted(current)])
+            remaining.difference_update(current)
+            upcoming = []
+            for dest in current:
+                for child in self._edges.get(dest, ()):
+                    if child in in_degree:
+                        in_degree[child] -= 1
+                        if in_degree[child] == 0:
+                            upcoming.append(child)
+            current = upcoming
+
+        return levels, remaining
@@ -0,0 +1,21 @@
+from typing import List, Dict
+
+
+class ReplicationSyncResult:
+    """
+    Summarizes the outcome of a bulk replication sync.
+    """
+
+    def __init__(self):
+        self.written: List[str] = []
+        self.unchanged: List[str] = []
+        self.missing_sources: List[str] = []
+        self.failed: Dict[str, Exception] = {}
+
+    @property
+    def total(self) -> int:
+        return len(self.written) + len(self.unchanged) + len(self.missing_sources) + len(self.failed)
+
+    def __str__(self):
+        return f"Written: {len(self.written)}, Unchanged: {len(self.unchanged)}, " \
+               f"Missing sources: {len(self.missing_sources)}, Failed: {len(self.failed)}"
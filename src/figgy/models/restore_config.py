@@ -7,6 +7,8 @@ class RestoreConfig:
     """
     Model used for defining values used to restore a parameter from parameter store
     """
+    __slots__ = ('ps_type', 'ps_key_id', 'ps_time', 'ps_description', 'ps_value', 'ps_name', 'ps_version', 'ps_user',
+                 'ps_action')
 
     def __init__(
             self,
@@ -30,7 +32,9 @@ class RestoreConfig:
         self.ps_user = ps_user
         self.ps_action = ps_action
 
-        self.props = {
+    @property
+    def props(self) -> Dict:
+        return {
             AUDIT_PARAMETER_ATTR_DESCRIPTION: self.ps_description,
             AUDIT_PARAMETER_KEY_NAME: self.ps_name,
             AUDIT_TIME_KEY_NAME: self.ps_time,
@@ -64,4 +68,4 @@ class RestoreConfig:
         return models
 
     def __str__(self) -> str:
-        return f"{self.__dict__}"
+        return f"{self.props}"
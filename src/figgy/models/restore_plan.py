@@ -0,0 +1,52 @@
+import datetime
+from typing import Dict, List
+
+from figgy.models.restore_config import RestoreConfig
+
+
+class RestorePlan:
+    """
+    The writes needed to bring every parameter under `prefix` back to its state at `ps_time`: a put for each parameter
+    whose value, type, description or KMS key differs from its state at `ps_time`, and a delete for each parameter
+    that didn't exist at `ps_time`. Parameters already in their target state are left alone.
+    """
+
+    def __init__(self, prefix: str, ps_time: datetime.datetime):
+        self.prefix = prefix
+        self.ps_time = ps_time
+        self.puts: List[RestoreConfig] = []
+        self.deletes: List[str] = []
+        self.unchanged: List[str] = []
+
+        # Parameter name -> why it's being written, e.g. ['value', 'description'] or ['missing']
+        self.reasons: Dict[str, List[str]] = {}
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.puts or self.deletes)
+
+    def report(self) -> str:
+        """
+        Returns: Human readable summary of every write in the plan. Values are never included.
+        """
+        lines = [f"Restore of {self.prefix} to {self.ps_time.isoformat()}: {self}"]
+        lines.extend(f"  PUT    {cfg.ps_name} ({', '.join(self.reasons.get(cfg.ps_name, []))})" for cfg in self.puts)
+        lines.extend(f"  DELETE {name}" for name in self.deletes)
+        return '\n'.join(lines)
+
+    def __str__(self):
+        return f"Puts: {len(self.puts)}, Deletes: {len(self.deletes)}, Unchanged: {len(self.unchanged)}"
+
+
+class RestoreResult:
+    """
+    Summarizes the outcome of executing a RestorePlan.
+    """
+
+    def __init__(self):
+        self.written: List[str] = []
+        self.deleted: List[str] = []
+        self.failed: Dict[str, Exception] = {}
+
+    def __str__(self):
+        return f"Written: {len(self.written)}, Deleted: {len(self.deleted)}, Failed: {len(self.failed)}"
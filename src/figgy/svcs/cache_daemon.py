@@ -0,0 +1,255 @@
+import argparse
+import inspect
+import json
+import logging
+import os
+import socket
+import socketserver
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+from figgy.data.clients import ClientFactory
+from figgy.data.dao.ssm import SsmDao
+from figgy.utils.cache import TtlCache
+from figgy.utils.cache_protocol import default_socket_path, encode, decode, error_to_dict, private_directory, \
+    socket_directory
+from figgy.utils.metrics import Metrics
+from figgy.utils.single_flight import SingleFlight
+
+log = logging.getLogger(__name__)
+
+# Tag for cached results that can't be tied to specific names (e.g. listings by prefix), dropped on every write.
+ANY_NAME = '*'
+
+# SsmDao reads that are cached. Each maps its bound arguments to the parameter names its result depends on.
+CACHED_OPERATIONS = {
+    'get_parameter': lambda args: [args['key']],
+    'get_parameter_encrypted': lambda args: [args['key']],
+    'get_parameter_details': lambda args: [args['name']],
+    'get_parameter_with_description': lambda args: [args['name']],
+    'get_description': lambda args: [args['name']],
+    'get_parameter_values': lambda args: [name.split(':')[0] for name in args['parameters']],
+    'get_parameter_metadata': lambda args: list(args['names']),
+    'get_all_parameters': lambda args: [ANY_NAME],
+    'get_all_param_names_fast': lambda args: [ANY_NAME],
+}
+
+# SsmDao writes, each maps its bound arguments to the parameter name it changes.
+WRITE_OPERATIONS = {
+    'set_parameter': lambda args: args['key'],
+    'delete_parameter': lambda args: args['key'],
+}
+
+
+class CacheDaemon:
+    """
+    Local parameter cache shared by every process on a host, served over a unix socket.
+
+    The daemon owns the SsmDao (and its pooled clients) and answers SsmDao calls made by SsmDaoProxy clients. Reads
+    are cached for `ttl_seconds`, and identical reads that arrive while one is in flight share its SSM call, so 30
+    workers starting together make one request per parameter rather than 30. Writes made through the daemon drop the
+    cached entries they affect; writes made elsewhere become visible once the TTL expires.
+
+    Decrypted values are held in the daemon's memory and served to anyone who can connect to the socket, which is
+    created readable / writable by the daemon's user only, by default in a per-user 0700 directory. Clients refuse
+    sockets owned by, or served by a process of, another user.
+
+        CacheDaemon.from_factory(ClientFactory.shared(region='us-east-1')).serve_forever()
+
+        python -m figgy.svcs.cache_daemon --region us-east-1 --ttl-seconds 30
+    """
+
+    def __init__(self, ssm_dao: SsmDao, socket_path: Optional[str] = None, ttl_seconds: float = 10,
+                 max_entries: int = 10000):
+        """
+        Args:
+            ssm_dao: SsmDao to serve calls with
+            socket_path: Unix socket to listen on, defaults to cache_protocol.default_socket_path()
+            ttl_seconds: How long a cached read is served before it's fetched again
+            max_entries: Max cached results, least recently used are evicted first
+        """
+        self._ssm = ssm_dao
+        self.socket_path = socket_path or default_socket_path()
+        self._cache = TtlCache(ttl_seconds=ttl_seconds, max_entries=max_entries)
+        self._flight = SingleFlight()
+        self._hits = 0
+        self._misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._server: Optional[socketserver.UnixStreamServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_factory(cls, factory: ClientFactory, **kwargs) -> 'CacheDaemon':
+        return cls(SsmDao(factory.ssm()), **kwargs)
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {'hits': self._hits, 'misses': self._misses, 'collapsed': self._flight.collapsed,
+                'entries': len(self._cache)}
+
+    def serve_forever(self) -> None:
+        self.__bind()
+        log.info(f"Figgy cache daemon listening on {self.socket_path}")
+        try:
+            self._server.serve_forever()
+        finally:
+            self.__cleanup()
+
+    def start(self) -> 'CacheDaemon':
+        """
+        Serves on a background thread.
+        """
+        self.__bind()
+        self._thread = threading.Thread(target=self._server.serve_forever, name='figgy-cache-daemon', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            if self._thread is not None:
+                self._thread.join()
+            self.__cleanup()
+
+    def __enter__(self) -> 'CacheDaemon':
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+    def handle(self, request: Dict) -> Dict:
+        """
+        Returns: The response to a single request, see figgy.utils.cache_protocol.
+        """
+        try:
+            return {'ok': True, 'result': self.__call(request['op'], request.get('args', []),
+                                                      request.get('kwargs', {}))}
+        except Exception as e:
+            return {'ok': False, 'error': error_to_dict(e)}
+
+    def __call(self, op: str, args: List, kwargs: Dict) -> Any:
+        method = getattr(type(self._ssm), op, None)
+        if op.startswith('_') or not callable(method):
+            raise AttributeError(f"SsmDao has no operation {op}")
+
+        method = getattr(self._ssm, op)
+        bound = inspect.signature(method).bind(*args, **kwargs)
+        bound.apply_defaults()
+
+        if op in WRITE_OPERATIONS:
+            try:
+                return method(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._writes += 1
+                written = [WRITE_OPERATIONS[op](bound.arguments), ANY_NAME]
+                self._cache.invalidate(written)
+                # Reads already in flight may predate the write, later reads mustn't join them.
+                for tag in written:
+                    self._flight.forget(tag)
+
+        if op not in CACHED_OPERATIONS:
+            return method(*args, **kwargs)
+
+        key = json.dumps([op, args, kwargs], sort_keys=True, default=self.__key_default)
+        missing = object()
+        cached = self._cache.get(key, missing)
+        with self._lock:
+            if cached is not missing:
+                self._hits += 1
+            else:
+                self._misses += 1
+
+        if cached is not missing:
+            Metrics.count(f'cache.{op}', 'hit')
+            return cached
+
+        Metrics.count(f'cache.{op}', 'miss')
+        names = CACHED_OPERATIONS[op](bound.arguments)
+        return self._flight.do(key, lambda: self.__fetch(key, method, args, kwargs, names), tags=names)
+
+    def __fetch(self, key: str, method, args: List, kwargs: Dict, names: Iterable[str]) -> Any:
+        writes = self._writes
+        # Round trip through the wire format so the cached copy is exactly what's served, and can't be mutated.
+        result = decode(encode({'result': method(*args, **kwargs)}))['result']
+
+        # A write that landed while this read was in flight may not be reflected in it, don't cache it.
+        if writes == self._writes:
+            self._cache.put(key, result, tags=names)
+
+        return result
+
+    def __bind(self) -> None:
+        directory = os.path.dirname(self.socket_path)
+        if directory == socket_directory():
+            private_directory(directory)
+
+        if os.path.exists(self.socket_path):
+            if self.__in_use():
+                raise RuntimeError(f"A cache daemon is already listening on {self.socket_path}")
+            os.unlink(self.socket_path)  # Left behind by a daemon that didn't shut down cleanly
+
+        daemon = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    try:
+                        response = daemon.handle(decode(line))
+                    except ValueError as e:
+                        response = {'ok': False, 'error': error_to_dict(e)}
+
+                    self.wfile.write(encode(response))
+                    self.wfile.flush()
+
+        class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+            daemon_threads = True
+            request_queue_size = 128  # Every worker on the host may connect at once on startup
+
+        # Only the daemon's user may connect: the socket serves decrypted values.
+        previous = os.umask(0o177)
+        try:
+            self._server = Server(self.socket_path, Handler)
+        finally:
+            os.umask(previous)
+
+    @staticmethod
+    def __key_default(value: Any) -> Any:
+        # Sets arrive decoded as sets, sort them so equal arguments always produce the same key.
+        if isinstance(value, (set, frozenset)):
+            return sorted(value, key=str)
+
+        return str(value)
+
+    def __in_use(self) -> bool:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+            try:
+                probe.connect(self.socket_path)
+                return True
+            except OSError:
+                return False
+
+    def __cleanup(self) -> None:
+        self._server.server_close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description='Serves a shared figgy parameter cache over a unix socket.')
+    parser.add_argument('--socket', help='Socket path, defaults to $FIGGY_CACHE_SOCKET or a per-user path')
+    parser.add_argument('--region', help='AWS region')
+    parser.add_argument('--profile', help='AWS profile')
+    parser.add_argument('--ttl-seconds', type=float, default=10, help='How long cached reads are served')
+    parser.add_argument('--max-entries', type=int, default=10000, help='Max cached results')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    factory = ClientFactory.shared(region=args.region, profile=args.profile)
+    CacheDaemon.from_factory(factory, socket_path=args.socket, ttl_seconds=args.ttl_seconds,
+                             max_entries=args.max_entries).serve_forever()
+
+
+if __name__ == '__main__':
+    main()
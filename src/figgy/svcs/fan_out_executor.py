@@ -0,0 +1,169 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from figgy.data.clients import ClientFactory
+from figgy.models.fan_out import FanOutResult, FanOutTarget
+from figgy.models.run_env import RunEnv
+from figgy.utils.metrics import Metrics
+from figgy.utils.utils import Utils
+
+log = logging.getLogger(__name__)
+
+# DAO class name -> ClientFactory method building the client / resource it takes.
+_DAO_CLIENTS = {
+    'SsmDao': 'ssm',
+    'KmsDao': 'kms',
+    'AuditDao': 'dynamodb',
+    'ConfigDao': 'dynamodb',
+    'ReplicationDao': 'dynamodb',
+    'UsageTrackerDao': 'dynamodb',
+    'UserCacheDao': 'dynamodb',
+}
+
+
+class FanOutExecutor:
+    """
+    Runs the same DAO call against many accounts and regions concurrently.
+
+    Each RunEnv has its own ClientFactory (e.g. a profile per account); a DAO is built once per (DAO type, RunEnv,
+    region) and reused across calls. At most `max_per_account` calls are in flight against any one account, so a
+    wide fan-out doesn't eat a single account's API throughput. Failures are collected per target rather than raised.
+
+        executor = FanOutExecutor.from_profiles({RunEnv(env='dev', account_id='111'): 'dev',
+                                                 RunEnv(env='prod', account_id='222'): 'prod'},
+                                                regions=['us-east-1', 'us-west-2'])
+        result = executor.call(AuditDao, 'get_audit_logs', '/app/demo-time/db/host', after=last_week)
+        for target, log in result.merged():
+            ...
+    """
+
+    def __init__(self, factories: Dict[RunEnv, ClientFactory], regions: Optional[Iterable[str]] = None,
+                 max_workers: int = 20, max_per_account: int = 4):
+        """
+        Args:
+            factories: RunEnv -> ClientFactory to build that account's clients with
+            regions: Regions to run every call in. Defaults to each factory's own region.
+            max_workers: Max calls in flight across all targets
+            max_per_account: Max calls in flight against a single account, across its regions
+        """
+        Utils.validate(max_workers > 0, f"max_workers must be greater than 0, got: {max_workers}")
+        Utils.validate(max_per_account > 0, f"max_per_account must be greater than 0, got: {max_per_account}")
+        self._factories = dict(factories)
+        self._regions = list(regions) if regions else [None]
+        self._max_workers = max_workers
+        self._max_per_account = max_per_account
+        self._daos: Dict[Tuple[str, FanOutTarget], Any] = {}
+        self._account_limits: Dict[str, threading.Semaphore] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_profiles(cls, profiles: Dict[RunEnv, str], regions: Optional[Iterable[str]] = None,
+                      **kwargs) -> 'FanOutExecutor':
+        """
+        Builds an executor using the shared ClientFactory of each AWS profile.
+        Args:
+            profiles: RunEnv -> AWS profile name for that account
+            regions: Regions to run every call in
+            kwargs: Passed on to the FanOutExecutor constructor
+        """
+        return cls({run_env: ClientFactory.shared(profile=profile) for run_env, profile in profiles.items()},
+                   regions=regions, **kwargs)
+
+    @property
+    def targets(self) -> List[FanOutTarget]:
+        return [FanOutTarget(run_env, region) for run_env in self._factories for region in self._regions]
+
+    def dao(self, dao_type, target: FanOutTarget, builder: Callable[[ClientFactory, Optional[str]], Any] = None):
+        """
+        Returns: The cached `dao_type` instance for `target`, built with `builder(factory, region)` if provided,
+        otherwise by passing the DAO the client it takes.
+        """
+        key = (dao_type.__name__, target)
+        dao = self._daos.get(key)
+        if dao is not None:
+            return dao
+
+        with self._lock:
+            dao = self._daos.get(key)
+            if dao is None:
+                factory = self._factories[target.run_env]
+                if builder:
+                    dao = builder(factory, target.region)
+                else:
+                    Utils.validate(dao_type.__name__ in _DAO_CLIENTS,
+                                   f"Don't know how to build a {dao_type.__name__}, pass a builder.")
+                    dao = dao_type(getattr(factory, _DAO_CLIENTS[dao_type.__name__])(target.region))
+
+                self._daos[key] = dao
+
+            return dao
+
+    def run(self, dao_type, fn: Callable[[Any], Any], targets: Optional[Iterable[FanOutTarget]] = None,
+            builder: Callable[[ClientFactory, Optional[str]], Any] = None) -> FanOutResult:
+        """
+        Calls `fn(dao)` with a `dao_type` DAO for every target, concurrently.
+        Args:
+            dao_type: DAO class to call, e.g. SsmDao
+            fn: Called with each target's DAO. Generators it returns are read to the end on the worker thread.
+            targets: Targets to run against, defaults to every RunEnv in every region.
+            builder: Optional DAO builder, see `dao()`
+
+        Returns: FanOutResult - each target's result, or the exception it raised.
+        """
+        start_time = time.time()
+        targets = self.__interleave(list(targets) if targets is not None else self.targets)
+        result = FanOutResult()
+        operation = Metrics.current_operation()
+
+        def call(target: FanOutTarget):
+            with self.__account_limit(target.account), Metrics.operation(operation):
+                value = fn(self.dao(dao_type, target, builder))
+                return list(value) if isinstance(value, Iterator) else value
+
+        with ThreadPoolExecutor(max_workers=min(self._max_workers, max(len(targets), 1))) as pool:
+            futures = {target: pool.submit(call, target) for target in targets}
+
+        for target, future in futures.items():
+            try:
+                result.results[target] = future.result()
+            except Exception as e:
+                log.warning(f"Fan-out call to {target} failed: {e}")
+                result.failed[target] = e
+
+        log.info(f"Fan-out of {dao_type.__name__} call to {len(targets)} target(s) complete after "
+                 f"{time.time() - start_time} seconds. {result}")
+        return result
+
+    def call(self, dao_type, method: str, *args, targets: Optional[Iterable[FanOutTarget]] = None,
+             **kwargs) -> FanOutResult:
+        """
+        Calls `dao.<method>(*args, **kwargs)` on every target, e.g. call(SsmDao, 'get_parameter', '/shared/db/host')
+        """
+        return self.run(dao_type, lambda dao: getattr(dao, method)(*args, **kwargs), targets=targets)
+
+    def __account_limit(self, account: str) -> threading.Semaphore:
+        with self._lock:
+            limit = self._account_limits.get(account)
+            if limit is None:
+                limit = self._account_limits[account] = threading.Semaphore(self._max_per_account)
+
+            return limit
+
+    @staticmethod
+    def __interleave(targets: List[FanOutTarget]) -> List[FanOutTarget]:
+        # Round robin across accounts, so workers aren't all queued up behind one account's limit.
+        by_account: Dict[str, List[FanOutTarget]] = {}
+        for target in targets:
+            by_account.setdefault(target.account, []).append(target)
+
+        interleaved = []
+        while by_account:
+            for account in list(by_account):
+                interleaved.append(by_account[account].pop(0))
+                if not by_account[account]:
+                    del by_account[account]
+
+        return interleaved
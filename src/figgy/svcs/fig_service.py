@@ -1,14 +1,26 @@
-from typing import Union
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Union
 
+from figgy.data.dao.config import ConfigDao
 from figgy.data.dao.ssm import SsmDao
 from figgy.models.fig import Fig
+from figgy.svcs.fig_watcher import FigWatcher, WatchCallback
+from figgy.utils.rate_limiter import CapacityLimiter
 from figgy.utils.utils import Utils
 
 
 class FigService:
 
-    def __init__(self, ssm_dao: SsmDao):
+    def __init__(self, ssm_dao: SsmDao, max_workers: int = 10, config_dao: ConfigDao = None):
+        """
+        Args:
+            ssm_dao: SsmDao to read / write parameters through
+            max_workers: Concurrent SSM calls made by bulk reads like get_many / get_tree
+            config_dao: ConfigDao over the config cache table, required to `watch` for changes
+        """
         self._ssm = ssm_dao
+        self._max_workers = max_workers
+        self._config = config_dao
 
     def get(self, name: str, version: int = 0) -> Fig:
         """ Version is defaulted to 0 which will return latest """
@@ -19,6 +31,49 @@ class FigService:
         value = self._ssm.get_parameter(name)
         return Fig(name=name, value=value, is_latest_version=True)
 
+    def get_many(self, names: Iterable[str], decrypt: bool = True,
+                 versions: Optional[Dict[str, int]] = None) -> Dict[str, Fig]:
+        """
+        Bulk version of `get`. Values are fetched 10 at a time with get_parameters and metadata 50 at a time with
+        describe_parameters, concurrently, rather than paging through each parameter's history.
+        Args:
+            names: Parameter names to fetch
+            decrypt: Decrypt SecureString values
+            versions: Optional name -> version to pin. Names not in here (or pinned to 0) return the latest version.
+
+        Returns: Dict[name, Fig] - names that don't exist (or have no such version) are left out.
+        """
+        names = list(dict.fromkeys(names))
+        metadata = self._ssm.get_parameter_metadata(names, max_workers=self._max_workers)
+        return self.__load(names, metadata, decrypt, versions or {})
+
+    def get_tree(self, prefix: str, decrypt: bool = True,
+                 versions: Optional[Dict[str, int]] = None) -> Dict[str, Fig]:
+        """
+        Every parameter under `prefix`, recursively, as Figs. Metadata for the whole tree is paged with
+        describe_parameters, then values are fetched with batched get_parameters calls.
+        Args:
+            prefix: e.g. /app/demo-time
+            decrypt: Decrypt SecureString values
+            versions: Optional name -> version to pin, see get_many
+
+        Returns: Dict[name, Fig]
+        """
+        metadata = self._ssm.get_all_parameters([prefix])
+        return self.__load([param['Name'] for param in metadata], metadata, decrypt, versions or {})
+
+    def watch(self, prefixes: Iterable[str], callback: WatchCallback, interval_seconds: float = 10,
+              debounce_seconds: float = 1, decrypt: bool = True, read_limiter: CapacityLimiter = None) -> FigWatcher:
+        """
+        Calls `callback` on a background thread with name -> Fig (None if deleted) whenever parameters under
+        `prefixes` change. Changes are detected with one config cache scan per interval, however many keys are
+        watched, and only changed parameters are re-fetched. Each scan reads the whole cache table, see FigWatcher.
+        Returns: The started FigWatcher, stop() it when done.
+        """
+        Utils.validate(self._config is not None, "FigService needs a config_dao to watch for changes.")
+        return FigWatcher(self, self._config, prefixes, callback, interval_seconds=interval_seconds,
+                          debounce_seconds=debounce_seconds, decrypt=decrypt, read_limiter=read_limiter).start()
+
     def save(self, fig: Fig):
         self._ssm.set_parameter(
             key=fig.name,
@@ -35,3 +90,28 @@ class FigService:
         Utils.validate_set(fig, 'Fig Name')
         name = fig.name if isinstance(fig, Fig) else fig
         self._ssm.delete_parameter(name)
+
+    def __load(self, names: List[str], metadata: List[Dict], decrypt: bool, versions: Dict[str, int]) -> Dict[str, Fig]:
+        described = {param['Name']: param for param in metadata}
+        names = [name for name in names if name in described]
+        selectors = [f'{name}:{versions[name]}' if versions.get(name) else name for name in names]
+
+        figs: Dict[str, Fig] = {}
+        history_lookups = []
+        for param in self._ssm.get_parameter_values(selectors, decrypt=decrypt, max_workers=self._max_workers):
+            latest = described[param['Name']]
+            if param.get('Version') != latest.get('Version') and versions.get(param['Name']):
+                # Description / KeyId / user of an older version only exist in its history.
+                history_lookups.append(param['Name'])
+                continue
+
+            figs[param['Name']] = Fig(**{**latest, **param}, is_latest_version=True)
+
+        if history_lookups:
+            with ThreadPoolExecutor(max_workers=self._max_workers) as pool:
+                pinned = pool.map(lambda name: self._ssm.get_parameter_details(name, versions[name]), history_lookups)
+                for name, (details, is_latest_version) in zip(history_lookups, pinned):
+                    if details:
+                        figs[name] = Fig(**details, is_latest_version=is_latest_version)
+
+        return figs
@@ -0,0 +1,149 @@
+import logging
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional, Set, Tuple
+
+from figgy.data.dao.config import ConfigDao
+from figgy.data.models.config_item import ConfigState
+from figgy.models.fig import Fig
+from figgy.utils.metrics import Metrics
+from figgy.utils.rate_limiter import CapacityLimiter
+from figgy.utils.utils import Utils
+
+log = logging.getLogger(__name__)
+
+# The config cache's last_updated comes from the writer's clock, re-read this far behind the watermark so late or
+# skewed writes aren't missed. Re-reads are de-duplicated.
+CLOCK_SKEW_MILLIS = 5000
+
+WatchCallback = Callable[[Dict[str, Optional[Fig]]], None]
+
+
+class FigWatcher:
+    """
+    Watches prefixes for parameter changes on a background thread and delivers them to a callback.
+
+    Each poll reads the config cache for entries updated after the last seen `last_updated` watermark, no matter how
+    many keys are watched. Changes under the watched prefixes are collected until `debounce_seconds` pass without
+    new ones, then only the changed parameters are re-fetched, in bulk, and handed to the callback as name -> Fig,
+    or name -> None for deleted parameters.
+
+    The cache table has no index on last_updated, so every poll is a full (projected) scan of it and costs read
+    capacity in proportion to the table's size. Pass a `read_limiter` and size `interval_seconds` accordingly on
+    large tables.
+
+        watcher = fig_service.watch(['/app/demo-time'], lambda changes: reload(changes))
+        ...
+        watcher.stop()
+    """
+
+    def __init__(self, fig_service, config_dao: ConfigDao, prefixes: Iterable[str], callback: WatchCallback,
+                 interval_seconds: float = 10, debounce_seconds: float = 1, decrypt: bool = True,
+                 read_limiter: CapacityLimiter = None):
+        """
+        Args:
+            fig_service: FigService used to re-fetch changed parameters
+            config_dao: ConfigDao the config cache is polled through
+            prefixes: Prefixes to watch, e.g. ['/app/demo-time', '/shared/db']
+            callback: Called on the watcher thread with name -> Fig (None if deleted) for each batch of changes
+            interval_seconds: Time between polls
+            debounce_seconds: Changes are held until none have arrived for this long, so bursts are delivered once
+            decrypt: Decrypt SecureString values when re-fetching
+            read_limiter: Optional read capacity budget for the poll scans, defaults to the ConfigDao's
+        """
+        Utils.validate(interval_seconds > 0, f"interval_seconds must be greater than 0, got: {interval_seconds}")
+        self._figs = fig_service
+        self._config = config_dao
+        self._prefixes = tuple(p.rstrip('/') for p in prefixes)
+        self._callback = callback
+        self._interval = interval_seconds
+        self._debounce = debounce_seconds
+        self._decrypt = decrypt
+        self._limiter = read_limiter
+
+        self._watermark = Utils.millis_since_epoch()
+        self._seen: Set[Tuple[str, int]] = set()
+        self._pending: Dict[str, ConfigState] = {}
+        self._last_change = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def watermark(self) -> int:
+        """
+        Returns: The latest config cache `last_updated` this watcher has seen, in millis since epoch.
+        """
+        return self._watermark
+
+    def start(self) -> 'FigWatcher':
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.__run, name='figgy-watcher', daemon=True)
+            self._thread.start()
+
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+
+    def __enter__(self) -> 'FigWatcher':
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+    @Metrics.timed('watch.poll')
+    def poll(self) -> Dict[str, Optional[Fig]]:
+        """
+        Runs a single poll. Returns the changes delivered by it, empty if there were none or they're being debounced.
+        """
+        after = self._watermark - CLOCK_SKEW_MILLIS
+        for item in self._config.get_config_names_after(after, exclude_prefixes=[], validate=False,
+                                                        read_limiter=self._limiter):
+            self._watermark = max(self._watermark, item.last_updated)
+            key = (item.name, item.last_updated)
+            if key in self._seen or not self.__watched(item.name):
+                continue
+
+            self._seen.add(key)
+            self._pending[item.name] = item.state
+            self._last_change = time.monotonic()
+
+        # Entries older than the re-read window can't come back, stop tracking them.
+        self._seen = {key for key in self._seen if key[1] >= self._watermark - CLOCK_SKEW_MILLIS}
+
+        if not self._pending or time.monotonic() - self._last_change < self._debounce:
+            return {}
+
+        pending, self._pending = self._pending, {}
+        return self.__deliver(pending)
+
+    def __run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.poll()
+            except Exception as e:
+                log.warning(f"Watch poll failed, retrying next interval: {e}")
+
+            # While changes are being debounced, check back sooner than a full interval.
+            wait = min(self._interval, self._debounce) if self._pending else self._interval
+            self._stop.wait(wait)
+
+    def __deliver(self, pending: Dict[str, ConfigState]) -> Dict[str, Optional[Fig]]:
+        active = [name for name, state in pending.items() if state == ConfigState.ACTIVE]
+        figs = self._figs.get_many(active, decrypt=self._decrypt) if active else {}
+
+        # A parameter deleted right after its cache entry was written is reported as deleted.
+        changes: Dict[str, Optional[Fig]] = {name: figs.get(name) for name in pending}
+        log.info(f"Delivering {len(changes)} changed parameter(s) to watcher callback.")
+
+        try:
+            self._callback(changes)
+        except Exception as e:
+            log.exception(f"Watcher callback failed: {e}")
+
+        return changes
+
+    def __watched(self, name: str) -> bool:
+        return any(name == prefix or name.startswith(prefix + '/') for prefix in self._prefixes)
@@ -0,0 +1,177 @@
+import hashlib
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from figgy.constants.data import SSM_SECURE_STRING
+from figgy.data.dao.ssm import SsmDao
+from figgy.models.prefix_diff import PrefixDiff, PrefixSyncResult
+from figgy.utils.concurrent_writer import ConcurrentWriter
+from figgy.utils.metrics import Metrics
+from figgy.utils.rate_limiter import RateLimiter
+from figgy.utils.utils import Utils
+
+log = logging.getLogger(__name__)
+
+# Values are fetched, hashed and dropped this many parameters at a time, so at most one batch of plaintext is held.
+VALUE_BATCH_SIZE = 500
+
+
+class PrefixSyncService:
+    """
+    Diffs two parameter trees, e.g. /app/x against /app/y, or the same prefix in two accounts, and applies the
+    differences to the destination.
+
+    Both trees are listed with paginated describe_parameters calls, in parallel. Only parameters present in both are
+    compared by value: their values are fetched with batched `get_parameters` calls and reduced to a digest one batch
+    at a time, so decrypted values are never all held at once and never end up in the diff.
+
+        service = PrefixSyncService(SsmDao(dev_ssm), SsmDao(prod_ssm), key_id=prod_key)
+        diff = service.diff('/app/demo-time', '/app/demo-time')
+        result = service.apply(diff, delete=True)
+    """
+
+    def __init__(self, source_ssm: SsmDao, dest_ssm: Optional[SsmDao] = None, key_id: Optional[str] = None,
+                 max_readers: int = 10, max_writers: int = 5, writes_per_second: Optional[float] = None):
+        """
+        Args:
+            source_ssm: SsmDao to read the source tree with
+            dest_ssm: SsmDao for the destination tree, defaults to source_ssm when syncing within an account
+            key_id: KMS Key Id destination SecureStrings are encrypted with. Defaults to the source parameter's key,
+            which only works within an account.
+            max_readers: Number of `get_parameters` batches to fetch concurrently, per tree
+            max_writers: Number of concurrent `put_parameter` / `delete_parameter` calls
+            writes_per_second: Optional cap on destination writes per second, to leave SSM throughput for other
+            clients of the destination account.
+        """
+        self._source = source_ssm
+        self._dest = dest_ssm or source_ssm
+        self._key_id = key_id
+        self._max_readers = max_readers
+        limiter = RateLimiter(writes_per_second) if writes_per_second else None
+        self._writer = ConcurrentWriter(max_workers=max_writers, rate_limiter=limiter)
+
+    @Metrics.timed('sync.diff')
+    def diff(self, source_prefix: str, dest_prefix: str) -> PrefixDiff:
+        """
+        Compares every parameter under `source_prefix` with the parameter at the same relative name under
+        `dest_prefix`. A parameter is changed if its value, type or description differ.
+
+        Returns: PrefixDiff - relative names added (source only), changed, deleted (destination only) and unchanged.
+        """
+        start_time = time.time()
+        diff = PrefixDiff(source_prefix, dest_prefix)
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            source_future = pool.submit(self.__list, self._source, diff.source_prefix)
+            dest_future = pool.submit(self.__list, self._dest, diff.dest_prefix)
+            source, dest = source_future.result(), dest_future.result()
+
+        common = [rel for rel in source if rel in dest]
+        diff.added = sorted(rel for rel in source if rel not in dest)
+        diff.deleted = sorted(rel for rel in dest if rel not in source)
+
+        changed = set()
+        for rel in common:
+            if source[rel].get('Type') != dest[rel].get('Type') \
+                    or source[rel].get('Description', '') != dest[rel].get('Description', ''):
+                changed.add(rel)
+
+        # Values only need comparing where the metadata matches.
+        compare = [rel for rel in common if rel not in changed]
+        for chunk in Utils.chunk_list(compare, VALUE_BATCH_SIZE):
+            with ThreadPoolExecutor(max_workers=2) as pool:
+                source_future = pool.submit(self.__digests, self._source, [diff.source_name(rel) for rel in chunk])
+                dest_future = pool.submit(self.__digests, self._dest, [diff.dest_name(rel) for rel in chunk])
+                source_digests, dest_digests = source_future.result(), dest_future.result()
+
+            for rel in chunk:
+                if source_digests.get(diff.source_name(rel)) != dest_digests.get(diff.dest_name(rel)):
+                    changed.add(rel)
+
+        diff.changed = sorted(changed)
+        diff.unchanged = sorted(rel for rel in common if rel not in changed)
+        diff.metadata = {rel: source[rel] for rel in diff.added + diff.changed}
+
+        log.info(f"Diffed {diff.source_prefix} against {diff.dest_prefix} in {time.time() - start_time} seconds. "
+                 f"{diff}")
+        return diff
+
+    def apply(self, diff: PrefixDiff, delete: bool = False, dry_run: bool = False) -> PrefixSyncResult:
+        """
+        Writes every added and changed parameter in `diff` to the destination, and optionally deletes parameters that
+        only exist in the destination. Source values are re-read at apply time, in batches.
+        Args:
+            diff: PrefixDiff from `diff()`
+            delete: Delete destination parameters that don't exist in the source.
+            dry_run: If True, compute what would be written / deleted without changing anything.
+
+        Returns: PrefixSyncResult - destination names written, deleted, or failed.
+        """
+        start_time = time.time()
+        result = PrefixSyncResult()
+        pending = diff.added + diff.changed
+        deletes = [diff.dest_name(rel) for rel in diff.deleted] if delete else []
+
+        if dry_run:
+            result.written = [diff.dest_name(rel) for rel in pending]
+            result.deleted = deletes
+            return result
+
+        for chunk in Utils.chunk_list(pending, VALUE_BATCH_SIZE):
+            values = self.__values(self._source, [diff.source_name(rel) for rel in chunk])
+            writes = []
+            for rel in chunk:
+                param = values.get(diff.source_name(rel))
+                if param is None:
+                    # Deleted from the source since the diff was taken.
+                    result.failed[diff.dest_name(rel)] = Exception(f"Source parameter {diff.source_name(rel)} "
+                                                                   f"no longer exists.")
+                    continue
+
+                writes.append((diff.dest_name(rel), self.__writer_for(diff, rel, param)))
+
+            written, failed = self._writer.write_all(writes)
+            result.written.extend(written)
+            result.failed.update(failed)
+
+        if deletes:
+            deleted, failed = self._writer.write_all((name, self.__deleter_for(name)) for name in deletes)
+            result.deleted.extend(deleted)
+            result.failed.update(failed)
+
+        log.info(f"Applied diff of {diff.source_prefix} to {diff.dest_prefix} in {time.time() - start_time} seconds. "
+                 f"{result}")
+        return result
+
+    def __list(self, ssm: SsmDao, prefix: str) -> Dict[str, Dict]:
+        strip = len(prefix) + 1
+        return {param['Name'][strip:]: param for param in ssm.get_all_parameters([prefix])}
+
+    def __values(self, ssm: SsmDao, names: List[str]) -> Dict[str, Dict]:
+        params = ssm.get_parameter_values(names, decrypt=True, max_workers=self._max_readers)
+        return {param['Name']: param for param in params}
+
+    def __digests(self, ssm: SsmDao, names: List[str]) -> Dict[str, bytes]:
+        return {name: self.__digest(param) for name, param in self.__values(ssm, names).items()}
+
+    @staticmethod
+    def __digest(param: Dict) -> bytes:
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(param.get('Type', '').encode())
+        digest.update(b'\0')
+        digest.update(param.get('Value', '').encode())
+        return digest.digest()
+
+    def __writer_for(self, diff: PrefixDiff, relative: str, param: Dict):
+        name, value, type = diff.dest_name(relative), param['Value'], param['Type']
+        desc = diff.metadata.get(relative, {}).get('Description')
+        key_id = None
+        if type == SSM_SECURE_STRING:
+            key_id = self._key_id or diff.metadata.get(relative, {}).get('KeyId')
+
+        return lambda: self._dest.set_parameter(name, value, desc, type=type, key_id=key_id)
+
+    def __deleter_for(self, name: str):
+        return lambda: self._dest.delete_parameter(name)
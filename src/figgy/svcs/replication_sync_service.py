@@ -0,0 +1,140 @@
+import logging
+import time
+from typing import Iterable, Dict, List, Optional
+
+from figgy.constants.data import SSM_SECURE_STRING
+from figgy.data.dao.ssm import SsmDao
+from figgy.models.replication_config import ReplicationConfig
+from figgy.models.replication_graph import ReplicationGraph
+from figgy.models.replication_sync_result import ReplicationSyncResult
+from figgy.utils.concurrent_writer import ConcurrentWriter
+from figgy.utils.exceptions import ReplicationCycleError
+
+log = logging.getLogger(__name__)
+
+
+class ReplicationSyncService:
+    """
+    Syncs replicated values in bulk. All sources and destinations are fetched with batched `get_parameters` calls,
+    MERGE sources are resolved locally, and only destinations whose value has changed are written back. Destinations
+    keep their description; new ones take their source's, if they have a single source.
+    """
+
+    def __init__(self, ssm_dao: SsmDao, key_id: str, max_readers: int = 10, max_writers: int = 5):
+        """
+        Args:
+            ssm_dao: SsmDao to read & write parameters with
+            key_id: KMS Key Id that replicated destinations are encrypted with
+            max_readers: Number of `get_parameters` batches to fetch concurrently
+            max_writers: Number of concurrent `put_parameter` calls
+        """
+        self._ssm = ssm_dao
+        self._key_id = key_id
+        self._max_readers = max_readers
+        self._writer = ConcurrentWriter(max_workers=max_writers)
+
+    def sync(self, configs: Iterable[ReplicationConfig], dry_run: bool = False) -> ReplicationSyncResult:
+        """
+        Brings every destination in `configs` in line with its source(s). Configs are synced in dependency order, so a
+        destination that is also a source for another config propagates its new value within the same pass.
+        Args:
+            configs: ReplicationConfigs to sync, e.g. the output of ReplicationDao.get_all_configs(namespace)
+            dry_run: If True, compute what would be written without writing anything.
+
+        Returns: ReplicationSyncResult - destinations written, unchanged, missing a source, or failed.
+        """
+        start_time = time.time()
+        graph = ReplicationGraph(configs)
+        result = ReplicationSyncResult()
+
+        levels = graph.levels(skip_cycles=True)
+        synced = set(cfg.destination for level in levels for cfg in level)
+        if len(synced) < len(graph.configs):
+            error = ReplicationCycleError(graph.find_cycles())
+            for dest in set(graph.configs) - synced:
+                log.warning(f"Replication config for {dest} is part of, or downstream of, a cycle. Skipping.")
+                result.failed[dest] = error
+
+        names = set()
+        for config in graph.configs.values():
+            names.add(config.destination)
+            names.update(config.get_source_names())
+
+        values = self.__fetch_values(list(names))
+
+        for level in levels:
+            pending: Dict[str, str] = {}
+            for config in level:
+                value = config.resolve(values)
+                if value is None:
+                    log.warning(f"Unable to resolve all sources for {config.destination}, skipping.")
+                    result.missing_sources.append(config.destination)
+                elif values.get(config.destination) == value:
+                    result.unchanged.append(config.destination)
+                else:
+                    pending[config.destination] = value
+
+            if dry_run:
+                written, failed = list(pending.keys()), {}
+            else:
+                descriptions = self.__descriptions([graph.configs[dest] for dest in pending])
+                written, failed = self._writer.write_all(
+                    (dest, self.__writer_for(dest, value, descriptions.get(dest))) for dest, value in pending.items()
+                )
+
+            result.written.extend(written)
+            result.failed.update(failed)
+
+            # Later levels read from what this level just wrote.
+            for dest in written:
+                values[dest] = pending[dest]
+
+            for dest in failed:
+                values.pop(dest, None)
+
+        log.info(f"Replication sync of {len(graph.configs)} configs complete after {time.time() - start_time} "
+                 f"seconds. {result}")
+        return result
+
+    def sync_downstream(self, changed: Iterable[str], configs: Iterable[ReplicationConfig],
+                        dry_run: bool = False) -> ReplicationSyncResult:
+        """
+        Syncs only the destinations transitively affected by changes to the `changed` parameters, in a single ordered
+        pass rather than one recursive lookup per hop.
+        Args:
+            changed: Names of parameters whose values changed
+            configs: All ReplicationConfigs that may participate in propagation
+            dry_run: If True, compute what would be written without writing anything.
+        """
+        graph = ReplicationGraph(configs)
+        affected = set()
+        for name in changed:
+            affected |= graph.downstream_of(name)
+
+        return self.sync([cfg for dest, cfg in graph.configs.items() if dest in affected], dry_run=dry_run)
+
+    def __fetch_values(self, names: List[str]) -> Dict[str, str]:
+        params = self._ssm.get_parameter_values(names, decrypt=True, max_workers=self._max_readers)
+        return {param['Name']: param['Value'] for param in params}
+
+    def __descriptions(self, configs: List[ReplicationConfig]) -> Dict[str, Optional[str]]:
+        names = {cfg.destination for cfg in configs} | {src for cfg in configs for src in cfg.get_source_names()}
+        if not names:
+            return {}
+
+        described = {param['Name']: param.get('Description', '')
+                     for param in self._ssm.get_parameter_metadata(list(names), max_workers=self._max_readers)}
+
+        descriptions = {}
+        for cfg in configs:
+            sources = cfg.get_source_names()
+            if cfg.destination in described:
+                descriptions[cfg.destination] = described[cfg.destination]
+            elif len(sources) == 1:
+                descriptions[cfg.destination] = described.get(sources[0])
+
+        return descriptions
+
+    def __writer_for(self, destination: str, value: str, description: Optional[str]):
+        return lambda: self._ssm.set_parameter(destination, value, description, type=SSM_SECURE_STRING,
+                                               key_id=self._key_id)
@@ -0,0 +1,215 @@
+import datetime
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from figgy.constants.data import SSM_SECURE_STRING
+from figgy.data.dao.audit import AuditDao
+from figgy.data.dao.kms import KmsDao
+from figgy.data.dao.ssm import SsmDao
+from figgy.models.parameter_store_history import PSHistory
+from figgy.models.restore_config import RestoreConfig
+from figgy.models.restore_plan import RestorePlan, RestoreResult
+from figgy.utils.concurrent_writer import ConcurrentWriter
+from figgy.utils.metrics import Metrics
+from figgy.utils.rate_limiter import RateLimiter
+from figgy.utils.utils import Utils
+
+log = logging.getLogger(__name__)
+
+# Current values are fetched and compared this many parameters at a time, so at most one batch of plaintext is held.
+VALUE_BATCH_SIZE = 500
+
+# Parameter Store encrypts SecureStrings under this encryption context, keyed to the parameter's ARN.
+ARN_CONTEXT_KEY = 'PARAMETER_ARN'
+
+
+class RestoreService:
+    """
+    Restores a prefix to a point in time with as few writes as possible.
+
+    `plan()` evaluates the target state at `ps_time` from the audit history, lists the prefix's current metadata, and
+    only fetches current values (in batches) for parameters whose type, description and key already match. The plan
+    puts only what differs and deletes what didn't exist yet. `execute()` runs it over a ConcurrentWriter with
+    throttling retries and an optional writes per second cap, or just reports it with `dry_run`.
+
+        service = RestoreService(ssm_dao, audit_dao, kms_dao)
+        plan = service.plan('/app/demo-time', datetime.datetime(2021, 3, 1))
+        print(plan.report())
+        result = service.execute(plan)
+    """
+
+    def __init__(self, ssm_dao: SsmDao, audit_dao: Optional[AuditDao] = None, kms_dao: Optional[KmsDao] = None,
+                 max_readers: int = 10, max_writers: int = 5, writes_per_second: Optional[float] = None,
+                 arn_prefix: Optional[str] = None):
+        """
+        Args:
+            ssm_dao: SsmDao to read & write parameters with
+            audit_dao: AuditDao history is read from, required unless a PSHistory is passed to `plan()`
+            kms_dao: KmsDao to decrypt SecureString values recorded in the audit history. Required to restore any
+            SecureString.
+            max_readers: Number of `get_parameters` batches / KMS decrypts to run concurrently
+            max_writers: Number of concurrent `put_parameter` / `delete_parameter` calls
+            writes_per_second: Optional cap on writes per second, to leave SSM throughput for other clients
+            arn_prefix: e.g. arn:aws:ssm:us-east-1:123456789012:parameter - Prefix of parameter ARNs, which
+            SecureString values are encrypted under. Learned from an existing parameter if omitted.
+        """
+        self._ssm = ssm_dao
+        self._audit = audit_dao
+        self._kms = kms_dao
+        self._arn_prefix = arn_prefix
+        self._max_readers = max_readers
+        limiter = RateLimiter(writes_per_second) if writes_per_second else None
+        self._writer = ConcurrentWriter(max_workers=max_writers, rate_limiter=limiter)
+
+    @Metrics.timed('restore.plan')
+    def plan(self, prefix: str, ps_time: datetime.datetime, history: Optional[PSHistory] = None) -> RestorePlan:
+        """
+        Computes the minimal set of writes to restore `prefix` to its state at `ps_time`.
+        Args:
+            prefix: e.g. /app/demo-time - Prefix to restore, recursively
+            ps_time: Time to restore to
+            history: Optional PSHistory for the prefix, e.g. from AuditDao.get_columnar_history_before_time. Read
+            from the audit table if not provided.
+
+        Returns: RestorePlan
+        """
+        start_time = time.time()
+        if history is None:
+            Utils.validate(self._audit is not None, "An AuditDao is required to plan a restore without a PSHistory.")
+            history = self._audit.get_columnar_history_before_time(ps_time, prefix)
+
+        plan = RestorePlan(prefix, ps_time)
+        target = {name: cfg for name, cfg in history.state_at(ps_time).items() if self.__in_prefix(name, prefix)}
+        current = {param['Name']: param for param in self._ssm.get_all_parameters([prefix])}
+
+        secure = [name for name, cfg in target.items() if cfg.ps_type == SSM_SECURE_STRING]
+        Utils.validate(not secure or self._kms is not None,
+                       f"A KmsDao is required to restore SecureString parameters, e.g. {secure[:1]}. Recorded values "
+                       f"are encrypted and would be written back as ciphertext.")
+        if secure and self._arn_prefix is None:
+            self._arn_prefix = self.__learn_arn_prefix(list(current) or secure)
+
+        plan.deletes = sorted(name for name in current if name not in target)
+        compare = []
+        for name, cfg in sorted(target.items()):
+            reasons = self.__metadata_changes(cfg, current.get(name))
+            if reasons:
+                plan.puts.append(cfg)
+                plan.reasons[name] = reasons
+            else:
+                compare.append(cfg)
+
+        for chunk in Utils.chunk_list(compare, VALUE_BATCH_SIZE):
+            values = self.__current_values([cfg.ps_name for cfg in chunk])
+            for cfg, value in zip(chunk, self.__target_values(chunk)):
+                if values.get(cfg.ps_name) != value:
+                    plan.puts.append(cfg)
+                    plan.reasons[cfg.ps_name] = ['value']
+                else:
+                    plan.unchanged.append(cfg.ps_name)
+
+        plan.puts.sort(key=lambda cfg: cfg.ps_name)
+        log.info(f"Planned restore of {prefix} to {ps_time} in {time.time() - start_time} seconds. {plan}")
+        return plan
+
+    def execute(self, plan: RestorePlan, dry_run: bool = False) -> RestoreResult:
+        """
+        Runs every put and delete in `plan` concurrently. Throttled writes are retried, any other failure is reported
+        in the result without stopping the rest of the plan.
+        Args:
+            plan: RestorePlan from `plan()`
+            dry_run: If True, log the plan's report and return what would be written without changing anything.
+
+        Returns: RestoreResult - names written, deleted, or failed.
+        """
+        start_time = time.time()
+        result = RestoreResult()
+
+        if dry_run:
+            log.info(plan.report())
+            result.written = [cfg.ps_name for cfg in plan.puts]
+            result.deleted = list(plan.deletes)
+            return result
+
+        for chunk in Utils.chunk_list(plan.puts, VALUE_BATCH_SIZE):
+            values = self.__target_values(chunk)
+            written, failed = self._writer.write_all(
+                (cfg.ps_name, self.__writer_for(cfg, value)) for cfg, value in zip(chunk, values)
+            )
+            result.written.extend(written)
+            result.failed.update(failed)
+
+        deleted, failed = self._writer.write_all((name, self.__deleter_for(name)) for name in plan.deletes)
+        result.deleted.extend(deleted)
+        result.failed.update(failed)
+
+        log.info(f"Restored {plan.prefix} to {plan.ps_time} in {time.time() - start_time} seconds. {result}")
+        return result
+
+    def restore(self, prefix: str, ps_time: datetime.datetime, dry_run: bool = False) -> RestoreResult:
+        return self.execute(self.plan(prefix, ps_time), dry_run=dry_run)
+
+    def __current_values(self, names: List[str]) -> Dict[str, str]:
+        params = self._ssm.get_parameter_values(names, decrypt=True, max_workers=self._max_readers)
+        return {param['Name']: param['Value'] for param in params}
+
+    def __target_values(self, cfgs: List[RestoreConfig]) -> List[str]:
+        values = [cfg.ps_value for cfg in cfgs]
+        secure = [i for i, cfg in enumerate(cfgs) if cfg.ps_type == SSM_SECURE_STRING]
+        if not secure:
+            return values
+
+        Utils.validate(self._kms is not None, "A KmsDao is required to restore SecureString parameters.")
+        Utils.validate(self._arn_prefix is not None, "Parameter ARNs are unknown, pass an arn_prefix to restore "
+                                                     "SecureString parameters.")
+
+        # Each value is bound to its own parameter's ARN, so they're decrypted one context at a time.
+        def decrypt(i: int) -> str:
+            context = {ARN_CONTEXT_KEY: self._arn_prefix + cfgs[i].ps_name}
+            return self._kms.decrypt_with_context(values[i], context)
+
+        with ThreadPoolExecutor(max_workers=self._max_readers) as pool:
+            for i, plaintext in zip(secure, pool.map(decrypt, secure)):
+                values[i] = plaintext
+
+        return values
+
+    def __learn_arn_prefix(self, names: List[str]) -> Optional[str]:
+        for param in self._ssm.get_parameter_values(names[:10]):
+            arn = param.get('ARN')
+            if arn and arn.endswith(param['Name']):
+                return arn[:-len(param['Name'])]
+
+        return None
+
+    def __writer_for(self, cfg: RestoreConfig, value: str):
+        key_id = cfg.ps_key_id if cfg.ps_type == SSM_SECURE_STRING else None
+        return lambda: self._ssm.set_parameter(cfg.ps_name, value, cfg.ps_description, type=cfg.ps_type,
+                                               key_id=key_id)
+
+    def __deleter_for(self, name: str):
+        return lambda: self._ssm.delete_parameter(name)
+
+    @staticmethod
+    def __metadata_changes(cfg: RestoreConfig, current: Optional[Dict]) -> List[str]:
+        if current is None:
+            return ['missing']
+
+        reasons = []
+        if cfg.ps_type and cfg.ps_type != current.get('Type'):
+            reasons.append('type')
+        if (cfg.ps_description or '') != current.get('Description', ''):
+            reasons.append('description')
+        # Audit records may not carry the key, only compare it when both sides have one.
+        if cfg.ps_type == SSM_SECURE_STRING and cfg.ps_key_id and current.get('KeyId') \
+                and cfg.ps_key_id != current.get('KeyId'):
+            reasons.append('key')
+
+        return reasons
+
+    @staticmethod
+    def __in_prefix(name: str, prefix: str) -> bool:
+        prefix = prefix.rstrip('/')
+        return name == prefix or name.startswith(prefix + '/')
@@ -0,0 +1,316 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Hashable, Iterable, Optional, Set, Tuple
+
+
+class PlaintextCache:
+    """
+    Bounded, TTL-expiring LRU cache for decrypted values. Entries are keyed by a digest of the ciphertext and its
+    encryption context so plaintext is never used as (or recoverable from) a key. Plaintext is held in a bytearray
+    that is overwritten with zeroes when the entry is evicted, expires, or the cache is cleared.
+
+    Note: the decoded `str` handed back to callers is immutable and cannot be zeroised, only the cached copy is.
+    """
+
+    def __init__(self, ttl_seconds: float = 300, max_entries: int = 1000, max_bytes: int = 1024 * 1024):
+        self._ttl = ttl_seconds
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._size = 0
+        self._entries: "OrderedDict[bytes, Tuple[bytearray, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(ciphertext: bytes, context: Optional[Dict] = None) -> bytes:
+        digest = hashlib.sha256(ciphertext)
+        if context:
+            digest.update(json.dumps(context, sort_keys=True).encode())
+
+        return digest.digest()
+
+    def get(self, key: bytes) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            plaintext, expires_at = entry
+            if expires_at < time.monotonic():
+                self.__evict(key)
+                return None
+
+            self._entries.move_to_end(key)
+            return plaintext.decode()
+
+    def put(self, key: bytes, plaintext: bytes) -> None:
+        if len(plaintext) > self._max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self.__evict(key)
+
+            while self._entries and (len(self._entries) >= self._max_entries
+                                     or self._size + len(plaintext) > self._max_bytes):
+                self.__evict(next(iter(self._entries)))
+
+            self._entries[key] = (bytearray(plaintext), time.monotonic() + self._ttl)
+            self._size += len(plaintext)
+
+    def clear(self) -> None:
+        with self._lock:
+            for key in list(self._entries):
+                self.__evict(key)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __evict(self, key: bytes) -> None:
+        plaintext, _ = self._entries.pop(key)
+        self._size -= len(plaintext)
+        plaintext[:] = bytes(len(plaintext))
+
+
+class DataKeyCache:
+    """
+    Caches plaintext KMS data keys for envelope encryption. A key used for encryption is retired after `max_uses`
+    encryptions or `max_age_seconds`, whichever comes first. Unwrapped keys used for decryption are retired after
+    `max_age_seconds`. Retired key material is overwritten with zeroes.
+
+    Callers key entries with PlaintextCache.key(...) digests that include the encryption context, so a cached key is
+    never handed out for a context it wasn't generated or unwrapped under.
+
+    Encryption and decryption keys are each bounded to `max_entries`, least recently used first out. Expired keys
+    are retired whenever a key is added.
+    """
+
+    def __init__(self, max_uses: int = 1000, max_age_seconds: float = 300, max_entries: int = 100):
+        self._max_uses = max_uses
+        self._max_age = max_age_seconds
+        self._max_entries = max_entries
+        self._encrypt_keys: "OrderedDict[bytes, Tuple[bytearray, bytes, int, float]]" = OrderedDict()
+        self._decrypt_keys: "OrderedDict[bytes, Tuple[bytearray, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def checkout(self, key: bytes) -> Optional[Tuple[bytes, bytes]]:
+        """
+        Returns: (plaintext data key, wrapped data key) to encrypt with, or None if no usable key is cached.
+        """
+        with self._lock:
+            entry = self._encrypt_keys.get(key)
+            if entry is None:
+                return None
+
+            plaintext, wrapped, uses, expires_at = entry
+            if uses >= self._max_uses or expires_at < time.monotonic():
+                self.__retire_encrypt(key)
+                return None
+
+            self._encrypt_keys[key] = (plaintext, wrapped, uses + 1, expires_at)
+            self._encrypt_keys.move_to_end(key)
+            return bytes(plaintext), wrapped
+
+    def put(self, key: bytes, plaintext: bytes, wrapped: bytes) -> None:
+        with self._lock:
+            if key in self._encrypt_keys:
+                self.__retire_encrypt(key)
+
+            now = time.monotonic()
+            for expired in [k for k, entry in self._encrypt_keys.items() if entry[3] < now]:
+                self.__retire_encrypt(expired)
+
+            while len(self._encrypt_keys) >= self._max_entries:
+                self.__retire_encrypt(next(iter(self._encrypt_keys)))
+
+            self._encrypt_keys[key] = (bytearray(plaintext), wrapped, 1, now + self._max_age)
+
+    def get_unwrapped(self, key: bytes) -> Optional[bytes]:
+        with self._lock:
+            entry = self._decrypt_keys.get(key)
+            if entry is None:
+                return None
+
+            plaintext, expires_at = entry
+            if expires_at < time.monotonic():
+                self.__retire(key)
+                return None
+
+            self._decrypt_keys.move_to_end(key)
+            return bytes(plaintext)
+
+    def put_unwrapped(self, key: bytes, plaintext: bytes) -> None:
+        with self._lock:
+            if key in self._decrypt_keys:
+                self.__retire(key)
+
+            now = time.monotonic()
+            for expired in [k for k, (_, expires_at) in self._decrypt_keys.items() if expires_at < now]:
+                self.__retire(expired)
+
+            while len(self._decrypt_keys) >= self._max_entries:
+                self.__retire(next(iter(self._decrypt_keys)))
+
+            self._decrypt_keys[key] = (bytearray(plaintext), now + self._max_age)
+
+    def clear(self) -> None:
+        with self._lock:
+            for key in list(self._encrypt_keys):
+                self.__retire_encrypt(key)
+
+            for key in list(self._decrypt_keys):
+                self.__retire(key)
+
+    def __retire_encrypt(self, key: bytes) -> None:
+        plaintext, _, _, _ = self._encrypt_keys.pop(key)
+        plaintext[:] = bytes(len(plaintext))
+
+    def __retire(self, key: bytes) -> None:
+        plaintext, _ = self._decrypt_keys.pop(key)
+        plaintext[:] = bytes(len(plaintext))
+
+
+class TtlCache:
+    """
+    Bounded, TTL-expiring LRU cache for arbitrary values. Entries can be tagged, e.g. with the parameter names they
+    were read from, so a write can invalidate just the entries it affects.
+    """
+
+    def __init__(self, ttl_seconds: float = 10, max_entries: int = 10000):
+        self._ttl = ttl_seconds
+        self._max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float, FrozenSet[str]]]" = OrderedDict()
+        self._tagged: Dict[str, Set[Hashable]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+
+            value, expires_at, _ = entry
+            if expires_at < time.monotonic():
+                self.__evict(key)
+                return default
+
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, value: Any, tags: Iterable[str] = ()) -> None:
+        tags = frozenset(tags)
+        with self._lock:
+            if key in self._entries:
+                self.__evict(key)
+
+            while self._entries and len(self._entries) >= self._max_entries:
+                self.__evict(next(iter(self._entries)))
+
+            self._entries[key] = (value, time.monotonic() + self._ttl, tags)
+            for tag in tags:
+                self._tagged.setdefault(tag, set()).add(key)
+
+    def invalidate(self, tags: Iterable[str]) -> int:
+        """
+        Drops every entry tagged with any of `tags`.
+
+        Returns: Number of entries dropped.
+        """
+        with self._lock:
+            keys = set()
+            for tag in tags:
+                keys |= self._tagged.get(tag, set())
+
+            for key in keys:
+                self.__evict(key)
+
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._tagged.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __evict(self, key: Hashable) -> None:
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tagged.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tagged[tag]
+
+
+class NegativeCache:
+    """
+    Bounded, TTL-expiring set of keys that were just looked up and found missing, e.g. optional parameters that are
+    probed on every request. Kept apart from caches of values so a short TTL only applies to "does not exist".
+
+    Every `discard()` bumps a write generation. A lookup captures `generation` before it's made and passes it to
+    `add()`, which ignores the miss if a write landed in between, since the lookup may predate the write.
+
+        generation = cache.generation
+        if lookup(name) is None:
+            cache.add(name, generation)
+    """
+
+    def __init__(self, ttl_seconds: float = 5, max_entries: int = 10000):
+        self._ttl = ttl_seconds
+        self._max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, float]" = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def is_missing(self, key: Hashable) -> bool:
+        """
+        Returns: True if `key` was found missing less than `ttl_seconds` ago and hasn't been written since.
+        """
+        with self._lock:
+            expires_at = self._entries.get(key)
+            if expires_at is None:
+                return False
+
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return False
+
+            self._entries.move_to_end(key)
+            return True
+
+    def add(self, key: Hashable, generation: Optional[int] = None) -> None:
+        """
+        Args:
+            key: Key that was found missing
+            generation: `generation` captured before the lookup, the miss is dropped if a write happened since.
+        """
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+
+            self._entries.pop(key, None)
+            while self._entries and len(self._entries) >= self._max_entries:
+                self._entries.popitem(last=False)
+
+            self._entries[key] = time.monotonic() + self._ttl
+
+    def discard(self, key: Hashable) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,159 @@
+"""
+Wire format shared by the CacheDaemon and SsmDaoProxy: one JSON object per line over a unix socket.
+
+    request:  {"op": "get_parameter", "args": ["/app/demo-time/db/host"], "kwargs": {}}
+    response: {"ok": true, "result": "db.internal"}
+              {"ok": false, "error": {"type": "ClientError", "code": "ThrottlingException", "message": "..."}}
+
+Values JSON can't represent are tagged so they decode to the same type: {"$set": [...]}, {"$tuple": [...]} and
+{"$datetime": "2021-03-01T00:00:00"}.
+"""
+import builtins
+import datetime
+import json
+import os
+import socket
+import stat
+import struct
+import tempfile
+from typing import Any, Dict
+
+SOCKET_PATH_ENV = 'FIGGY_CACHE_SOCKET'
+
+_DATETIME = '$datetime'
+_SET = '$set'
+_TUPLE = '$tuple'
+
+
+def default_socket_path() -> str:
+    """
+    Returns: $FIGGY_CACHE_SOCKET if set, otherwise a socket in the per-user `socket_directory()`.
+    """
+    configured = os.environ.get(SOCKET_PATH_ENV)
+    if configured:
+        return configured
+
+    return os.path.join(socket_directory(), 'cache.sock')
+
+
+def socket_directory() -> str:
+    """
+    Returns: Per-user directory for the default socket, in $XDG_RUNTIME_DIR or the temp dir. The daemon creates it
+    with mode 0700, so other users can't create or replace the socket in it.
+    """
+    directory = os.environ.get('XDG_RUNTIME_DIR') or tempfile.gettempdir()
+    return os.path.join(directory, f'figgy-{os.getuid()}')
+
+
+def private_directory(path: str) -> str:
+    """
+    Creates `path` with mode 0700 if it doesn't exist.
+
+    Raises: PermissionError if `path` exists but isn't a directory owned by, and only accessible to, the current user.
+    """
+    try:
+        os.mkdir(path, 0o700)
+    except FileExistsError:
+        pass
+
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise PermissionError(f"{path} must be a directory owned by uid {os.getuid()} with mode 0700.")
+
+    return path
+
+
+def check_owner(path: str) -> None:
+    """
+    Raises: PermissionError if `path` isn't a socket owned by the current user, e.g. one another user created first to
+    serve forged values and read written ones.
+    """
+    info = os.lstat(path)
+    if not stat.S_ISSOCK(info.st_mode) or info.st_uid != os.getuid():
+        raise PermissionError(f"{path} is not a socket owned by uid {os.getuid()}, refusing to use it.")
+
+
+def check_peer(connection: socket.socket) -> None:
+    """
+    Raises: PermissionError if the process on the other end of a connected unix socket runs as another user. Only
+    checked where SO_PEERCRED is available (Linux), elsewhere `check_owner` is relied on.
+    """
+    if not hasattr(socket, 'SO_PEERCRED'):
+        return
+
+    credentials = connection.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize('3i'))
+    _, uid, _ = struct.unpack('3i', credentials)
+    if uid != os.getuid():
+        raise PermissionError(f"Cache daemon runs as uid {uid}, not {os.getuid()}, refusing to use it.")
+
+
+def encode(message: Dict) -> bytes:
+    """
+    Returns: `message` as a JSON line. Sets, tuples and datetimes are tagged so `decode` returns the same types.
+    """
+    return json.dumps(_tag(message), default=_default, separators=(',', ':')).encode() + b'\n'
+
+
+def decode(line: bytes) -> Dict:
+    return json.loads(line, object_hook=_object_hook)
+
+
+def error_to_dict(error: BaseException) -> Dict:
+    details = {'type': type(error).__name__, 'message': str(error)}
+    response = getattr(error, 'response', None)
+    if isinstance(response, dict) and 'Error' in response:
+        details['code'] = response['Error'].get('Code')
+        details['message'] = response['Error'].get('Message', '')
+        details['operation'] = getattr(error, 'operation_name', None)
+
+    return details
+
+
+def error_from_dict(details: Dict) -> Exception:
+    """
+    Returns: The exception a call raised in the daemon. botocore ClientErrors are rebuilt with their error code, so
+    callers' `e.response['Error']['Code']` checks keep working. Builtin exceptions keep their type.
+    """
+    if details.get('code'):
+        from botocore.exceptions import ClientError
+        return ClientError({'Error': {'Code': details['code'], 'Message': details.get('message', '')}},
+                           details.get('operation') or 'Unknown')
+
+    error_type = getattr(builtins, details.get('type', ''), None)
+    if isinstance(error_type, type) and issubclass(error_type, Exception):
+        return error_type(details.get('message'))
+
+    return Exception(f"{details.get('type')}: {details.get('message')}")
+
+
+def _tag(value: Any) -> Any:
+    # json serializes tuples as lists before `default` is consulted, so containers are tagged up front.
+    if isinstance(value, dict):
+        return {key: _tag(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_tag(item) for item in value]
+    if isinstance(value, tuple):
+        return {_TUPLE: [_tag(item) for item in value]}
+    if isinstance(value, (set, frozenset)):
+        return {_SET: [_tag(item) for item in value]}
+
+    return value
+
+
+def _default(value: Any):
+    if isinstance(value, datetime.datetime):
+        return {_DATETIME: value.isoformat()}
+
+    return str(value)  # e.g. Decimal
+
+
+def _object_hook(value: Dict):
+    if len(value) == 1:
+        if _DATETIME in value:
+            return datetime.datetime.fromisoformat(value[_DATETIME])
+        if _TUPLE in value:
+            return tuple(value[_TUPLE])
+        if _SET in value:
+            return set(value[_SET])
+
+    return value
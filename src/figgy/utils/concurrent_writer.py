@@ -0,0 +1,62 @@
+import logging
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from figgy.utils.utils import Utils
+
+log = logging.getLogger(__name__)
+
+
+class ConcurrentWriter:
+    """
+    Executes a batch of independent writes over a bounded thread pool. Throttled writes are retried with jittered
+    exponential back off. Any other failure is collected and returned so one bad write doesn't abort the batch.
+    An optional rate limiter (anything with a blocking `acquire()`, e.g. RateLimiter) paces every attempt.
+    """
+
+    def __init__(self, max_workers: int = 5, max_retries: int = 8, backoff: float = .25, rate_limiter=None):
+        Utils.validate(max_workers > 0, f"max_workers must be greater than 0, got: {max_workers}")
+        self._max_workers = max_workers
+        self._max_retries = max_retries
+        self._backoff = backoff
+        self._limiter = rate_limiter
+
+    def write_all(self, writes: Iterable[Tuple[str, Callable[[], None]]]) -> Tuple[List[str], Dict[str, Exception]]:
+        """
+        Args:
+            writes: (key, write) tuples. `key` identifies the write in the results, `write` performs it.
+
+        Returns: Tuple[succeeded keys, failed key -> exception]
+        """
+        succeeded, failed = [], {}
+
+        with ThreadPoolExecutor(max_workers=self._max_workers) as pool:
+            futures = [(key, pool.submit(self.__write, write)) for key, write in writes]
+
+            for key, future in futures:
+                try:
+                    future.result()
+                    succeeded.append(key)
+                except Exception as e:
+                    log.warning(f"Write failed for: {key}: {e}")
+                    failed[key] = e
+
+        return succeeded, failed
+
+    def __write(self, write: Callable[[], None]) -> None:
+        retries = 0
+        while True:
+            if self._limiter is not None:
+                self._limiter.acquire()
+
+            try:
+                return write()
+            except Exception as e:
+                if not Utils.is_throttled(e) or retries >= self._max_retries:
+                    raise
+
+                retries += 1
+                Utils.count_retry('concurrent_writer.write', throttled=True)
+                time.sleep(self._backoff * (2 ** retries) * random.random())
@@ -1,6 +1,14 @@
+from typing import List
 
 
 class FiggyValidationError(BaseException):
 
     def __init__(self, message: str):
-        self.message = message
\ No newline at end of file
+        self.message = message
+
+
+class ReplicationCycleError(ValueError):
+
+    def __init__(self, cycles: List[List[str]]):
+        self.cycles = cycles
+        super().__init__(f"Replication cycles detected: {cycles}")
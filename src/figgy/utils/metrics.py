@@ -0,0 +1,361 @@
+import contextlib
+import functools
+import inspect
+import logging
+import socket
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional
+
+from figgy.utils.utils import Utils
+
+log = logging.getLogger(__name__)
+
+# Per-operation metric names, emitted as `{operation}.{metric}` e.g. `audit.find_logs.latency_ms`
+CALLS = 'calls'
+ERRORS = 'errors'
+LATENCY = 'latency_ms'
+PAGES = 'pages'
+ITEMS = 'items'
+RETRIES = 'retries'
+THROTTLES = 'throttles'
+COLLAPSED = 'collapsed'
+NEGATIVE_HITS = 'negative_hits'
+CONSUMED_CAPACITY = 'consumed_capacity'
+
+_ITEM_KEYS = ('Items', 'Parameters', 'Responses')
+_CAPACITY_OPERATIONS = {'scan', 'query', 'get_item', 'put_item', 'update_item', 'delete_item', 'batch_get_item',
+                        'batch_write_item'}
+_context = threading.local()
+
+
+class MetricsSink:
+    """
+    Receives metrics from the Metrics registry. Implementations must be thread safe.
+    """
+
+    def count(self, name: str, value: float = 1) -> None:
+        raise NotImplementedError()
+
+    def timing(self, name: str, millis: float) -> None:
+        raise NotImplementedError()
+
+
+class Histogram:
+    """
+    Fixed bucket latency histogram. `buckets` are inclusive upper bounds in milliseconds.
+    """
+    DEFAULT_BUCKETS = [1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+    def __init__(self, buckets: List[float] = None):
+        self.buckets = buckets if buckets else Histogram.DEFAULT_BUCKETS
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def add(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def percentile(self, percent: float) -> Optional[float]:
+        """
+        Returns: the upper bound of the bucket containing the requested percentile, or the max for the overflow bucket.
+        """
+        if not self.count:
+            return None
+
+        threshold = self.count * percent / 100
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= threshold:
+                return self.buckets[i] if i < len(self.buckets) else self.max
+
+        return self.max
+
+    def to_dict(self) -> Dict:
+        return {
+            'count': self.count,
+            'total': self.total,
+            'min': self.min,
+            'max': self.max,
+            'p50': self.percentile(50),
+            'p99': self.percentile(99),
+            'buckets': dict(zip([str(b) for b in self.buckets] + ['inf'], self.counts)),
+        }
+
+
+class InMemorySink(MetricsSink):
+    """
+    Aggregates counters and latency histograms in memory. Useful for tests, benchmarks and ad hoc profiling.
+    """
+
+    def __init__(self):
+        self.counters: Dict[str, float] = {}
+        self.histograms: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def count(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def timing(self, name: str, millis: float) -> None:
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.add(millis)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                'counters': dict(self.counters),
+                'histograms': {name: histogram.to_dict() for name, histogram in self.histograms.items()},
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+
+class LoggingSink(MetricsSink):
+    """
+    Logs each metric as it is recorded.
+    """
+
+    def __init__(self, level: int = logging.DEBUG, logger: logging.Logger = log):
+        self._level = level
+        self._log = logger
+
+    def count(self, name: str, value: float = 1) -> None:
+        self._log.log(self._level, f"{name}: {value}")
+
+    def timing(self, name: str, millis: float) -> None:
+        self._log.log(self._level, f"{name}: {round(millis, 2)}ms")
+
+
+class StatsdSink(MetricsSink):
+    """
+    Sends metrics to a StatsD compatible agent over UDP. Sends are fire and forget, failures are ignored.
+    """
+
+    def __init__(self, host: str = 'localhost', port: int = 8125, prefix: str = 'figgy'):
+        self._address = (host, port)
+        self._prefix = f'{prefix}.' if prefix else ''
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def count(self, name: str, value: float = 1) -> None:
+        self.__send(f"{self._prefix}{name}:{value}|c")
+
+    def timing(self, name: str, millis: float) -> None:
+        self.__send(f"{self._prefix}{name}:{round(millis, 3)}|ms")
+
+    def __send(self, packet: str) -> None:
+        try:
+            self._socket.sendto(packet.encode(), self._address)
+        except OSError:
+            pass
+
+
+class Metrics:
+    """
+    Process wide instrumentation registry for DAO operations. Disabled until a sink is added. While disabled every
+    hook is a single attribute check and DynamoDB requests don't ask for ConsumedCapacity.
+    """
+    enabled = False
+    _sinks: List[MetricsSink] = []
+
+    @staticmethod
+    def add_sink(sink: MetricsSink) -> None:
+        Metrics._sinks = Metrics._sinks + [sink]
+        Metrics.enabled = True
+
+    @staticmethod
+    def remove_sink(sink: MetricsSink) -> None:
+        Metrics._sinks = [s for s in Metrics._sinks if s is not sink]
+        Metrics.enabled = bool(Metrics._sinks)
+
+    @staticmethod
+    def clear_sinks() -> None:
+        Metrics._sinks = []
+        Metrics.enabled = False
+
+    @staticmethod
+    def count(operation: str, metric: str, value: float = 1) -> None:
+        if Metrics.enabled:
+            name = f'{operation}.{metric}'
+            for sink in Metrics._sinks:
+                sink.count(name, value)
+
+    @staticmethod
+    def timing(operation: str, millis: float) -> None:
+        if Metrics.enabled:
+            name = f'{operation}.{LATENCY}'
+            for sink in Metrics._sinks:
+                sink.timing(name, millis)
+
+    @staticmethod
+    def page(operation: str, response: Dict) -> None:
+        """
+        Records a single page / response: page & item counts and any ConsumedCapacity the response carries.
+        """
+        if not Metrics.enabled or not isinstance(response, dict):
+            return
+
+        Metrics.count(operation, PAGES)
+        for items_key in _ITEM_KEYS:
+            if items_key in response:
+                items = response[items_key]
+                # BatchGetItem responses are keyed by table name.
+                count = sum(len(i) for i in items.values()) if isinstance(items, dict) else len(items)
+                Metrics.count(operation, ITEMS, count)
+                break
+
+        capacity = response.get('ConsumedCapacity')
+        if capacity:
+            capacities = capacity if isinstance(capacity, list) else [capacity]
+            Metrics.count(operation, CONSUMED_CAPACITY, sum(c.get('CapacityUnits', 0) for c in capacities))
+
+    @staticmethod
+    def current_operation() -> Optional[str]:
+        """
+        Returns: the innermost @Metrics.timed operation executing on this thread, if any.
+        """
+        return getattr(_context, 'operation', None)
+
+    @staticmethod
+    @contextlib.contextmanager
+    def operation(operation: Optional[str]):
+        """
+        Makes `operation` current on this thread, e.g. in a worker thread doing work for a @Metrics.timed call.
+        """
+        parent, _context.operation = getattr(_context, 'operation', None), operation
+        try:
+            yield
+        finally:
+            _context.operation = parent
+
+    @staticmethod
+    def instrument(target, service: str):
+        """
+        Wraps a boto3 client, resource or DynamoDB Table so each API call it makes is recorded.
+        Args:
+            target: boto3 client / resource / Table
+            service: Prefix for request level metrics, e.g. `dynamodb` -> `dynamodb.scan.latency_ms`
+        """
+        return target if isinstance(target, InstrumentedClient) else InstrumentedClient(target, service)
+
+    @staticmethod
+    def timed(operation: str):
+        """
+        Decorator that records call counts, errors, throttles and latency for `operation`. Generator functions are
+        timed across their full iteration.
+        """
+
+        def decorator(func):
+            if inspect.isgeneratorfunction(func):
+                @functools.wraps(func)
+                def gen_wrapper(*args, **kwargs):
+                    if not Metrics.enabled:
+                        yield from func(*args, **kwargs)
+                        return
+
+                    # Latency spans the full iteration, including time the consumer spends between items. The
+                    # operation is only made current while the generator itself is running.
+                    start, generator = time.perf_counter(), func(*args, **kwargs)
+                    try:
+                        while True:
+                            parent, _context.operation = getattr(_context, 'operation', None), operation
+                            try:
+                                item = next(generator)
+                            except StopIteration:
+                                return
+                            finally:
+                                _context.operation = parent
+
+                            yield item
+                    except Exception as e:
+                        Metrics.record_error(operation, e)
+                        raise
+                    finally:
+                        generator.close()
+                        Metrics.count(operation, CALLS)
+                        Metrics.timing(operation, (time.perf_counter() - start) * 1000)
+
+                return gen_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not Metrics.enabled:
+                    return func(*args, **kwargs)
+
+                start, parent = time.perf_counter(), getattr(_context, 'operation', None)
+                _context.operation = operation
+                try:
+                    return func(*args, **kwargs)
+                except Exception as e:
+                    Metrics.record_error(operation, e)
+                    raise
+                finally:
+                    _context.operation = parent
+                    Metrics.count(operation, CALLS)
+                    Metrics.timing(operation, (time.perf_counter() - start) * 1000)
+
+            return wrapper
+
+        return decorator
+
+    @staticmethod
+    def record_error(operation: str, error: Exception) -> None:
+        Metrics.count(operation, ERRORS)
+        if Utils.is_throttled(error):
+            Metrics.count(operation, THROTTLES)
+
+
+class InstrumentedClient:
+    """
+    Transparent proxy over a boto3 client, resource or Table. While metrics are disabled attribute access falls
+    straight through to the wrapped object. While enabled, each API call records request level calls / latency /
+    errors / throttles, DynamoDB calls ask for ConsumedCapacity, and each response's pages / items / capacity are
+    attributed to the @Metrics.timed operation that made the call.
+    """
+
+    def __init__(self, target, service: str):
+        self._target = target
+        self._service = service
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._target, name)
+        if not Metrics.enabled or name.startswith('_') or not callable(attr):
+            return attr
+
+        request = f'{self._service}.{name}'
+
+        def call(*args, **kwargs):
+            if name in _CAPACITY_OPERATIONS:
+                kwargs.setdefault('ReturnConsumedCapacity', 'TOTAL')
+
+            start = time.perf_counter()
+            try:
+                response = attr(*args, **kwargs)
+            except Exception as e:
+                Metrics.record_error(request, e)
+                raise
+            finally:
+                Metrics.count(request, CALLS)
+                Metrics.timing(request, (time.perf_counter() - start) * 1000)
+
+            Metrics.page(Metrics.current_operation() or request, response)
+            return response
+
+        return call
+
+    def __repr__(self):
+        return f"InstrumentedClient({self._target!r})"
@@ -0,0 +1,209 @@
+import logging
+import random
+import threading
+import time
+from typing import Dict, Optional
+
+log = logging.getLogger(__name__)
+
+# An eventually consistent read of up to 4KB costs .5 RCU, used when a response carries no ConsumedCapacity.
+ESTIMATED_UNITS_PER_ITEM = .5
+
+# Longest a single throttle backs off for, before jitter.
+MAX_BACKOFF_SECONDS = 10
+
+
+class CapacityLimiter:
+    """
+    Keeps the DynamoDB read capacity consumed by scans and queries under `capacity_per_second`, across every thread
+    that shares the limiter.
+
+    Requests are paid for after the fact with the ConsumedCapacity DynamoDB returns: a request may start whenever the
+    shared token bucket is not in debt, then its real cost is deducted. Over any window the consumed capacity stays
+    within the budget plus a single in-flight page per thread. To keep that overshoot small, `limit()` sizes the Limit
+    of the next page from the observed cost per evaluated item, so a page costs roughly `page_seconds` of budget.
+
+    Throttling halves the effective rate, which then recovers additively with every successful page (AIMD), so
+    scans back off when they compete with live traffic on the same table. Each throttle also puts the bucket into
+    debt for a jittered backoff that doubles with consecutive throttles, so the retry waits before it's sent.
+
+        limiter = CapacityLimiter(200)    # At most 200 RCU/s
+        AuditDao(dynamo_resource, read_limiter=limiter).find_logs_parallel(8)
+    """
+
+    def __init__(self, capacity_per_second: float, burst_seconds: float = 1, page_seconds: float = .25,
+                 min_limit: int = 10, max_limit: Optional[int] = None, min_rate_fraction: float = .1):
+        """
+        Args:
+            capacity_per_second: Capacity units (RCU) per second to stay under.
+            burst_seconds: Seconds of unused budget that may be banked and spent at once.
+            page_seconds: Seconds of budget a single page should cost, used to tune Limit.
+            min_limit: Smallest Limit `limit()` will return.
+            max_limit: Largest Limit `limit()` will return, unbounded by default.
+            min_rate_fraction: Throttling never reduces the effective rate below this fraction of the budget.
+        """
+        if capacity_per_second <= 0:
+            raise ValueError(f"capacity_per_second must be greater than 0, got: {capacity_per_second}")
+
+        self.capacity_per_second = capacity_per_second
+        self._burst = capacity_per_second * burst_seconds
+        self._page_seconds = page_seconds
+        self._min_limit = min_limit
+        self._max_limit = max_limit
+        self._min_rate = capacity_per_second * min_rate_fraction
+
+        self._rate = capacity_per_second
+        self._tokens = self._burst
+        self._updated = time.monotonic()
+        self._units_per_item: Optional[float] = None
+        self._consumed = 0.0
+        self._throttles = 0
+        self._lock = threading.Lock()
+
+    @property
+    def rate(self) -> float:
+        """
+        Returns: The current effective rate, lower than capacity_per_second while recovering from throttling.
+        """
+        return self._rate
+
+    @property
+    def consumed(self) -> float:
+        """
+        Returns: Total capacity units recorded by this limiter.
+        """
+        return self._consumed
+
+    def acquire(self) -> float:
+        """
+        Blocks until the budget allows another request.
+
+        Returns: Seconds spent waiting.
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                self.__refill()
+                if self._tokens > 0:
+                    return waited
+
+                wait = -self._tokens / self._rate
+
+            # Waiting outside the lock lets other threads record their pages in the meantime.
+            time.sleep(wait)
+            waited += wait
+
+    def record(self, response: Dict) -> float:
+        """
+        Deducts the capacity a scan / query response consumed from the budget.
+
+        Returns: Capacity units charged.
+        """
+        units = self.units(response)
+        scanned = response.get('ScannedCount', len(response.get('Items', [])))
+
+        with self._lock:
+            self.__refill()
+            self._tokens -= units
+            self._consumed += units
+            self._throttles = 0
+            self._rate = min(self.capacity_per_second, self._rate + self.capacity_per_second * .05)
+
+            if scanned:
+                per_item = units / scanned
+                self._units_per_item = per_item if self._units_per_item is None \
+                    else self._units_per_item * .8 + per_item * .2
+
+        return units
+
+    def throttled(self) -> float:
+        """
+        Halves the effective rate after a throttled request, and puts the bucket into debt so the next `acquire()`
+        waits out a jittered exponential backoff.
+
+        Returns: Seconds of backoff added.
+        """
+        with self._lock:
+            self.__refill()
+            self._rate = max(self._min_rate, self._rate / 2)
+            self._throttles += 1
+            backoff = min(self._page_seconds * 2 ** (self._throttles - 1), MAX_BACKOFF_SECONDS)
+            backoff *= random.uniform(.5, 1)
+            self._tokens = min(self._tokens, 0) - backoff * self._rate
+
+        log.info(f"Read throttled, reducing read rate to {self._rate:.1f} capacity units / second and backing off "
+                 f"{backoff:.2f} seconds.")
+        return backoff
+
+    def limit(self) -> Optional[int]:
+        """
+        Returns: Limit for the next page so it costs about `page_seconds` of budget. None until a page has been
+        recorded, at which point DynamoDB's own 1MB page cap applies.
+        """
+        with self._lock:
+            if not self._units_per_item:
+                return None
+
+            limit = max(self._min_limit, int(self._rate * self._page_seconds / self._units_per_item))
+
+        return min(limit, self._max_limit) if self._max_limit else limit
+
+    @staticmethod
+    def units(response: Dict) -> float:
+        """
+        Returns: Capacity units a response consumed, estimated from ScannedCount if it has no ConsumedCapacity.
+        """
+        capacity = response.get('ConsumedCapacity')
+        if capacity:
+            capacities = capacity if isinstance(capacity, list) else [capacity]
+            return sum(c.get('CapacityUnits', 0) for c in capacities)
+
+        return response.get('ScannedCount', len(response.get('Items', []))) * ESTIMATED_UNITS_PER_ITEM
+
+    def __refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self._burst, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket limiting how many calls per second go through `acquire()`, e.g. SSM writes, whose
+    throughput limit is per account rather than per table.
+    """
+
+    def __init__(self, per_second: float, burst: Optional[float] = None):
+        """
+        Args:
+            per_second: Calls per second to allow on average.
+            burst: Calls that may be made at once after an idle period. Defaults to one second's worth.
+        """
+        if per_second <= 0:
+            raise ValueError(f"per_second must be greater than 0, got: {per_second}")
+
+        self.per_second = per_second
+        self._burst = burst if burst is not None else max(per_second, 1)
+        self._tokens = self._burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """
+        Blocks until a call may be made.
+
+        Returns: Seconds spent waiting.
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self._burst, self._tokens + (now - self._updated) * self.per_second)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+
+                wait = (1 - self._tokens) / self.per_second
+
+            time.sleep(wait)
+            waited += wait
@@ -0,0 +1,144 @@
+import functools
+import inspect
+import threading
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Set
+
+from figgy.utils.metrics import Metrics, COLLAPSED
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error', 'tags')
+
+    def __init__(self, tags: Iterable[Hashable] = ()):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.tags = tuple(tags)
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls for the same key into one: the first caller runs the function, callers that arrive
+    while it's in flight wait for it and get the same result, or the same exception. Nothing is cached, the next call
+    after it completes runs again. Results are shared, not copied.
+
+    Calls can be tagged, e.g. with the parameter name they read. After a write, `forget(tag)` detaches the in-flight
+    calls with that tag so later callers start a new call rather than getting a result read before the write.
+
+        flight = SingleFlight()
+        value = flight.do(name, lambda: ssm.get_parameter(Name=name), tags=[name])
+        ...
+        ssm.put_parameter(Name=name, ...)
+        flight.forget(name)
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self._tagged: Dict[Hashable, Set[Hashable]] = {}
+        self._lock = threading.Lock()
+        self._collapsed = 0
+
+    @property
+    def collapsed(self) -> int:
+        """
+        Returns: Number of calls that were served by another caller's in-flight call.
+        """
+        return self._collapsed
+
+    @staticmethod
+    def collapse(operation: str, tag: Optional[str] = None):
+        """
+        Method decorator: concurrent calls on the same instance with the same arguments share a single call, through
+        the instance's `_flight` SingleFlight. Collapsed calls are counted as `{operation}.collapsed`. Calls with
+        unhashable arguments are never collapsed.
+        Args:
+            operation: Metrics operation collapsed calls are counted under
+            tag: Optional argument name whose value tags each call, so writes can `forget()` it.
+        """
+
+        def decorator(func):
+            signature = inspect.signature(func)
+
+            @functools.wraps(func)
+            def wrapper(self, *args, **kwargs):
+                # Bind so get(name) and get(name, 0) collapse together when 0 is the default.
+                bound = signature.bind(self, *args, **kwargs)
+                bound.apply_defaults()
+                key = (func.__name__,) + tuple(list(bound.arguments.items())[1:])
+                try:
+                    hash(key)
+                except TypeError:
+                    return func(self, *args, **kwargs)
+
+                tags = [bound.arguments[tag]] if tag else ()
+                return self._flight.do(key, lambda: func(self, *args, **kwargs), operation, tags)
+
+            return wrapper
+
+        return decorator
+
+    def do(self, key: Hashable, fn: Callable[[], Any], operation: Optional[str] = None,
+           tags: Iterable[Hashable] = ()) -> Any:
+        """
+        Returns: fn()'s result, shared with every concurrent caller of the same key.
+        Args:
+            key: Calls with equal keys are collapsed
+            fn: Call to make if none is in flight for `key`
+            operation: Optional metrics operation collapsed calls are counted under
+            tags: Optional tags `forget()` can detach the call by, only used if this call starts a new one
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call(tags)
+                for call_tag in call.tags:
+                    self._tagged.setdefault(call_tag, set()).add(key)
+            else:
+                self._collapsed += 1
+
+        if not leader:
+            if operation:
+                Metrics.count(operation, COLLAPSED)
+
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                # A forgotten call may have been replaced by a newer one for the same key, leave that one be.
+                if self._calls.get(key) is call:
+                    self.__detach(key, call)
+            call.done.set()
+
+    def forget(self, tag: Hashable) -> int:
+        """
+        Detaches every in-flight call tagged `tag`: callers already waiting on them still get their result, later
+        callers start a new call.
+
+        Returns: Number of calls detached.
+        """
+        with self._lock:
+            keys = self._tagged.get(tag, set()).copy()
+            for key in keys:
+                self.__detach(key, self._calls[key])
+
+            return len(keys)
+
+    def __detach(self, key: Hashable, call: _Call) -> None:
+        del self._calls[key]
+        for call_tag in call.tags:
+            keys = self._tagged.get(call_tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tagged[call_tag]
@@ -0,0 +1,73 @@
+import threading
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional
+
+
+class SymbolTable:
+    """
+    Interns repeated strings so that every occurrence of the same value shares a single str object. boto3
+    deserializes each attribute of each scanned item into a new str, so parameter names, users, actions and key ids
+    are otherwise duplicated millions of times across a large scan.
+
+    Symbols can also be referenced by a dense integer id, which is what compact stores like ColumnarHistory keep.
+    A table is never pruned, so share one across scans only for bounded vocabularies.
+    """
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._symbols: List[str] = []
+        self._lock = threading.Lock()
+
+    def intern(self, value: str) -> str:
+        return self._symbols[self.id(value)]
+
+    def id(self, value: str) -> int:
+        symbol_id = self._ids.get(value)
+        if symbol_id is None:
+            with self._lock:
+                symbol_id = self._ids.get(value)
+                if symbol_id is None:
+                    symbol_id = len(self._symbols)
+                    self._symbols.append(value)
+                    self._ids[value] = symbol_id
+
+        return symbol_id
+
+    def get_id(self, value: str) -> Optional[int]:
+        """
+        Returns: the id of an already interned value, or None
+        """
+        return self._ids.get(value)
+
+    def symbol(self, symbol_id: int) -> str:
+        return self._symbols[symbol_id]
+
+    def __len__(self):
+        return len(self._symbols)
+
+
+class ItemDecoder:
+    """
+    Decodes items returned by the boto3 DynamoDB resource API. Attribute names and the values of `intern_attrs` are
+    interned through a SymbolTable, and integral Decimal numbers are converted to native ints once, at decode time.
+    """
+
+    def __init__(self, intern_attrs: Iterable[str], symbols: SymbolTable = None):
+        self._intern_attrs = frozenset(intern_attrs)
+        self.symbols = symbols if symbols is not None else SymbolTable()
+
+    def decode(self, item: Dict) -> Dict:
+        intern = self.symbols.intern
+        decoded = {}
+        for key, value in item.items():
+            if isinstance(value, Decimal):
+                value = int(value) if value == value.to_integral_value() else value
+            elif key in self._intern_attrs and isinstance(value, str):
+                value = intern(value)
+
+            decoded[intern(key)] = value
+
+        return decoded
+
+    def decode_all(self, items: Iterable[Dict]) -> List[Dict]:
+        return [self.decode(item) for item in items]
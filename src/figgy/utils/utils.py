@@ -1,16 +1,26 @@
+import functools
 import logging
 import re
+import sys
 import time
-from typing import List, Any
+from typing import List, Any, Tuple
 
-import botocore
-import urllib3
+from figgy.constants.data import THROTTLE_ERROR_CODES
 
 log = logging.getLogger(__name__)
 BACKOFF = .25
 MAX_RETRIES = 10
 
 
+@functools.lru_cache(maxsize=1)
+def _connection_errors() -> Tuple[type, ...]:
+    # botocore / urllib3 are imported on first use so importing figgy.utils stays cheap.
+    import botocore.exceptions
+    import urllib3
+
+    return botocore.exceptions.EndpointConnectionError, urllib3.exceptions.NewConnectionError
+
+
 class Utils:
 
     @staticmethod
@@ -33,33 +43,53 @@ class Utils:
         Decorator that supports automatic retries if connectivity issues are detected with boto or urllib operations
         """
 
+        @functools.wraps(function)
         def inner(self, *args, **kwargs):
             retries = 0
             while True:
                 try:
                     return function(self, *args, **kwargs)
-                except (botocore.exceptions.EndpointConnectionError, urllib3.exceptions.NewConnectionError) as e:
+                except _connection_errors() as e:
                     if retries > MAX_RETRIES:
                         raise e
 
-                    self._utils.notify("Network connectivity issues detected. Retrying with back off...")
+                    log.warning("Network connectivity issues detected. Retrying with back off...")
                     retries += 1
+                    # Counted under the enclosing @Metrics.timed operation, so retries sit next to its latency.
+                    from figgy.utils.metrics import Metrics  # metrics imports Utils
+                    Utils.count_retry(Metrics.current_operation() or f'{type(self).__name__}.{function.__name__}')
                     time.sleep(retries * BACKOFF)
 
         return inner
 
+    @staticmethod
+    def count_retry(operation: str, throttled: bool = False) -> None:
+        """
+        Records a retry of `operation` with the metrics registry, if metrics are enabled.
+        """
+        from figgy.utils.metrics import Metrics, RETRIES, THROTTLES  # metrics imports Utils
+        if Metrics.enabled:
+            Metrics.count(operation, RETRIES)
+            if throttled:
+                Metrics.count(operation, THROTTLES)
+
     @staticmethod
     def trace(func):
         """
-        Decorator that adds logging around function execution and function parameters.
+        Decorator that adds debug logging around function execution and function parameters. Arguments and results are
+        only formatted when DEBUG logging is enabled, use Metrics.timed for always-on timings.
         """
 
+        @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            log.info(f"Entering function: {func.__name__} with args: {args}")
+            if not log.isEnabledFor(logging.DEBUG):
+                return func(*args, **kwargs)
+
+            log.debug(f"Entering function: {func.__name__} with args: {args}")
             start = time.time()
             result = func(*args, **kwargs)
-            log.info(f"Exiting function: {func.__name__} and returning: {result}")
-            log.info(f"Function complete after {round(time.time() - start, 2)} seconds.")
+            log.debug(f"Exiting function: {func.__name__} and returning: {result}")
+            log.debug(f"Function complete after {round(time.time() - start, 2)} seconds.")
             return result
 
         return wrapper
@@ -70,6 +100,18 @@ class Utils:
         for i in range(0, len(lst), chunk_size):
             yield lst[i:i + chunk_size]
 
+    @staticmethod
+    def is_throttled(error: Exception) -> bool:
+        """
+        Returns True if the provided exception is an AWS ClientError caused by request throttling.
+        """
+        # If botocore was never imported, `error` can't be a ClientError.
+        exceptions = sys.modules.get('botocore.exceptions')
+        if exceptions is not None and isinstance(error, exceptions.ClientError):
+            return error.response.get('Error', {}).get('Code') in THROTTLE_ERROR_CODES
+
+        return False
+
     @staticmethod
     def validate(boolean: bool, error_msg: str):
         if not boolean: